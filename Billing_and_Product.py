@@ -4,9 +4,15 @@ import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
 from PIL import Image, ImageTk   # << YOU NEED PILLOW INSTALLED
 import sqlite3
-from datetime import datetime
 import os
 
+import query_metrics
+import ui_monitor
+import action_profiler
+import services
+import pos_client
+import sale_journal
+
 DB_FILE = "shop.db"
 TAX_RATE = 0.15
 LOYALTY_PER_DOLLAR = 0.1
@@ -16,7 +22,7 @@ LOYALTY_PER_DOLLAR = 0.1
 # INITIALISE TABLES
 # -----------------------------------------------------------
 def init_billing_tables():
-    conn = sqlite3.connect(DB_FILE)
+    conn = query_metrics.connect_sqlite(DB_FILE, "billing")
     c = conn.cursor()
 
     c.execute("""
@@ -72,7 +78,7 @@ def init_billing_tables():
 
 
 def db_fetch(sql, params=()):
-    conn = sqlite3.connect(DB_FILE)
+    conn = query_metrics.connect_sqlite(DB_FILE, "billing")
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
     cur.execute(sql, params)
@@ -82,17 +88,13 @@ def db_fetch(sql, params=()):
 
 
 def db_exec(sql, params=()):
-    conn = sqlite3.connect(DB_FILE)
+    conn = query_metrics.connect_sqlite(DB_FILE, "billing")
     cur = conn.cursor()
     cur.execute(sql, params)
     conn.commit()
     conn.close()
 
 
-def generate_invoice_no():
-    return "INV" + datetime.now().strftime("%Y%m%d%H%M%S")
-
-
 # -----------------------------------------------------------
 # BILLING APPLICATION MAIN WINDOW
 # -----------------------------------------------------------
@@ -102,12 +104,23 @@ class BillingApp(tk.Tk):
         self.title("Billing & Receipt - POS System")
         self.geometry("1100x650")
         self.resizable(False, False)
+        ui_monitor.install(self, "billing")
+        action_profiler.install(self, "billing")
 
         init_billing_tables()
 
         self.cart = []
         self.selected_customer = None
         self.staff = "Cashier"
+        server = pos_client.from_env(TAX_RATE)  # NEXUS_POS_SERVER: let pos_server.py run checkouts
+        if server:
+            self.checkout_service = server.billing
+        else:
+            # each sale is journaled before it is written, so a crash mid-checkout is recovered here
+            self.checkout_service = sale_journal.WriteAheadCheckout(services.BillingCheckout(
+                lambda: query_metrics.connect_sqlite(DB_FILE, "billing"), TAX_RATE, LOYALTY_PER_DOLLAR),
+                sale_journal.wal_path(DB_FILE))
+            self.recover_sales()
 
         left = ttk.Frame(self)
         left.pack(side="left", fill="both", expand=True)
@@ -118,6 +131,21 @@ class BillingApp(tk.Tk):
         ProductSelection(left, self).pack(fill="both", expand=True)
         CartFrame(right, self).pack(fill="y")
 
+    def recover_sales(self):
+        try:
+            replayed, committed, rejected = self.checkout_service.recover()
+        except services.ServiceError as e:
+            messagebox.showerror("Recovery", f"Could not recover unfinished sales: {e}")
+            return
+        if replayed or rejected:
+            msg = ""
+            if replayed:
+                msg += f"Recorded {len(replayed)} sale(s) interrupted by the last shutdown:\n{', '.join(replayed)}\n"
+            if rejected:
+                msg += (f"\n{len(rejected)} sale(s) could not be recorded and were set aside in "
+                        f"{self.checkout_service.rejected_path}:\n{', '.join(rejected)}")
+            messagebox.showwarning("Recovered Sales", msg)
+
 
 # -----------------------------------------------------------
 # PRODUCT SELECTION PANEL
@@ -411,43 +439,24 @@ class CartFrame(ttk.Frame):
             messagebox.showerror("Empty", "Nothing in cart.")
             return
 
-        subtotal = sum(i["subtotal"] for i in self.app.cart)
-        tax = subtotal * TAX_RATE
-        disc = subtotal * (self.discP.get()/100) + self.discA.get()
-        grand = subtotal + tax - disc
-
         pay_method = self.pay_method.get()
         card_type = self.card_type.get() if pay_method == "Card" else None
+        sale = services.Sale([services.CartLine.from_item(i) for i in self.app.cart], pay_method, self.app.staff,
+                             discount_percent=self.discP.get(), discount_amount=self.discA.get(),
+                             payment_details=card_type)
+        grand = self.app.checkout_service.totals(sale).grand_total
 
         confirm = messagebox.askyesno("Confirm", f"Pay ${grand:.2f} using {pay_method}?")
         if not confirm:
             return
 
-        conn = sqlite3.connect(DB_FILE)
-        cur = conn.cursor()
-
-        invoice = generate_invoice_no()
-        cur.execute("""
-            INSERT INTO sales (invoice_no, subtotal, tax, discount, grand_total, payment_method, card_type, staff)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (invoice, subtotal, tax, disc, grand, pay_method, card_type, self.app.staff))
-
-        sale_id = cur.lastrowid
-
-        # Insert items
-        for it in self.app.cart:
-            cur.execute("""
-                INSERT INTO sales_items (sale_id, product_id, name, qty, price, subtotal)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (sale_id, it["id"], it["name"], it["qty"], it["price"], it["subtotal"]))
-
-            # reduce stock
-            cur.execute("UPDATE products SET stock = stock - ? WHERE id=?", (it["qty"], it["id"]))
-
-        conn.commit()
-        conn.close()
+        try:
+            result = self.app.checkout_service.checkout(sale)
+        except services.ServiceError as e:
+            messagebox.showerror("Checkout Error", str(e))
+            return
 
-        messagebox.showinfo("Success", f"Payment Successful!\nInvoice: {invoice}")
+        messagebox.showinfo("Success", f"Payment Successful!\nInvoice: {result.invoice_no}")
 
         self.app.cart.clear()
         self.refresh()
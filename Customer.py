@@ -2,6 +2,9 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import mysql.connector
 from datetime import datetime
+import json
+import re
+import customer_import
 
 class CustomerManagementSystem:
     """
@@ -12,10 +15,14 @@ class CustomerManagementSystem:
     - Membership level tracking with automatic discounts
     - Loyalty points monitoring
     - Transaction history storage and access
+    - Normalized transaction line items for per-product / per-category analytics
     """
     
+    BACKFILL_BATCH_SIZE = 500
+    
     def __init__(self, db_connection):
         self.conn = db_connection
+        self._products_by_name = None  # lower(product_name) -> (product_id, category_id, price)
         
     def register_customer(self, name, contact, email, address, customer_type='Regular'):
         """
@@ -42,6 +49,29 @@ class CustomerManagementSystem:
         except Exception as e:
             return False, None, f"Error: {str(e)}"
     
+    def bulk_register_customers(self, customers, chunk_size=None):
+        """
+        Register many customers at once (migrations, spreadsheets)
+        
+        Parameters:
+        - customers: iterable of dicts with name, contact, email, address,
+          customer_type and loyalty_points (all but name optional)
+        - chunk_size: rows per transaction (default: customer_import.CHUNK_ROWS)
+        
+        Phone numbers and e-mails are normalized and customers already on
+        file (or repeated in the input) are skipped.
+        Returns: (success, report, message)
+        """
+        keys = {'contact': 'phone', 'customer_type': 'type', 'loyalty_points': 'points'}
+        rows = ((n, {keys.get(k, k): str(v) for k, v in c.items() if v is not None})
+                for n, c in enumerate(customers, 1))
+        try:
+            report = customer_import.import_rows(rows, customer_import.MySQLCustomers(self.conn),
+                                                 chunk_size or customer_import.CHUNK_ROWS)
+            return True, report, report.summary()
+        except Exception as e:
+            return False, None, f"Error: {str(e)}"
+    
     def update_customer(self, customer_id, name=None, contact=None, email=None, 
                        address=None, customer_type=None):
         """
@@ -258,19 +288,33 @@ class CustomerManagementSystem:
         Parameters:
         - customer_id: Customer ID
         - total_amount: Total purchase amount
-        - items_purchased: String or JSON of items
+        - items_purchased: String or JSON of items, or a list of line items
+          (dicts with product_id/name, qty, price) which are also stored in
+          Transaction_Items
         - discount_applied: Total discount amount
         - payment_method: Cash, Card, etc.
         """
         try:
+            if isinstance(items_purchased, (list, tuple)):
+                items = [self._normalize_item(i) for i in items_purchased]
+                items_text = ", ".join(
+                    name if qty == 1 else f"{qty} x {name}" for name, qty, _, _ in items)
+            else:
+                items_text = items_purchased
+                items = self._parse_items_text(items_purchased)
+            
             cursor = self.conn.cursor()
             cursor.execute("""
                 INSERT INTO Transaction_History 
                 (customer_id, transaction_date, total_amount, items_purchased, 
                  discount_applied, payment_method)
                 VALUES (%s, %s, %s, %s, %s, %s)
-            """, (customer_id, datetime.now(), total_amount, items_purchased, 
+            """, (customer_id, datetime.now(), total_amount, items_text, 
                   discount_applied, payment_method))
+            transaction_id = cursor.lastrowid
+            
+            # Header and line items are committed together
+            self._insert_transaction_items(cursor, transaction_id, customer_id, items)
             self.conn.commit()
             
             # Add loyalty points based on purchase
@@ -278,8 +322,177 @@ class CustomerManagementSystem:
             
             return True, "Transaction recorded successfully"
         except Exception as e:
+            self.conn.rollback()
             return False, f"Error: {str(e)}"
     
+    def _product_lookup(self):
+        """Cache of Product_Details keyed by lower-case product name"""
+        if self._products_by_name is None:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT product_id, product_name, category_id, product_price FROM Product_Details")
+            self._products_by_name = {
+                row[1].strip().lower(): (row[0], row[2], row[3]) for row in cursor.fetchall()
+            }
+        return self._products_by_name
+    
+    def _normalize_item(self, item):
+        """
+        Turn a line item into (name, qty, price, product_id)
+        Accepts dicts (product_id/name, qty/quantity, price), tuples
+        (name, qty[, price]) or plain product names.
+        """
+        if isinstance(item, dict):
+            name = item.get('name') or item.get('product_name') or ''
+            qty = item.get('qty', item.get('quantity', 1))
+            return name, int(qty or 1), item.get('price'), item.get('product_id')
+        if isinstance(item, (list, tuple)):
+            name, qty = item[0], item[1] if len(item) > 1 else 1
+            price = item[2] if len(item) > 2 else None
+            return name, int(qty or 1), price, None
+        return str(item), 1, None, None
+    
+    def _parse_items_text(self, text):
+        """
+        Parse legacy free-text items_purchased into line items
+        Understands JSON lists, and comma separated names with optional
+        quantities ("Laptop, 2 x Mouse, Cable x3").
+        """
+        if not text:
+            return []
+        text = text.strip()
+        if text.startswith('['):
+            try:
+                return [self._normalize_item(i) for i in json.loads(text)]
+            except (ValueError, TypeError):
+                pass
+        
+        items = []
+        for part in text.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            qty = 1
+            match = re.match(r'^(\d+)\s*[xX*]\s*(.+)$', part) or re.match(r'^(.+?)\s*[xX*]\s*(\d+)$', part)
+            if match:
+                a, b = match.groups()
+                if a.isdigit():
+                    qty, part = int(a), b
+                else:
+                    part, qty = a, int(b)
+            items.append((part.strip(), qty, None, None))
+        return items
+    
+    def _insert_transaction_items(self, cursor, transaction_id, customer_id, items):
+        """Write normalized line items (one batched statement, caller commits)"""
+        if not items:
+            return 0
+        products = self._product_lookup()
+        by_id = None
+        rows = []
+        for name, qty, price, product_id in items:
+            match = products.get((name or '').strip().lower())
+            category_id = None
+            if product_id is not None:
+                if by_id is None:
+                    by_id = {p[0]: p for p in products.values()}
+                category_id = by_id.get(product_id, (None, None, None))[1]
+            elif match:
+                product_id, category_id = match[0], match[1]
+            if price is None and match:
+                price = match[2]
+            line_total = float(price) * qty if price is not None else None
+            rows.append((transaction_id, customer_id, product_id, name, category_id, qty, price, line_total))
+        
+        cursor.executemany("""
+            INSERT INTO Transaction_Items 
+            (transaction_id, customer_id, product_id, product_name, category_id, 
+             quantity, unit_price, line_total)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, rows)
+        return len(rows)
+    
+    def backfill_transaction_items(self, batch_size=None):
+        """
+        Normalize existing free-text Transaction_History rows into Transaction_Items
+        
+        Walks the history in transaction_id order, one batch per commit, and
+        skips transactions that already have line items, so it can be
+        stopped and re-run safely.
+        Returns: (transactions_processed, items_written)
+        """
+        batch_size = batch_size or self.BACKFILL_BATCH_SIZE
+        processed = written = 0
+        last_id = 0
+        try:
+            cursor = self.conn.cursor()
+            while True:
+                cursor.execute("""
+                    SELECT t.transaction_id, t.customer_id, t.items_purchased
+                    FROM Transaction_History t
+                    WHERE t.transaction_id > %s
+                      AND NOT EXISTS (SELECT 1 FROM Transaction_Items i
+                                      WHERE i.transaction_id = t.transaction_id)
+                    ORDER BY t.transaction_id
+                    LIMIT %s
+                """, (last_id, batch_size))
+                batch = cursor.fetchall()
+                if not batch:
+                    break
+                
+                for transaction_id, customer_id, items_text in batch:
+                    items = self._parse_items_text(items_text)
+                    written += self._insert_transaction_items(cursor, transaction_id, customer_id, items)
+                self.conn.commit()
+                
+                processed += len(batch)
+                last_id = batch[-1][0]
+            return processed, written
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Error backfilling transaction items: {e}")
+            return processed, written
+    
+    def get_category_breakdown(self, customer_id):
+        """
+        Per-category spend for a customer, largest first
+        Indexed aggregation over Transaction_Items (idx_items_customer_category)
+        Returns: list of (category_name, items_bought, amount_spent)
+        """
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                SELECT COALESCE(c.category_name, 'Uncategorized'),
+                       SUM(i.quantity), COALESCE(SUM(i.line_total), 0)
+                FROM Transaction_Items i
+                LEFT JOIN Product_Category c ON c.category_id = i.category_id
+                WHERE i.customer_id = %s
+                GROUP BY i.category_id, c.category_name
+                ORDER BY 3 DESC, 2 DESC
+            """, (customer_id,))
+            return [(row[0], int(row[1] or 0), float(row[2] or 0)) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error getting category breakdown: {e}")
+            return []
+    
+    def get_product_sales(self, product_id):
+        """
+        Units sold, revenue and distinct customers for one product
+        Returns: (units, revenue, customers)
+        """
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                SELECT COALESCE(SUM(quantity), 0), COALESCE(SUM(line_total), 0),
+                       COUNT(DISTINCT customer_id)
+                FROM Transaction_Items
+                WHERE product_id = %s
+            """, (product_id,))
+            units, revenue, customers = cursor.fetchone()
+            return int(units), float(revenue), int(customers)
+        except Exception as e:
+            print(f"Error getting product sales: {e}")
+            return 0, 0.0, 0
+    
     def get_transaction_history(self, customer_id, limit=10):
         """
         Retrieve customer's transaction history
@@ -305,6 +518,55 @@ class CustomerManagementSystem:
             print(f"Error retrieving transaction history: {e}")
             return []
     
+    def get_transaction_history_page(self, customer_id, before=None, limit=20):
+        """
+        Retrieve one page of a customer's transaction history, newest first
+        
+        Keyset pagination on (transaction_date, transaction_id): the next page
+        starts after the last row of the previous one, so deep pages cost the
+        same as the first (served by idx_customer_date, which InnoDB extends
+        with the primary key).
+        
+        Parameters:
+        - customer_id: Customer ID
+        - before: (transaction_date, transaction_id) key from the previous page, or None
+        - limit: Page size (default: 20)
+        
+        Returns: (transactions, next_key) - next_key is None on the last page
+        """
+        try:
+            cursor = self.conn.cursor()
+            if before is None:
+                cursor.execute("""
+                    SELECT transaction_id, transaction_date, total_amount, 
+                           items_purchased, discount_applied, payment_method
+                    FROM Transaction_History
+                    WHERE customer_id = %s
+                    ORDER BY transaction_date DESC, transaction_id DESC
+                    LIMIT %s
+                """, (customer_id, limit + 1))
+            else:
+                last_date, last_id = before
+                cursor.execute("""
+                    SELECT transaction_id, transaction_date, total_amount, 
+                           items_purchased, discount_applied, payment_method
+                    FROM Transaction_History
+                    WHERE customer_id = %s
+                      AND (transaction_date < %s
+                           OR (transaction_date = %s AND transaction_id < %s))
+                    ORDER BY transaction_date DESC, transaction_id DESC
+                    LIMIT %s
+                """, (customer_id, last_date, last_date, last_id, limit + 1))
+            
+            transactions = cursor.fetchall()
+            if len(transactions) > limit:
+                transactions = transactions[:limit]
+                return transactions, (transactions[-1][1], transactions[-1][0])
+            return transactions, None
+        except Exception as e:
+            print(f"Error retrieving transaction history: {e}")
+            return [], None
+    
     def get_customer_analytics(self, customer_id):
         """
         Get comprehensive customer analytics for personalized service
@@ -339,6 +601,9 @@ class CustomerManagementSystem:
             """, (customer_id,))
             customer_info = cursor.fetchone()
             
+            # Top categories from the normalized line items
+            favorite_categories = [row[0] for row in self.get_category_breakdown(customer_id)[:3]]
+            
             return {
                 'customer_name': customer_info[0] if customer_info else 'N/A',
                 'customer_type': customer_info[1] if customer_info else 'N/A',
@@ -347,7 +612,8 @@ class CustomerManagementSystem:
                 'registration_date': customer_info[4] if customer_info else None,
                 'total_transactions': total_transactions,
                 'total_spent': float(total_spent),
-                'average_purchase': float(avg_purchase)
+                'average_purchase': float(avg_purchase),
+                'favorite_categories': favorite_categories
             }
         except Exception as e:
             print(f"Error getting customer analytics: {e}")
@@ -422,6 +688,23 @@ CREATE TABLE IF NOT EXISTS Transaction_History (
     FOREIGN KEY (customer_id) REFERENCES Customer_Details(customer_id) ON DELETE CASCADE,
     INDEX idx_customer_date (customer_id, transaction_date)
 );
+
+-- Normalized line items of each transaction
+CREATE TABLE IF NOT EXISTS Transaction_Items (
+    item_id INT PRIMARY KEY AUTO_INCREMENT,
+    transaction_id INT NOT NULL,
+    customer_id INT NOT NULL,
+    product_id INT,
+    product_name VARCHAR(200) NOT NULL,
+    category_id INT,
+    quantity INT NOT NULL DEFAULT 1,
+    unit_price DECIMAL(10,2),
+    line_total DECIMAL(10,2),
+    FOREIGN KEY (transaction_id) REFERENCES Transaction_History(transaction_id) ON DELETE CASCADE,
+    INDEX idx_items_transaction (transaction_id),
+    INDEX idx_items_customer_category (customer_id, category_id),
+    INDEX idx_items_product (product_id)
+);
 """
 
 # Example Usage
@@ -461,7 +744,11 @@ if __name__ == "__main__":
         )
         print(f"Transaction: {msg}")
         
-        # Example 4: Get customer analytics
+        # Example 4: Normalize older free-text transactions
+        processed, written = cms.backfill_transaction_items()
+        print(f"Backfill: {processed} transactions, {written} line items")
+        
+        # Example 5: Get customer analytics
         analytics = cms.get_customer_analytics(cust_id)
         if analytics:
             print(f"Analytics: {analytics}")
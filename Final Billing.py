@@ -15,14 +15,28 @@ from datetime import datetime
 import os
 import csv
 import sys
-
-# Try import for PDF generation
-HAS_REPORTLAB = True
-try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.pdfgen import canvas as pdfcanvas
-except Exception:
-    HAS_REPORTLAB = False
+import threading
+import time
+
+import receipts
+import recommendations
+import inventory_classes
+import product_import
+import customer_import
+import receiving
+import query_metrics
+import query_metrics_window
+import ui_monitor
+import action_profiler
+import metrics_exporter
+import services
+import pos_client
+import sales_history
+import sales_history_window
+import sales_snapshot
+
+# PDF generation (reportlab) is optional - see receipts.py
+HAS_REPORTLAB = receipts.HAS_REPORTLAB
 
 # ------------ Config ------------
 DB_FILE = "shop.db"        # same DB used by your other code
@@ -33,7 +47,7 @@ LOYALTY_PER_DOLLAR = 0.1   # 0.1 point per $1 (=> 1 point per $10)
 
 # ---------- DB helpers ----------
 def db_connect():
-    conn = sqlite3.connect(DB_FILE)
+    conn = query_metrics.connect_sqlite(DB_FILE, "final_billing")
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON;")
     return conn
@@ -125,25 +139,29 @@ def init_db():
         )
     """)
 
+    # receipts / history look up line items by sale
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sales_items_sale ON sales_items(sale_id)")
+    # duplicate check when a customer is added at the till
+    customer_import.SqliteCustomers.ensure_indexes(conn)
+
     conn.commit()
+    # keyset indexes for the sales history browser
+    sales_history.ensure_indexes(conn)
     conn.close()
 
     # ensure barcode column exists on products (safe add)
     ensure_column_exists("products", "barcode", "TEXT")
 
 
-# ---------- Utilities ----------
-def generate_invoice_no():
-    t = datetime.now().strftime("%Y%m%d%H%M%S")
-    return f"INV{t}"
-
-
 # ---------- Main Application ----------
 class POSApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("POS - Full Billing System")
         self.geometry("1150x720")
+        ui_monitor.install(self, "pos")  # no-op unless NEXUS_UI_MONITOR=1
+        action_profiler.install(self, "pos")  # no-op unless NEXUS_PROFILE=1
+        metrics_exporter.start(self, "pos")  # /metrics on localhost if NEXUS_METRICS=1
 
         init_db()  # ensure tables exist
 
@@ -151,6 +169,16 @@ class POSApp(tk.Tk):
         self.selected_customer = None  # (id, name) or None
         self.staff_name = "cashier"    # change or prompt for staff login in future
 
+        # checkout / lookup logic lives in the GUI-free services package - run here,
+        # or by pos_server.py when NEXUS_POS_SERVER is set
+        server = pos_client.from_env(TAX_RATE)
+        if server:
+            self.checkout_service, self.inventory, self.customers = server.shop, server.inventory, server.customers
+        else:
+            self.checkout_service = services.ShopCheckout(db_connect, TAX_RATE, LOYALTY_PER_DOLLAR)
+            self.inventory = services.ShopInventory(db_connect)
+            self.customers = services.ShopCustomers(db_connect)
+
         # Layout frames
         main = ttk.Frame(self)
         main.pack(fill="both", expand=True, padx=8, pady=8)
@@ -172,8 +200,15 @@ class POSApp(tk.Tk):
         # Bottom: quick actions
         bottom = ttk.Frame(self)
         bottom.pack(fill="x", padx=8, pady=4)
+        ttk.Button(bottom, text="Sales History", command=self.open_sales_history).pack(side="left", padx=4)
         ttk.Button(bottom, text="Export Sales CSV", command=self.export_sales_csv).pack(side="left", padx=4)
+        ttk.Button(bottom, text="Export Sales Snapshot", command=self.export_sales_snapshot).pack(side="left", padx=4)
+        ttk.Button(bottom, text="Reprint Receipts", command=self.reprint_receipts).pack(side="left", padx=4)
+        ttk.Button(bottom, text="Rebuild Suggestions", command=self.rebuild_suggestions).pack(side="left", padx=4)
+        ttk.Button(bottom, text="Classify Products", command=self.classify_products).pack(side="left", padx=4)
         ttk.Button(bottom, text="Open Product Manager", command=self.open_product_manager).pack(side="left", padx=4)
+        ttk.Button(bottom, text="Receive Stock", command=self.open_receiving).pack(side="left", padx=4)
+        ttk.Button(bottom, text="Query Stats", command=self.open_query_stats).pack(side="left", padx=4)
         ttk.Button(bottom, text="Quit", command=self.destroy).pack(side="right", padx=4)
 
         # Focus the hidden scan entry so keyboard-wedge barcode scanners work
@@ -190,6 +225,7 @@ class POSApp(tk.Tk):
         item = {'product_id': product_id, 'name': name, 'price': price, 'qty': qty, 'subtotal': price * qty}
         self.cart.append(item)
         self.cart_frame.refresh_cart()
+        self.cart_frame.show_suggestions(product_id)
 
     def remove_from_cart(self, product_id):
         self.cart = [i for i in self.cart if i['product_id'] != product_id]
@@ -200,77 +236,45 @@ class POSApp(tk.Tk):
         self.selected_customer = None
         self.cart_frame.refresh_cart()
 
+    def cart_lines(self):
+        return [services.CartLine.from_item(i) for i in self.cart]
+
     def compute_totals(self, discount_percent=0.0, discount_amount=0.0):
-        subtotal = sum(i['subtotal'] for i in self.cart)
-        tax = subtotal * TAX_RATE
-        discount_from_percent = subtotal * (discount_percent / 100.0)
-        discount = discount_from_percent + discount_amount
-        grand_total = max(0.0, subtotal + tax - discount)
-        return {
-            'subtotal': subtotal,
-            'tax': tax,
-            'discount': discount,
-            'grand_total': grand_total
-        }
+        return services.Totals.compute(self.cart_lines(), TAX_RATE, discount_percent, discount_amount).as_dict()
 
     def checkout(self, payment_method, discount_percent=0.0, discount_amount=0.0, payment_details=None):
         if not self.cart:
             messagebox.showwarning("Empty Cart", "Cart is empty.")
             return False
 
-        totals = self.compute_totals(discount_percent, discount_amount)
-        invoice_no = generate_invoice_no()
         cust_id = self.selected_customer[0] if self.selected_customer else None
-        staff = self.staff_name
+        sale = services.Sale(self.cart_lines(), payment_method, self.staff_name, cust_id,
+                             discount_percent, discount_amount, payment_details)
 
-        # Begin transaction
-        conn = db_connect()
-        cur = conn.cursor()
+        started = time.perf_counter()
         try:
-            # insert sale header
-            cur.execute("""
-                INSERT INTO sales (invoice_no, customer_id, total, tax, discount, grand_total, payment_method, payment_details, staff)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (invoice_no, cust_id, totals['subtotal'], totals['tax'], totals['discount'], totals['grand_total'], payment_method, payment_details, staff))
-            sale_id = cur.lastrowid
-
-            # insert sale items and update product stock
-            for item in self.cart:
-                cur.execute("""
-                    INSERT INTO sales_items (sale_id, product_id, name, qty, price, subtotal)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (sale_id, item['product_id'], item['name'], item['qty'], item['price'], item['subtotal']))
-
-                # decrement stock (if product exists)
-                cur.execute("UPDATE products SET stock = stock - ? WHERE id = ?", (item['qty'], item['product_id']))
-
-            # update customer loyalty if applicable
-            if cust_id:
-                loyalty_points_earned = int(totals['grand_total'] * LOYALTY_PER_DOLLAR)
-                cur.execute("UPDATE customers SET loyalty_points = COALESCE(loyalty_points,0) + ? WHERE id = ?", (loyalty_points_earned, cust_id))
-                earned = loyalty_points_earned
-            else:
-                earned = 0
-
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            messagebox.showerror("Checkout Error", f"Failed to complete sale: {e}")
-            conn.close()
+            result = self.checkout_service.checkout(sale)
+        except services.ServiceError as e:
+            metrics_exporter.CHECKOUTS.inc("pos", "failed")
+            metrics_exporter.DB_ERRORS.inc("pos", "checkout")
+            messagebox.showerror("Checkout Error", str(e))
             return False
+        metrics_exporter.CHECKOUTS.inc("pos", "committed")
+        metrics_exporter.CHECKOUT_SECONDS.observe("pos", value=time.perf_counter() - started)
 
-        conn.close()
+        # Build the receipt from the committed cart snapshot - no need to read sales_items back
+        receipt = receipts.Receipt.from_cart(result.invoice_no, self.cart, result.totals.as_dict(), payment_method,
+                                             self.staff_name, payment_details, self.selected_customer,
+                                             result.loyalty_earned, result.sale_id, tax_rate=TAX_RATE)
 
         # Show receipt and clear cart
-        self.show_receipt(invoice_no, sale_id, totals, payment_method, staff, earned, payment_details)
+        self.show_receipt(receipt)
         self.clear_cart()
         return True
 
-    def show_receipt(self, invoice_no, sale_id, totals, payment_method, staff, loyalty_earned, payment_details=None):
-        # Fetch sale items to display exact saved data
-        rows = db_query("SELECT name, qty, price, subtotal FROM sales_items WHERE sale_id=?", (sale_id,), fetch=True) or []
+    def show_receipt(self, receipt):
         receipt_win = tk.Toplevel(self)
-        receipt_win.title(f"Receipt - {invoice_no}")
+        receipt_win.title(f"Receipt - {receipt.invoice_no}")
         receipt_win.geometry("600x600")
         receipt_text = tk.Text(receipt_win, width=80, height=30, wrap="none")
         receipt_text.pack(side="left", fill="both", expand=True, padx=6, pady=6)
@@ -278,102 +282,164 @@ class POSApp(tk.Tk):
         scrollbar.pack(side="right", fill="y")
         receipt_text.config(yscrollcommand=scrollbar.set)
 
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        lines = []
-        lines.append("=== NEXUS TECH SHOP ===")
-        lines.append(f"Invoice: {invoice_no}")
-        lines.append(f"Date: {now}")
-        if self.selected_customer:
-            lines.append(f"Customer: {self.selected_customer[1]} (ID:{self.selected_customer[0]})")
-        lines.append(f"Staff: {staff}")
-        lines.append("-"*48)
-        lines.append(f"{'Item':30} {'Qty':>3} {'Price':>8} {'Sub':>9}")
-        lines.append("-"*48)
-        for r in rows:
-            name, qty, price, sub = r
-            lines.append(f"{name[:30]:30} {qty:>3} {price:>8.2f} {sub:>9.2f}")
-        lines.append("-"*48)
-        lines.append(f"Subtotal: ${totals['subtotal']:.2f}")
-        lines.append(f"Tax ({TAX_RATE*100:.0f}%): ${totals['tax']:.2f}")
-        lines.append(f"Discount: -${totals['discount']:.2f}")
-        lines.append(f"Grand Total: ${totals['grand_total']:.2f}")
-        lines.append(f"Payment: {payment_method} {('('+str(payment_details)+')') if payment_details else ''}")
-        lines.append("-"*48)
-        if loyalty_earned:
-            lines.append(f"Loyalty points earned: {loyalty_earned}")
-        lines.append("Thank you for shopping with us!")
-        lines.append("=== Powered by POSApp ===")
-
-        content = "\n".join(lines)
-        receipt_text.insert("1.0", content)
+        receipt_text.insert("1.0", receipt.text)
         receipt_text.config(state="disabled")
 
         # Save receipt buttons
         btn_frame = ttk.Frame(receipt_win)
         btn_frame.pack(fill="x", padx=6, pady=6)
-        ttk.Button(btn_frame, text="Save Receipt (.txt)", command=lambda: self.save_receipt_text(invoice_no, content)).pack(side="left", padx=4)
-        ttk.Button(btn_frame, text="Save Receipt (.pdf)", command=lambda: self.save_receipt_pdf(invoice_no, lines)).pack(side="left", padx=4)
+        ttk.Button(btn_frame, text="Save Receipt (.txt)", command=lambda: self.save_receipt_text(receipt)).pack(side="left", padx=4)
+        ttk.Button(btn_frame, text="Save Receipt (.pdf)", command=lambda: self.save_receipt_pdf(receipt)).pack(side="left", padx=4)
         ttk.Button(btn_frame, text="Close", command=receipt_win.destroy).pack(side="right", padx=4)
 
-    def save_receipt_text(self, invoice_no, content):
-        fn = filedialog.asksaveasfilename(defaultextension=".txt", initialfile=f"{invoice_no}.txt")
+    def save_receipt_text(self, receipt):
+        fn = filedialog.asksaveasfilename(defaultextension=".txt", initialfile=f"{receipt.invoice_no}.txt")
         if not fn:
             return
-        with open(fn, "w", encoding="utf-8") as f:
-            f.write(content)
+        receipt.save_text(fn)
         messagebox.showinfo("Saved", f"Receipt saved to {fn}")
 
-    def save_receipt_pdf(self, invoice_no, lines):
+    def save_receipt_pdf(self, receipt):
         if not HAS_REPORTLAB:
             messagebox.showerror("PDF Not Available", "PDF generation requires the 'reportlab' package.\nInstall with: pip install reportlab")
             return
-        fn = filedialog.asksaveasfilename(defaultextension=".pdf", initialfile=f"{invoice_no}.pdf")
+        fn = filedialog.asksaveasfilename(defaultextension=".pdf", initialfile=f"{receipt.invoice_no}.pdf")
         if not fn:
             return
         try:
-            c = pdfcanvas.Canvas(fn, pagesize=A4)
-            width, height = A4
-            x = 40
-            y = height - 40
-            line_height = 14
-            c.setFont("Courier", 10)
-            for line in lines:
-                # wrap long lines simply
-                if y < 40:
-                    c.showPage()
-                    y = height - 40
-                    c.setFont("Courier", 10)
-                c.drawString(x, y, line)
-                y -= line_height
-            c.save()
+            receipt.save_pdf(fn)
             messagebox.showinfo("Saved", f"PDF receipt saved to {fn}")
         except Exception as e:
             messagebox.showerror("PDF Error", f"Failed to save PDF: {e}")
 
     def export_sales_csv(self):
-        rows = db_query("""
-            SELECT s.invoice_no, s.timestamp, s.grand_total, s.payment_method, s.payment_details, c.name as customer
-            FROM sales s
-            LEFT JOIN customers c ON c.id = s.customer_id
-            ORDER BY s.timestamp DESC
-        """, fetch=True) or []
-        if not rows:
-            messagebox.showinfo("No Data", "No sales to export.")
-            return
-        fn = filedialog.asksaveasfilename(defaultextension=".csv", initialfile="sales_export.csv")
-        if not fn:
-            return
-        with open(fn, "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(["Invoice", "Timestamp", "Grand Total", "Payment Method", "Payment Details", "Customer"])
-            for r in rows:
-                w.writerow([r['invoice_no'], r['timestamp'], f"{r['grand_total']:.2f}", r['payment_method'], r['payment_details'] or "", r['customer'] or ""])
+        conn = sales_history.connect(DB_FILE)
+        try:
+            if conn.execute("SELECT 1 FROM sales LIMIT 1").fetchone() is None:
+                messagebox.showinfo("No Data", "No sales to export.")
+                return
+            fn = filedialog.asksaveasfilename(defaultextension=".csv", initialfile="sales_export.csv")
+            if not fn:
+                return
+            # stream keyset pages instead of loading the whole table
+            with open(fn, "w", newline="", encoding="utf-8") as f:
+                w = csv.writer(f)
+                w.writerow(["Invoice", "Timestamp", "Grand Total", "Payment Method", "Payment Details", "Customer"])
+                for r in sales_history.iter_sales(conn):
+                    w.writerow([r['invoice_no'], r['timestamp'], f"{r['grand_total'] or 0:.2f}", r['payment_method'], r['payment_details'] or "", r['customer'] or ""])
+        finally:
+            conn.close()
         messagebox.showinfo("Exported", f"Sales exported to {fn}")
 
+    def open_sales_history(self):
+        sales_history_window.SalesHistoryWindow(self, DB_FILE)
+
+    def export_sales_snapshot(self):
+        """Write/extend the columnar (.npy) snapshot used for offline analysis."""
+        if not sales_snapshot.HAS_NUMPY:
+            messagebox.showerror("Snapshot Not Available", "Sales snapshots require the 'numpy' package.\nInstall with: pip install numpy")
+            return
+        out_dir = filedialog.askdirectory(title="Snapshot folder", initialdir=os.path.abspath(sales_snapshot.SNAPSHOT_DIR))
+        if not out_dir:
+            return
+        try:
+            new_sales, new_items = sales_snapshot.export_snapshot(DB_FILE, out_dir)
+        except Exception as e:
+            messagebox.showerror("Snapshot Error", f"Failed to export snapshot: {e}")
+            return
+        messagebox.showinfo("Exported", f"Appended {new_sales} sales and {new_items} line items to {out_dir}")
+
+    def reprint_receipts(self):
+        """Rebuild every receipt in a date range (text archive + PDFs rendered in a process pool)."""
+        today = datetime.now().strftime("%Y-%m-%d")
+        date_from = simpledialog.askstring("Reprint Receipts", "From date (YYYY-MM-DD):", initialvalue=today[:8] + "01", parent=self)
+        if not date_from:
+            return
+        date_to = simpledialog.askstring("Reprint Receipts", "To date (YYYY-MM-DD, inclusive):", initialvalue=today, parent=self)
+        if not date_to:
+            return
+        out_dir = filedialog.askdirectory(title="Output folder", initialdir=os.path.abspath(receipts.RECEIPTS_DIR))
+        if not out_dir:
+            return
+        pdf = receipts.HAS_REPORTLAB
+        if not pdf and not messagebox.askyesno("PDF Not Available", "reportlab is not installed - write the text archive only?"):
+            return
+
+        # run off the UI thread; the mainloop polls for the result
+        result = []
+
+        def work():
+            try:
+                result.append(receipts.render_batch(date_from.strip(), date_to.strip(), DB_FILE, out_dir, pdf=pdf))
+            except Exception as e:
+                result.append(e)
+
+        threading.Thread(target=work, daemon=True).start()
+        self.after(250, self._poll_reprint, result)
+        messagebox.showinfo("Reprint Receipts", "Rendering receipts in the background.\nYou will be notified when it finishes.")
+
+    def _poll_reprint(self, result):
+        if not result:
+            self.after(250, self._poll_reprint, result)
+            return
+        result = result[0]
+        if isinstance(result, Exception):
+            messagebox.showerror("Reprint Error", f"Failed to render receipts: {result}")
+            return
+        msg = (f"{result['receipts']} receipts in {result['seconds']:.1f}s "
+               f"({result['per_second']:.1f} receipts/s)\n\nText archive: {result['archive']}")
+        if result['pdf_dir']:
+            msg += f"\nPDFs: {result['pdf_dir']}"
+        messagebox.showinfo("Receipts Rendered", msg)
+
+    def rebuild_suggestions(self):
+        """Recompute frequently-bought-together pairs from sales_items off the UI thread."""
+        result = []
+
+        def work():
+            try:
+                result.append(recommendations.build_companions(DB_FILE))
+            except Exception as e:
+                result.append(e)
+
+        threading.Thread(target=work, daemon=True).start()
+        self.after(250, self._poll_suggestions, result)
+
+    def _poll_suggestions(self, result):
+        if not result:
+            self.after(250, self._poll_suggestions, result)
+            return
+        result = result[0]
+        if isinstance(result, Exception):
+            messagebox.showerror("Suggestions Error", f"Failed to rebuild suggestions: {result}")
+            return
+        self.cart_frame.load_companions()
+        messagebox.showinfo("Suggestions Rebuilt",
+                            f"{result['pairs']} suggestions for {result['products']} products in {result['seconds']:.1f}s")
+
+    def classify_products(self):
+        """Recompute ABC/XYZ classes for the whole catalog."""
+        try:
+            stats = inventory_classes.classify_sqlite(DB_FILE)
+        except Exception as e:
+            messagebox.showerror("Classification Error", f"Failed to classify products: {e}")
+            return
+        self.product_search_frame.load_all()
+        summary = "\n".join(f"{cls}: {n}" for cls, n in stats['classes'].items())
+        messagebox.showinfo("Products Classified",
+                            f"{stats['products']} products in {stats['seconds']:.2f}s\n\n{summary}")
+
     def open_product_manager(self):
         pm = ProductQuickManager(self)
         pm.grab_set()
 
+    def open_query_stats(self):
+        query_metrics_window.WorstQueriesWindow(self)
+
+    def open_receiving(self):
+        receiving.ReceivingWindow(self, query_metrics.connect_sqlite(DB_FILE, "receiving"), staff=self.staff_name,
+                                  on_posted=self.product_search_frame.load_all, owns_conn=True)
+
 
 # ---------- Product Search Frame ----------
 class ProductSearchFrame(ttk.Frame):
@@ -406,7 +472,7 @@ class ProductSearchFrame(ttk.Frame):
         left_list.pack(side="left", fill="y")
 
         ttk.Label(left_list, text="Categories").pack(anchor="w")
-        self.cat_listbox = tk.Listbox(left_list, height=15)
+        self.cat_listbox = tk.Listbox(left_list, height=15, exportselection=False)
         self.cat_listbox.pack(fill="y", expand=False)
         self.cat_listbox.bind("<<ListboxSelect>>", self.on_cat_select)
 
@@ -418,9 +484,18 @@ class ProductSearchFrame(ttk.Frame):
             self.cat_listbox.insert("end", c)
         self.cat_listbox.selection_set(0)
 
+        # ABC/XYZ class filter (classes are computed by inventory_classes.py)
+        ttk.Label(left_list, text="ABC/XYZ Class").pack(anchor="w", pady=(8, 0))
+        self.class_var = tk.StringVar(value="All")
+        class_cb = ttk.Combobox(left_list, textvariable=self.class_var, values=inventory_classes.CLASS_FILTERS,
+                                width=8, state="readonly")
+        class_cb.pack(anchor="w")
+        class_cb.bind("<<ComboboxSelected>>", self.on_cat_select)
+        self.classes = {}
+
         # products tree
-        self.tree = ttk.Treeview(middle, columns=("id", "name", "price", "stock", "barcode"), show="headings")
-        for col, w in (("id",60),("name",360),("price",100),("stock",80),("barcode",140)):
+        self.tree = ttk.Treeview(middle, columns=("id", "name", "price", "stock", "barcode", "class"), show="headings")
+        for col, w in (("id",60),("name",340),("price",100),("stock",80),("barcode",140),("class",60)):
             self.tree.heading(col, text=col.title())
             self.tree.column(col, width=w, anchor="center")
         self.tree.pack(side="left", fill="both", expand=True, padx=6)
@@ -451,61 +526,66 @@ class ProductSearchFrame(ttk.Frame):
         self.scan_var.set("")  # clear input
         if not code:
             return
-        # Try lookup by barcode first
-        row = db_query("SELECT id, name, price, stock FROM products WHERE barcode=? COLLATE NOCASE", (code,), fetch=True)
-        if not row:
-            # fallback numeric id?
-            try:
-                pid = int(code)
-                row = db_query("SELECT id, name, price, stock FROM products WHERE id=?", (pid,), fetch=True)
-            except Exception:
-                row = None
-        if not row:
+        # barcode first, then numeric id
+        started = time.perf_counter()
+        try:
+            product = self.app.inventory.lookup(code)
+        except services.ServiceError as e:
+            metrics_exporter.SCANS.inc("pos", "error")
+            messagebox.showerror("Scan Error", str(e))
+            return
+        metrics_exporter.SCAN_SECONDS.observe("pos", value=time.perf_counter() - started)
+        metrics_exporter.SCANS.inc("pos", "found" if product else "not_found")
+        if not product:
             messagebox.showerror("Not found", f"Product with barcode/id '{code}' not found.")
             return
-        r = row[0]
-        name, price, stock = r['name'], r['price'], r['stock']
         qty = 1
-        if stock is not None and qty > stock:
-            messagebox.showwarning("Stock", f"Only {stock} available.")
+        if product.stock is not None and qty > product.stock:
+            messagebox.showwarning("Stock", f"Only {product.stock} available.")
             return
-        self.app.add_to_cart(r['id'], name, price, qty)
+        self.app.add_to_cart(product.id, product.name, product.price, qty)
         # bring focus back to scanner entry for next scan
         self.scan_entry.focus_set()
 
-    def load_all(self):
+    def load_classes(self):
+        conn = db_connect()
+        try:
+            self.classes = inventory_classes.load_classes(conn)
+        finally:
+            conn.close()
+
+    def fill_tree(self, products):
+        """Show the products (services.Product) that pass the ABC/XYZ class filter."""
         for i in self.tree.get_children():
             self.tree.delete(i)
-        rows = db_query("SELECT id, name, price, stock, COALESCE(barcode,'') as barcode FROM products ORDER BY id", fetch=True) or []
-        for r in rows:
-            pid, name, price, stock, barcode = r['id'], r['name'], r['price'], r['stock'], r['barcode']
-            self.tree.insert("", "end", values=(pid, name, f"{price:.2f}", stock if stock is not None else "", barcode))
+        wanted = self.class_var.get()
+        for p in products:
+            cls = self.classes.get(p.id, "")
+            if not inventory_classes.class_matches(cls, wanted):
+                continue
+            self.tree.insert("", "end", values=(p.id, p.name, f"{p.price:.2f}",
+                                                p.stock if p.stock is not None else "", p.barcode or "", cls))
+
+    def load_all(self):
+        self.load_classes()
+        self.fill_tree(self.app.inventory.search())
 
     def search(self):
         term = self.search_var.get().strip()
         if not term:
             self.load_all()
             return
-        q = "SELECT id, name, price, stock, COALESCE(barcode,'') as barcode FROM products WHERE name LIKE ? OR category LIKE ? OR barcode LIKE ? ORDER BY id"
-        rows = db_query(q, (f"%{term}%", f"%{term}%", f"%{term}%"), fetch=True) or []
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        for r in rows:
-            self.tree.insert("", "end", values=(r['id'], r['name'], f"{r['price']:.2f}", r['stock'] if r['stock'] is not None else "", r['barcode']))
+        self.fill_tree(self.app.inventory.search(term))
 
     def on_cat_select(self, event=None):
         sel = self.cat_listbox.curselection()
         if not sel:
             return
         cat = self.cat_listbox.get(sel[0])
-        for i in self.tree.get_children():
-            self.tree.delete(i)
         if cat == "All":
             self.load_all()
             return
-        rows = db_query("SELECT id, name, price, stock, COALESCE(barcode,'') as barcode FROM products WHERE category=? ORDER BY id", (cat,), fetch=True) or []
-        for r in rows:
-            self.tree.insert("", "end", values=(r['id'], r['name'], f"{r['price']:.2f}", r['stock'] if r['stock'] is not None else "", r['barcode']))
+        self.fill_tree(self.app.inventory.search(category=cat))
 
     def add_selected_to_cart(self):
         sel = self.tree.selection()
@@ -559,6 +639,15 @@ class CartCheckoutFrame(ttk.Frame):
         ttk.Button(btns, text="Clear Cart", command=self.clear_cart).pack(side="left", padx=3)
         ttk.Button(btns, text="Edit Qty", command=self.edit_qty).pack(side="left", padx=3)
 
+        # Frequently bought together (double-click to add)
+        sugg = ttk.LabelFrame(self, text="Frequently bought together")
+        sugg.pack(fill="x", padx=6, pady=(6, 0))
+        self.sugg_list = tk.Listbox(sugg, height=3)
+        self.sugg_list.pack(fill="x", padx=4, pady=4)
+        self.sugg_list.bind("<Double-1>", self.add_suggestion)
+        self.suggestions = []   # (companion_id, name, price, score) shown in the list
+        self.load_companions()
+
         # Totals & customer
         frame2 = ttk.Frame(self)
         frame2.pack(fill="x", padx=6, pady=6)
@@ -623,6 +712,28 @@ class CartCheckoutFrame(ttk.Frame):
         # initial refresh
         self.refresh_cart()
 
+    def load_companions(self):
+        """Load product_companions into a dict once (rebuilt offline by recommendations.py)."""
+        conn = db_connect()
+        try:
+            self.companions = recommendations.load_companions(conn)
+        finally:
+            conn.close()
+
+    def show_suggestions(self, product_id):
+        in_cart = {i['product_id'] for i in self.app.cart}
+        self.suggestions = [c for c in self.companions.get(product_id, []) if c[0] not in in_cart]
+        self.sugg_list.delete(0, "end")
+        for cid, name, price, score in self.suggestions:
+            self.sugg_list.insert("end", f"{name}  ${price:.2f}")
+
+    def add_suggestion(self, event=None):
+        sel = self.sugg_list.curselection()
+        if not sel:
+            return
+        cid, name, price, score = self.suggestions[sel[0]]
+        self.app.add_to_cart(cid, name, price, 1)
+
     def on_pay_method_change(self, event=None):
         m = self.pay_method_var.get()
         # show card type combobox only when 'Card' chosen
@@ -687,10 +798,9 @@ class CartCheckoutFrame(ttk.Frame):
         if new_qty is None:
             return
         # check stock
-        row = db_query("SELECT stock FROM products WHERE id=?", (pid,), fetch=True)
-        stock = row[0]['stock'] if row else None
-        if stock is not None and new_qty > stock:
-            messagebox.showwarning("Stock", f"Only {stock} available.")
+        if not self.app.inventory.available(pid, new_qty):
+            product = self.app.inventory.get(pid)
+            messagebox.showwarning("Stock", f"Only {product.stock if product else 0} available.")
             return
         current['qty'] = new_qty
         current['subtotal'] = current['price'] * new_qty
@@ -729,6 +839,7 @@ class CustomerSelector(tk.Toplevel):
         self.title("Select / Add Customer")
         self.geometry("560x420")
         self.selected_customer = None
+        self.customers = parent.app.customers
 
         top = ttk.Frame(self)
         top.pack(fill="x", padx=8, pady=6)
@@ -747,27 +858,26 @@ class CustomerSelector(tk.Toplevel):
         btns.pack(fill="x", padx=8, pady=6)
         ttk.Button(btns, text="Select", command=self.select).pack(side="left", padx=4)
         ttk.Button(btns, text="Add New", command=self.add_new).pack(side="left", padx=4)
+        ttk.Button(btns, text="Import CSV...", command=self.import_csv).pack(side="left", padx=4)
         ttk.Button(btns, text="Close", command=self.destroy).pack(side="right", padx=4)
 
         self.load_all()
 
-    def load_all(self):
+    def show(self, customers):
         for i in self.tree.get_children():
             self.tree.delete(i)
-        rows = db_query("SELECT id,name,phone,email,loyalty_points FROM customers ORDER BY id DESC", fetch=True) or []
-        for r in rows:
-            self.tree.insert("", "end", values=(r['id'], r['name'], r['phone'] or "", r['email'] or "", r['loyalty_points'] or 0))
+        for c in customers:
+            self.tree.insert("", "end", values=(c.id, c.name, c.phone or "", c.email or "", c.loyalty_points))
+
+    def load_all(self):
+        self.show(self.customers.search())
 
     def search(self):
         t = self.svar.get().strip()
         if not t:
             self.load_all()
             return
-        rows = db_query("SELECT id,name,phone,email,loyalty_points FROM customers WHERE name LIKE ? OR phone LIKE ? ORDER BY id DESC", (f"%{t}%", f"%{t}%"), fetch=True) or []
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        for r in rows:
-            self.tree.insert("", "end", values=(r['id'], r['name'], r['phone'] or "", r['email'] or "", r['loyalty_points'] or 0))
+        self.show(self.customers.search(t))
 
     def select(self):
         sel = self.tree.selection()
@@ -784,14 +894,50 @@ class CustomerSelector(tk.Toplevel):
             return
         phone = simpledialog.askstring("Phone", "Phone (optional):")
         email = simpledialog.askstring("Email", "Email (optional):")
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("INSERT INTO customers (name, phone, email) VALUES (?, ?, ?)", (name, phone, email))
-        conn.commit()
-        conn.close()
+        try:
+            self.customers.add(name, phone, email)
+        except services.DuplicateCustomer as e:
+            if not messagebox.askyesno("Duplicate", f"{e} Add anyway?", parent=self):
+                return
+            self.customers.add(name, phone, email, allow_duplicate=True)
         messagebox.showinfo("Added", "Customer added.")
         self.load_all()
 
+    def import_csv(self):
+        """Bulk add customers from a CSV off the UI thread, skipping ones already on file."""
+        fn = filedialog.askopenfilename(parent=self, filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not fn:
+            return
+        result = []
+
+        def work():
+            try:
+                result.append(customer_import.import_csv_sqlite(fn, DB_FILE))
+            except Exception as e:
+                result.append(e)
+
+        threading.Thread(target=work, daemon=True).start()
+        self.after(250, self._poll_import, result)
+
+    def _poll_import(self, result):
+        if not result:
+            self.after(250, self._poll_import, result)
+            return
+        report = result[0]
+        if isinstance(report, Exception):
+            messagebox.showerror("Import Error", f"Failed to import customers: {report}", parent=self)
+            return
+        self.load_all()
+        msg = report.summary()
+        for line_no, reason, _ in report.rejects[:10]:
+            msg += f"\n  line {line_no}: {reason}"
+        if report.rejects and messagebox.askyesno("Import Finished", msg + "\n\nSave rejected rows to a CSV?", parent=self):
+            out = filedialog.asksaveasfilename(parent=self, defaultextension=".csv", initialfile="customer_rejects.csv")
+            if out:
+                report.write_rejects(out)
+        elif not report.rejects:
+            messagebox.showinfo("Import Finished", msg, parent=self)
+
 
 # ---------- Quick Product Manager (light weight) ----------
 class ProductQuickManager(tk.Toplevel):
@@ -819,6 +965,7 @@ class ProductQuickManager(tk.Toplevel):
         self.barcode_e = ttk.Entry(form, width=30); self.barcode_e.grid(row=4, column=1, padx=4, pady=3)
 
         ttk.Button(self, text="Add Product", command=self.add_product).pack(pady=6)
+        ttk.Button(self, text="Import CSV...", command=self.import_csv).pack(pady=6)
         ttk.Button(self, text="Close", command=self.destroy).pack(pady=6)
 
     def add_product(self):
@@ -848,6 +995,41 @@ class ProductQuickManager(tk.Toplevel):
         self.app.product_search_frame.load_all()
         self.destroy()
 
+    def import_csv(self):
+        """Bulk insert/update products from a supplier CSV off the UI thread."""
+        fn = filedialog.askopenfilename(parent=self, filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not fn:
+            return
+        result = []
+
+        def work():
+            try:
+                result.append(product_import.import_csv_sqlite(fn, DB_FILE))
+            except Exception as e:
+                result.append(e)
+
+        threading.Thread(target=work, daemon=True).start()
+        self.after(250, self._poll_import, result)
+
+    def _poll_import(self, result):
+        if not result:
+            self.after(250, self._poll_import, result)
+            return
+        report = result[0]
+        if isinstance(report, Exception):
+            messagebox.showerror("Import Error", f"Failed to import products: {report}", parent=self)
+            return
+        self.app.product_search_frame.load_all()
+        msg = report.summary()
+        for line_no, reason, _ in report.rejects[:10]:
+            msg += f"\n  line {line_no}: {reason}"
+        if report.rejects and messagebox.askyesno("Import Finished", msg + "\n\nSave rejected rows to a CSV?", parent=self):
+            out = filedialog.asksaveasfilename(parent=self, defaultextension=".csv", initialfile="import_rejects.csv")
+            if out:
+                report.write_rejects(out)
+        elif not report.rejects:
+            messagebox.showinfo("Import Finished", msg, parent=self)
+
 
 # ---------- Run ----------
 if __name__ == "__main__":
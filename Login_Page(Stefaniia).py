@@ -1,7 +1,8 @@
 import tkinter as tk
 from tkinter import messagebox
-import json
-import os
+
+from user_store import UserStore
+import password_hashing
 
 # ---------- COLORS / STYLE ----------
 BG_GRADIENT = "#0e0e10"       # фон окна (почти чёрный с фиолетовым)
@@ -15,7 +16,7 @@ USERS_FILE = "users.json"     # файл, куда сохраняем польз
 
 current_role = None
 LOGO = None
-USERS = {}  # сюда загрузим пользователей
+STORE = None  # UserStore: снапшот users.json + журнал изменений
 
 
 # ======================================================
@@ -23,36 +24,11 @@ USERS = {}  # сюда загрузим пользователей
 # ======================================================
 def load_users():
     """
-    Загружаем пользователей из users.json.
-    Если файла нет или он битый — создаём дефолтных.
+    Открываем хранилище пользователей (users.json + users.json.journal).
+    Если файла нет или он битый — создаются дефолтные пользователи.
     """
-    global USERS
-
-    if os.path.exists(USERS_FILE):
-        try:
-            with open(USERS_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            if isinstance(data, dict) and "admin" in data and "staff" in data:
-                USERS = data
-                return
-        except Exception:
-            pass  # если фигня с файлом — игнорим и создаём новых
-
-    # дефолтные пользователи
-    USERS = {
-        "admin": {"admin": "1234"},
-        "staff": {"staff": "5678"}
-    }
-    save_users()
-
-
-def save_users():
-    """Сохраняем словарь USERS в JSON-файл."""
-    try:
-        with open(USERS_FILE, "w", encoding="utf-8") as f:
-            json.dump(USERS, f, indent=4)
-    except Exception as e:
-        print("Error saving users:", e)
+    global STORE
+    STORE = UserStore(USERS_FILE)
 
 
 # ======================================================
@@ -212,7 +188,7 @@ def open_create_account_window(role):
         if not username or not password or not confirm:
             lbl_msg.config(text="All fields are required.")
             return
-        if username in USERS[role]:
+        if STORE.exists(role, username):
             lbl_msg.config(text="Username already exists.")
             return
         if password != confirm:
@@ -222,8 +198,10 @@ def open_create_account_window(role):
             lbl_msg.config(text="Password must be at least 4 characters.")
             return
 
-        USERS[role][username] = password
-        save_users()
+        # одна строка в журнал вместо перезаписи всего файла
+        if not STORE.create_user(role, username, password_hashing.hash_password(password)):
+            lbl_msg.config(text="Username already exists.")
+            return
         messagebox.showinfo("Account created",
                             f"New {role} account '{username}' created successfully.")
         win.destroy()
@@ -322,11 +300,13 @@ def open_change_password_window(role):
             lbl_msg.config(text="All fields are required.")
             return
 
-        if username not in USERS[role]:
+        if not STORE.exists(role, username):
             lbl_msg.config(text="User not found.")
             return
 
-        if USERS[role][username] != old:
+        stored = STORE.get(role, username)
+        ok, _ = password_hashing.check_password(old, stored)
+        if not ok:
             lbl_msg.config(text="Current password is incorrect.")
             return
 
@@ -338,8 +318,9 @@ def open_change_password_window(role):
             lbl_msg.config(text="New password must be at least 4 characters.")
             return
 
-        USERS[role][username] = new
-        save_users()
+        if not STORE.set_password(role, username, password_hashing.hash_password(new), expected=stored):
+            lbl_msg.config(text="Password was changed or user removed meanwhile. Try again.")
+            return
         messagebox.showinfo("Password changed",
                             "Password updated successfully.")
         win.destroy()
@@ -471,7 +452,13 @@ def open_login_window(role):
         password = entry_pass.get()
         lbl_error.config(text="")
 
-        if username in USERS[role] and USERS[role][username] == password:
+        stored = STORE.get(role, username)
+        ok, new_hash = password_hashing.check_password(password, stored)
+        if ok:
+            # старые пароли (открытым текстом) пересохраняем в виде хэша,
+            # только если пароль тем временем не сменили в другом окне
+            if new_hash:
+                STORE.set_password(role, username, new_hash, expected=stored)
             messagebox.showinfo("Welcome",
                                 f"Welcome to Nexus, {role.capitalize()}!")
         else:
@@ -1,8 +1,43 @@
+import time
+import threading
+import dataclasses
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import mysql.connector
-from mysql.connector import Error
-import hashlib
+from mysql.connector import Error, pooling
+import password_hashing
+
+from Customer import CustomerManagementSystem
+import inventory_classes
+import product_import
+import repricing
+import receiving
+import query_metrics
+import query_metrics_window
+import ui_monitor
+import action_profiler
+import metrics_exporter
+import services
+import pos_client
+import sale_journal
+
+class PooledConnection:
+    """A pooled connection that tells its system when close() hands it back (for pool_idle)."""
+
+    def __init__(self, conn, system):
+        self._conn = conn
+        self._system = system
+        self._returned = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if not self._returned:
+            self._returned = True
+            self._system.pool_returned()
+        self._conn.close()
+
 
 class NexusTechSystem:
     def __init__(self):
@@ -15,16 +50,209 @@ class NexusTechSystem:
         self.current_user = None
         self.user_role = None
         self.LOW_STOCK_THRESHOLD = 10
+        self.POOL_SIZE = 5
+        self.pool = None          # created on first use, kept for the life of the process
+        self.pool_in_use = 0      # pooled connections handed out and not yet closed
+        self.pool_lock = threading.Lock()
+        self.catalog = None       # cached product list, see get_catalog()
+        self.OFFLINE_RETRY_S = 30
+        self.offline = False      # database unreachable: sales go to the offline journal, see go_offline()
+        self.offline_sales = sale_journal.OfflineSales()
+        self.syncing = False
+        self.offline_labels = []  # one per dashboard header, see offline_banner()
+        self.root = None          # single hidden Tk root; every window is a Toplevel of it
+        self.windows = {}         # role -> dashboard, built once and reused across logins
+        self.login_window = None
         
     def get_connection(self):
+        # conn.close() hands a pooled connection back instead of closing the socket
+        if self.offline:
+            return None  # no connect timeout per click while offline (the dashboard banner says so); sync_offline_sales() reconnects
+        started = time.perf_counter()
         try:
-            return mysql.connector.connect(**self.db_config)
+            if self.pool is None:
+                self.pool = pooling.MySQLConnectionPool(pool_name='nexus_pool', pool_size=self.POOL_SIZE,
+                                                        **self.db_config)
+            conn = self.pool.get_connection()
+            with self.pool_lock:
+                self.pool_in_use += 1
+            acquired = time.perf_counter() - started
+            metrics_exporter.DB_ACQUIRE_SECONDS.observe('nexus', 'pool', value=acquired)
+            return PooledConnection(query_metrics.instrument(conn, 'nexus', acquired), self)
+        except pooling.PoolError:
+            # every pooled connection is busy - fall back to a one-off connection
+            metrics_exporter.DB_ERRORS.inc('nexus', 'pool_exhausted')
+            try:
+                conn = mysql.connector.connect(**self.db_config)
+                acquired = time.perf_counter() - started
+                metrics_exporter.DB_ACQUIRE_SECONDS.observe('nexus', 'direct', value=acquired)
+                return query_metrics.instrument(conn, 'nexus', acquired)
+            except Error as e:
+                self.go_offline(e)
+                return None
         except Error as e:
-            messagebox.showerror("Database Error", f"Error connecting to database: {e}")
+            self.go_offline(e)
+            return None
+
+    def go_offline(self, error):
+        """Stop trying the database on every click; keep selling from the cached catalog."""
+        metrics_exporter.DB_ERRORS.inc('nexus', 'connect')
+        if self.root is None:
+            messagebox.showerror("Database Error", f"Error connecting to database: {error}")
+            return
+        self.offline = True
+        self.show_offline_state()
+        messagebox.showerror("Database Error", f"Error connecting to database: {error}\n\n"
+                                               f"Working offline: checkouts are saved on this computer and "
+                                               f"uploaded when the database is back.")
+        self.root.after(self.OFFLINE_RETRY_S * 1000, self.sync_offline_sales)
+
+    def sync_offline_sales(self):
+        """
+        Connect in the background, replay the offline journal, then go back online.
+        While the database is still unreachable, try again every OFFLINE_RETRY_S.
+        """
+        if self.syncing:
+            return
+        self.syncing = True
+        result = {}
+
+        def work():
+            try:
+                conn = mysql.connector.connect(**self.db_config)
+                try:
+                    result['replayed'] = self.offline_sales.replay(conn)
+                finally:
+                    conn.close()
+                result['left'] = len(self.offline_sales.pending())  # journaled while the replay ran
+            except Exception as e:
+                result['error'] = e
+
+        def poll():
+            if thread.is_alive():
+                self.root.after(250, poll)
+                return
+            self.syncing = False
+            if 'error' in result:
+                if self.offline:
+                    self.root.after(self.OFFLINE_RETRY_S * 1000, self.sync_offline_sales)
+                else:
+                    messagebox.showerror("Offline Sales", f"Could not upload offline sales: {result['error']}")
+                return
+            was_offline, self.offline = self.offline, False
+            self.show_offline_state()
+            if result['replayed']:
+                self.invalidate_catalog()
+            if was_offline or result['replayed']:
+                messagebox.showinfo("Back Online", f"Database connection restored.\n"
+                                                   f"{result['replayed']} offline sale(s) uploaded.")
+            if result['left']:
+                self.sync_offline_sales()
+
+        thread = threading.Thread(target=work, daemon=True)
+        thread.start()
+        self.root.after(250, poll)
+
+    def offline_banner(self, header):
+        """Add the offline indicator to a dashboard header; show_offline_state() keeps it current."""
+        label = tk.Label(header, font=('Arial', 12, 'bold'), bg='#2c3e50', fg='#e67e22')
+        label.pack(side='left', padx=20)
+        self.offline_labels.append(label)
+        self.show_offline_state()
+
+    def show_offline_state(self):
+        text = ""
+        if self.offline:
+            text = f"OFFLINE - {len(self.offline_sales.pending())} sale(s) saved on this computer"
+            if self.catalog is None:
+                text += ", product catalog not available"
+        for label in self.offline_labels:
+            label.config(text=text)
+
+    def cached_product(self, product_id):
+        """services.Product from the cached catalog (offline add-to-cart), or None."""
+        for pid, name, category, price, stock in self.catalog or []:
+            if pid == product_id:
+                return services.Product(pid, name, float(price), stock, category)
+        return None
+
+    def sold_offline(self, lines):
+        """Take an offline sale's quantities off the cached catalog so stock checks stay right."""
+        sold = {}
+        for line in lines:
+            sold[line.name] = sold.get(line.name, 0) + line.qty
+        self.catalog = [(pid, name, category, price, stock - sold.get(name, 0))
+                        for pid, name, category, price, stock in self.catalog or []]
+
+    def pool_returned(self):
+        with self.pool_lock:
+            self.pool_in_use -= 1
+
+    def pool_idle(self):
+        """Connections sitting idle in the pool (None before the pool exists)."""
+        if self.pool is None:
             return None
+        with self.pool_lock:
+            return self.POOL_SIZE - self.pool_in_use
+    
+    def get_catalog(self, refresh=False):
+        """
+        Products as (product_id, product_name, category_name, product_price, product_number)
+        Cached across windows and sessions; pass refresh=True after changing products.
+        """
+        if self.catalog is None or refresh:
+            conn = self.get_connection()
+            if not conn:
+                return self.catalog or []
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT p.product_id, p.product_name, c.category_name, p.product_price, p.product_number
+                    FROM Product_Details p
+                    JOIN Product_Category c ON p.category_id = c.category_id
+                """)
+                self.catalog = cursor.fetchall()
+            finally:
+                conn.close()
+        return self.catalog
+    
+    def invalidate_catalog(self):
+        self.catalog = None
+    
+    # ---------- Session handling ----------
+    def run(self):
+        self.root = tk.Tk()
+        self.root.withdraw()
+        ui_monitor.install(self.root, 'nexus')  # covers every Toplevel of this root
+        action_profiler.install(self.root, 'nexus')
+        metrics_exporter.gauge('nexus_db_pool_size', 'Configured MySQL pool size', lambda: self.POOL_SIZE)
+        metrics_exporter.gauge('nexus_db_pool_idle_connections', 'Idle connections in the MySQL pool', self.pool_idle)
+        metrics_exporter.start(self.root, 'nexus')
+        if self.offline_sales.pending():
+            self.root.after(1000, self.sync_offline_sales)  # left over from a session that ended offline
+        self.login_window = LoginWindow(self)
+        self.root.mainloop()
+    
+    def open_dashboard(self):
+        """Show the dashboard for the logged in role, building it only the first time."""
+        window = self.windows.get(self.user_role)
+        if window is None:
+            window_class = AdminWindow if self.user_role == "Admin" else StaffWindow
+            self.windows[self.user_role] = window_class(self)
+        else:
+            window.start_session()
+    
+    def logout(self):
+        # keep the pool, caches and built windows; only the user context changes
+        self.current_user = None
+        self.user_role = None
+        self.login_window.show()
+    
+    def quit(self):
+        self.root.destroy()
     
     def hash_password(self, password):
-        return hashlib.sha256(password.encode()).hexdigest()
+        return password_hashing.hash_password(password)
     
     def check_low_stock(self):
         conn = self.get_connection()
@@ -61,16 +289,24 @@ class NexusTechSystem:
         
         try:
             cursor = conn.cursor()
-            hashed_pwd = self.hash_password(password)
             
             if role == "Staff":
-                cursor.execute("SELECT staff_id, staff_name FROM Staff_Details WHERE staff_name = %s AND staff_password = %s",
-                              (username, hashed_pwd))
+                cursor.execute("SELECT staff_id, staff_name, staff_password FROM Staff_Details WHERE staff_name = %s",
+                              (username,))
             else:  # Admin
-                cursor.execute("SELECT staff_id, staff_name FROM Staff_Details WHERE staff_name = %s AND staff_password = %s AND staff_id = 1",
-                              (username, hashed_pwd))
+                cursor.execute("SELECT staff_id, staff_name, staff_password FROM Staff_Details WHERE staff_name = %s AND staff_id = 1",
+                              (username,))
             
             result = cursor.fetchone()
+            if result:
+                ok, new_hash = password_hashing.check_password(password, result[2])
+                if not ok:
+                    result = None
+                elif new_hash:
+                    # upgrade legacy SHA-256 / low-cost hashes on successful login
+                    cursor.execute("UPDATE Staff_Details SET staff_password = %s WHERE staff_id = %s",
+                                  (new_hash, result[0]))
+                    conn.commit()
             conn.close()
             
             if result:
@@ -86,7 +322,13 @@ class NexusTechSystem:
 class AdminWindow:
     def __init__(self, system):
         self.system = system
-        self.root = tk.Tk()
+        self.reports = services.NexusReports(system.get_connection)
+        try:
+            self.reports.ensure_schema()
+        except services.DatabaseUnavailable:
+            pass  # retried by the first sales summary
+        self.root = tk.Toplevel(system.root)
+        self.root.protocol("WM_DELETE_WINDOW", system.quit)
         self.root.title("Nexus Tech - Admin Dashboard")
         self.root.geometry("1200x700")
         self.root.configure(bg='#ecf0f1')
@@ -94,9 +336,11 @@ class AdminWindow:
         # Header
         header = tk.Frame(self.root, bg='#2c3e50', height=60)
         header.pack(fill='x')
-        tk.Label(header, text=f"Admin: {system.current_user}", font=('Arial', 16, 'bold'),
-                bg='#2c3e50', fg='#ecf0f1').pack(side='left', padx=20, pady=15)
+        self.header_label = tk.Label(header, text=f"Admin: {system.current_user}", font=('Arial', 16, 'bold'),
+                                     bg='#2c3e50', fg='#ecf0f1')
+        self.header_label.pack(side='left', padx=20, pady=15)
         tk.Button(header, text="Logout", command=self.logout, bg='#e74c3c', fg='white').pack(side='right', padx=20)
+        system.offline_banner(header)
         
         # Notebook
         self.notebook = ttk.Notebook(self.root)
@@ -108,8 +352,6 @@ class AdminWindow:
         self.create_customers_tab()
         self.create_reports_tab()
         self.create_customer_history_tab()
-        
-        self.root.mainloop()
     
     def create_categories_tab(self):
         tab = tk.Frame(self.notebook, bg='#ecf0f1')
@@ -196,6 +438,7 @@ class AdminWindow:
                 messagebox.showinfo("Success", "Category added successfully")
                 self.clear_category_form()
                 self.refresh_categories()
+                self.system.invalidate_catalog()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to add category: {str(e)}")
                 conn.close()
@@ -226,6 +469,7 @@ class AdminWindow:
                 messagebox.showinfo("Success", "Category updated successfully")
                 self.clear_category_form()
                 self.refresh_categories()
+                self.system.invalidate_catalog()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to update category: {str(e)}")
                 conn.close()
@@ -259,6 +503,7 @@ class AdminWindow:
                     messagebox.showinfo("Success", "Category deleted successfully")
                     self.clear_category_form()
                     self.refresh_categories()
+                    self.system.invalidate_catalog()
                 except Exception as e:
                     messagebox.showerror("Error", f"Failed to delete category: {str(e)}")
                     conn.close()
@@ -301,6 +546,9 @@ class AdminWindow:
         tk.Button(btn_frame, text="Update Product", command=self.update_product, bg='#f39c12', fg='white', width=15).pack(side='left', padx=5)
         tk.Button(btn_frame, text="Delete Product", command=self.delete_product, bg='#e74c3c', fg='white', width=15).pack(side='left', padx=5)
         tk.Button(btn_frame, text="Clear", command=self.clear_product_form, bg='#95a5a6', fg='white', width=15).pack(side='left', padx=5)
+        tk.Button(btn_frame, text="Import CSV", command=self.import_products, bg='#3498db', fg='white', width=15).pack(side='left', padx=5)
+        tk.Button(btn_frame, text="Bulk Reprice", command=self.bulk_reprice, bg='#8e44ad', fg='white', width=15).pack(side='left', padx=5)
+        tk.Button(btn_frame, text="Receive Stock", command=self.receive_stock, bg='#16a085', fg='white', width=15).pack(side='left', padx=5)
         
         # Products List
         list_frame = tk.Frame(tab, bg='#ecf0f1')
@@ -411,22 +659,14 @@ class AdminWindow:
             except:
                 conn.close()
     
-    def refresh_products(self):
+    def refresh_products(self, refresh=True):
+        # refresh=False shows the shared catalog cache without a round trip
         self.products_tree.delete(*self.products_tree.get_children())
-        conn = self.system.get_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT p.product_id, p.product_name, c.category_name, p.product_price, p.product_number
-                    FROM Product_Details p
-                    JOIN Product_Category c ON p.category_id = c.category_id
-                """)
-                for row in cursor.fetchall():
-                    self.products_tree.insert('', 'end', values=row)
-                conn.close()
-            except:
-                conn.close()
+        try:
+            for row in self.system.get_catalog(refresh):
+                self.products_tree.insert('', 'end', values=row)
+        except Error:
+            pass
     
     def refresh_customers(self):
         self.customers_tree.delete(*self.customers_tree.get_children())
@@ -467,6 +707,47 @@ class AdminWindow:
             self.cust_points.delete(0, 'end')
             self.cust_points.insert(0, values[5])
     
+    def bulk_reprice(self):
+        conn = self.system.get_connection()
+        if not conn:
+            return
+        # several selected rows: reprice just those, otherwise by category / filter / price list
+        selected = self.products_tree.selection()
+        ids = [self.products_tree.item(i)['values'][0] for i in selected] if len(selected) > 1 else None
+        repricing.RepriceWindow(self.root, conn, on_applied=self.after_catalog_change, owns_conn=True,
+                                changed_by=self.system.current_user, product_ids=ids)
+    
+    def after_catalog_change(self):
+        self.system.invalidate_catalog()
+        self.refresh_products()
+    
+    def receive_stock(self):
+        conn = self.system.get_connection()
+        if not conn:
+            return
+        receiving.ReceivingWindow(self.root, conn, staff=self.system.current_user,
+                                  on_posted=self.after_catalog_change, owns_conn=True)
+    
+    def import_products(self):
+        path = filedialog.askopenfilename(parent=self.root, filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+        conn = self.system.get_connection()
+        if not conn:
+            return
+        try:
+            report = product_import.import_csv_mysql(path, conn)
+        except Exception as e:
+            messagebox.showerror("Error", f"Import failed: {e}")
+            return
+        finally:
+            conn.close()
+        self.system.invalidate_catalog()
+        self.load_categories()
+        self.refresh_products()
+        details = '\n'.join(f"line {line_no}: {reason}" for line_no, reason, _ in report.rejects[:10])
+        messagebox.showinfo("Import Finished", report.summary() + ('\n\n' + details if details else ''))
+    
     def add_product(self):
         name = self.prod_name.get()
         category = self.prod_category.get()
@@ -679,6 +960,19 @@ class AdminWindow:
         tk.Button(btn_frame, text="Customer Report", command=self.show_customer_report, 
                  bg='#9b59b6', fg='white', width=20, height=2).pack(side='left', padx=10)
         
+        # ABC/XYZ class filter for the sales summary
+        class_frame = tk.Frame(tab, bg='#ecf0f1')
+        class_frame.pack()
+        tk.Label(class_frame, text="ABC/XYZ Class:", bg='#ecf0f1').pack(side='left', padx=5)
+        self.class_filter = ttk.Combobox(class_frame, values=inventory_classes.CLASS_FILTERS, width=8, state='readonly')
+        self.class_filter.set('All')
+        self.class_filter.pack(side='left', padx=5)
+        self.class_filter.bind('<<ComboboxSelected>>', lambda e: self.show_sales_summary())
+        tk.Button(class_frame, text="Classify Products", command=self.classify_products,
+                 bg='#16a085', fg='white').pack(side='left', padx=5)
+        tk.Button(class_frame, text="Query Stats", command=lambda: query_metrics_window.WorstQueriesWindow(self.root),
+                 bg='#7f8c8d', fg='white').pack(side='left', padx=5)
+        
         # Report display area
         report_frame = tk.LabelFrame(tab, text="Report Details", bg='#ecf0f1', padx=10, pady=10)
         report_frame.pack(fill='both', expand=True, padx=10, pady=10)
@@ -719,29 +1013,60 @@ class AdminWindow:
         
         self.history_text = tk.Text(history_frame, bg='white')
         self.history_text.pack(fill='both', expand=True)
+        
+        nav_frame = tk.Frame(history_frame, bg='#ecf0f1')
+        nav_frame.pack(fill='x', pady=5)
+        self.history_newer_btn = tk.Button(nav_frame, text="< Newer", command=self.newer_history_page,
+                                           state='disabled', width=10)
+        self.history_newer_btn.pack(side='left', padx=5)
+        self.history_older_btn = tk.Button(nav_frame, text="Older >", command=self.older_history_page,
+                                           state='disabled', width=10)
+        self.history_older_btn.pack(side='left', padx=5)
+        self.history_page_label = tk.Label(nav_frame, text="", bg='#ecf0f1')
+        self.history_page_label.pack(side='left', padx=10)
+        
+        self.history_customer_id = None
+        self.history_keys = [None]
+        self.history_next_key = None
+    
+    def fill_report(self, report, *args):
+        """Show the rows of a services.NexusReports method in the report tree."""
+        try:
+            rows = report(*args)
+        except services.DatabaseUnavailable:
+            return  # get_connection has already reported it
+        for row in rows:
+            self.report_tree.insert('', 'end', values=dataclasses.astuple(row))
     
     def show_sales_summary(self):
         self.report_tree.delete(*self.report_tree.get_children())
-        self.report_tree['columns'] = ('Product', 'Category', 'Price', 'Stock')
+        self.report_tree['columns'] = ('Product', 'Category', 'Price', 'Stock', 'Revenue', 'Class')
         self.report_tree['show'] = 'headings'
         
         self.report_tree.heading('Product', text='Product Name')
         self.report_tree.heading('Category', text='Category')
         self.report_tree.heading('Price', text='Price')
         self.report_tree.heading('Stock', text='Current Stock')
+        self.report_tree.heading('Revenue', text='Revenue')
+        self.report_tree.heading('Class', text='ABC/XYZ')
         
+        self.fill_report(self.reports.sales_summary, self.class_filter.get())
+    
+    def classify_products(self):
         conn = self.system.get_connection()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT p.product_name, c.category_name, p.product_price, p.product_number
-                FROM Product_Details p
-                JOIN Product_Category c ON p.category_id = c.category_id
-                ORDER BY p.product_name
-            """)
-            for row in cursor.fetchall():
-                self.report_tree.insert('', 'end', values=row)
+        if not conn:
+            return
+        try:
+            stats = inventory_classes.classify_mysql(conn)
+        except Exception as e:
+            messagebox.showerror("Error", f"Classification failed: {e}")
+            return
+        finally:
             conn.close()
+        summary = '\n'.join(f"{cls}: {n}" for cls, n in stats['classes'].items())
+        messagebox.showinfo("Products Classified",
+                           f"{stats['products']} products in {stats['seconds']:.2f}s\n\n{summary}")
+        self.show_sales_summary()
     
     def show_low_stock(self):
         self.report_tree.delete(*self.report_tree.get_children())
@@ -753,24 +1078,7 @@ class AdminWindow:
         self.report_tree.heading('Stock', text='Stock Level')
         self.report_tree.heading('Status', text='Status')
         
-        conn = self.system.get_connection()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT p.product_name, c.category_name, p.product_number,
-                CASE 
-                    WHEN p.product_number = 0 THEN 'OUT OF STOCK'
-                    WHEN p.product_number < 10 THEN 'LOW STOCK'
-                    ELSE 'REORDER SOON'
-                END as status
-                FROM Product_Details p
-                JOIN Product_Category c ON p.category_id = c.category_id
-                WHERE p.product_number < 20
-                ORDER BY p.product_number
-            """)
-            for row in cursor.fetchall():
-                self.report_tree.insert('', 'end', values=row)
-            conn.close()
+        self.fill_report(self.reports.low_stock)
     
     def show_customer_report(self):
         self.report_tree.delete(*self.report_tree.get_children())
@@ -783,17 +1091,7 @@ class AdminWindow:
         self.report_tree.heading('Contact', text='Contact')
         self.report_tree.heading('Email', text='Email')
         
-        conn = self.system.get_connection()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT customer_name, customer_type, loyalty_points, customer_contact, customer_email
-                FROM Customer_Details
-                ORDER BY loyalty_points DESC
-            """)
-            for row in cursor.fetchall():
-                self.report_tree.insert('', 'end', values=row)
-            conn.close()
+        self.fill_report(self.reports.customers)
     
     def load_customers_for_history(self):
         conn = self.system.get_connection()
@@ -829,20 +1127,68 @@ class AdminWindow:
                 info += f"Loyalty Points: {cust_data[5]}\n"
                 self.customer_info.insert('1.0', info)
                 
-                self.history_text.delete('1.0', 'end')
-                self.history_text.insert('1.0', "Purchase history functionality can be extended by creating a Transactions table.\nThis would store all checkout records with timestamps and product details.")
+                self.history_customer_id = customer_id
+                self.history_keys = [None]
+                self.load_history_page()
+    
+    def load_history_page(self):
+        conn = self.system.get_connection()
+        if not conn:
+            return
+        try:
+            cms = CustomerManagementSystem(conn)
+            transactions, self.history_next_key = cms.get_transaction_history_page(
+                self.history_customer_id, self.history_keys[-1])
+        finally:
+            conn.close()
+        
+        self.history_text.delete('1.0', 'end')
+        if not transactions and len(self.history_keys) == 1:
+            self.history_text.insert('1.0', "No purchases recorded for this customer.")
+        for t_id, t_date, amount, items, discount, method in transactions:
+            self.history_text.insert('end', f"#{t_id}  {t_date}  ${float(amount):.2f}  "
+                                            f"(discount ${float(discount or 0):.2f}, {method or 'N/A'})\n")
+            if items:
+                self.history_text.insert('end', f"    {items}\n")
+        
+        self.history_page_label.config(text=f"Page {len(self.history_keys)}")
+        self.history_newer_btn.config(state='normal' if len(self.history_keys) > 1 else 'disabled')
+        self.history_older_btn.config(state='normal' if self.history_next_key else 'disabled')
+    
+    def older_history_page(self):
+        if self.history_next_key:
+            self.history_keys.append(self.history_next_key)
+            self.load_history_page()
+    
+    def newer_history_page(self):
+        if len(self.history_keys) > 1:
+            self.history_keys.pop()
+            self.load_history_page()
+    
+    def start_session(self):
+        """Reuse this dashboard for the next admin: swap the user and reload data."""
+        self.header_label.config(text=f"Admin: {self.system.current_user}")
+        self.refresh_categories()
+        self.load_categories()
+        self.refresh_products(refresh=False)
+        self.refresh_customers()
+        self.load_customers_for_history()
+        self.root.deiconify()
     
     def logout(self):
         if messagebox.askyesno("Logout", "Are you sure you want to logout?"):
-            self.root.destroy()
-            system = NexusTechSystem()
-            login_window = LoginWindow(system)
-            login_window.root.mainloop()
+            # clear what the previous admin was looking at, then hide (not destroy) the window
+            self.history_customer.set('')
+            self.customer_info.delete('1.0', 'end')
+            self.history_text.delete('1.0', 'end')
+            self.root.withdraw()
+            self.system.logout()
 
 class LoginWindow:
     def __init__(self, system):
         self.system = system
-        self.root = tk.Tk()
+        self.root = tk.Toplevel(system.root)
+        self.root.protocol("WM_DELETE_WINDOW", system.quit)
         self.root.title("Nexus Tech - Login")
         self.root.geometry("400x300")
         self.root.configure(bg='#2c3e50')
@@ -884,21 +1230,34 @@ class LoginWindow:
             return
         
         if self.system.login(username, password, role):
-            self.root.destroy()
+            self.root.withdraw()
             print(f"Login successful! Role: {role}")  # Debug print
-            if role == "Admin":
-                print("Opening Admin Window")  # Debug print
-                admin_win = AdminWindow(self.system)
-            else:
-                print("Opening Staff Window")  # Debug print
-                staff_win = StaffWindow(self.system)
+            self.system.open_dashboard()
         else:
             messagebox.showerror("Error", "Invalid credentials")
+    
+    def show(self):
+        # the window is reused for every login; clear the previous user's input
+        self.username_entry.delete(0, 'end')
+        self.password_entry.delete(0, 'end')
+        self.root.deiconify()
+        self.username_entry.focus_set()
 
 class StaffWindow:
     def __init__(self, system):
         self.system = system
-        self.root = tk.Tk()
+        server = pos_client.from_env()  # NEXUS_POS_SERVER: checkouts through pos_server.py --nexus
+        if server:
+            self.inventory, self.checkout_service = server.nexus_inventory, server.nexus_checkout
+        else:
+            self.inventory = services.NexusInventory(system.get_connection)
+            self.checkout_service = services.NexusCheckout(system.get_connection)
+            try:
+                self.checkout_service.ensure_schema()  # Transaction_History/Items for the customer history
+            except services.DatabaseUnavailable:
+                pass  # retried by the first checkout
+        self.root = tk.Toplevel(system.root)
+        self.root.protocol("WM_DELETE_WINDOW", system.quit)
         self.root.title("Nexus Tech - Staff Dashboard")
         self.root.geometry("1200x700")
         self.root.configure(bg='#ecf0f1')
@@ -906,9 +1265,11 @@ class StaffWindow:
         # Header
         header = tk.Frame(self.root, bg='#2c3e50', height=60)
         header.pack(fill='x')
-        tk.Label(header, text=f"Welcome, {system.current_user}", font=('Arial', 16, 'bold'),
-                bg='#2c3e50', fg='#ecf0f1').pack(side='left', padx=20, pady=15)
+        self.header_label = tk.Label(header, text=f"Welcome, {system.current_user}", font=('Arial', 16, 'bold'),
+                                     bg='#2c3e50', fg='#ecf0f1')
+        self.header_label.pack(side='left', padx=20, pady=15)
         tk.Button(header, text="Logout", command=self.logout, bg='#e74c3c', fg='white').pack(side='right', padx=20)
+        system.offline_banner(header)
         
         # Notebook for tabs
         self.notebook = ttk.Notebook(self.root)
@@ -918,8 +1279,6 @@ class StaffWindow:
         self.create_products_tab()
         self.create_customers_tab()
         self.create_checkout_tab()
-        
-        self.root.mainloop()
     
     def create_products_tab(self):
         tab = tk.Frame(self.notebook, bg='#ecf0f1')
@@ -954,6 +1313,9 @@ class StaffWindow:
         tk.Button(btn_frame, text="Update Product", command=self.update_product, bg='#f39c12', fg='white', width=15).pack(side='left', padx=5)
         tk.Button(btn_frame, text="Delete Product", command=self.delete_product, bg='#e74c3c', fg='white', width=15).pack(side='left', padx=5)
         tk.Button(btn_frame, text="Clear", command=self.clear_product_form, bg='#95a5a6', fg='white', width=15).pack(side='left', padx=5)
+        tk.Button(btn_frame, text="Import CSV", command=self.import_products, bg='#3498db', fg='white', width=15).pack(side='left', padx=5)
+        tk.Button(btn_frame, text="Bulk Reprice", command=self.bulk_reprice, bg='#8e44ad', fg='white', width=15).pack(side='left', padx=5)
+        tk.Button(btn_frame, text="Receive Stock", command=self.receive_stock, bg='#16a085', fg='white', width=15).pack(side='left', padx=5)
         
         # Products List
         list_frame = tk.Frame(tab, bg='#ecf0f1')
@@ -1126,19 +1488,14 @@ class StaffWindow:
             self.prod_category['values'] = categories
             conn.close()
     
-    def refresh_products(self):
+    def refresh_products(self, refresh=True):
+        # refresh=False shows the shared catalog cache without a round trip
         self.products_tree.delete(*self.products_tree.get_children())
-        conn = self.system.get_connection()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT p.product_id, p.product_name, c.category_name, p.product_price, p.product_number
-                FROM Product_Details p
-                JOIN Product_Category c ON p.category_id = c.category_id
-            """)
-            for row in cursor.fetchall():
+        try:
+            for row in self.system.get_catalog(refresh):
                 self.products_tree.insert('', 'end', values=row)
-            conn.close()
+        except Error:
+            pass
     
     def refresh_customers(self):
         self.customers_tree.delete(*self.customers_tree.get_children())
@@ -1176,6 +1533,47 @@ class StaffWindow:
             self.cust_points.delete(0, 'end')
             self.cust_points.insert(0, values[5])
     
+    def bulk_reprice(self):
+        conn = self.system.get_connection()
+        if not conn:
+            return
+        # several selected rows: reprice just those, otherwise by category / filter / price list
+        selected = self.products_tree.selection()
+        ids = [self.products_tree.item(i)['values'][0] for i in selected] if len(selected) > 1 else None
+        repricing.RepriceWindow(self.root, conn, on_applied=self.after_catalog_change, owns_conn=True,
+                                changed_by=self.system.current_user, product_ids=ids)
+    
+    def after_catalog_change(self):
+        self.system.invalidate_catalog()
+        self.refresh_products()
+    
+    def receive_stock(self):
+        conn = self.system.get_connection()
+        if not conn:
+            return
+        receiving.ReceivingWindow(self.root, conn, staff=self.system.current_user,
+                                  on_posted=self.after_catalog_change, owns_conn=True)
+    
+    def import_products(self):
+        path = filedialog.askopenfilename(parent=self.root, filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+        conn = self.system.get_connection()
+        if not conn:
+            return
+        try:
+            report = product_import.import_csv_mysql(path, conn)
+        except Exception as e:
+            messagebox.showerror("Error", f"Import failed: {e}")
+            return
+        finally:
+            conn.close()
+        self.system.invalidate_catalog()
+        self.load_categories()
+        self.refresh_products()
+        details = '\n'.join(f"line {line_no}: {reason}" for line_no, reason, _ in report.rejects[:10])
+        messagebox.showinfo("Import Finished", report.summary() + ('\n\n' + details if details else ''))
+    
     def add_product(self):
         name = self.prod_name.get()
         category = self.prod_category.get()
@@ -1342,13 +1740,8 @@ class StaffWindow:
             conn.close()
     
     def load_products_for_checkout(self):
-        conn = self.system.get_connection()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT product_id, product_name, product_price FROM Product_Details WHERE product_number > 0")
-            products = [f"{row[0]} - {row[1]} (${row[2]})" for row in cursor.fetchall()]
-            self.checkout_product['values'] = products
-            conn.close()
+        products = [f"{row[0]} - {row[1]} (${row[3]})" for row in self.system.get_catalog() if row[4] > 0]
+        self.checkout_product['values'] = products
     
     def add_to_cart(self):
         product = self.checkout_product.get()
@@ -1362,23 +1755,33 @@ class StaffWindow:
             quantity = int(quantity)
             product_id = int(product.split(' - ')[0])
             
-            conn = self.system.get_connection()
-            if conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT product_name, product_price, product_number FROM Product_Details WHERE product_id=%s", (product_id,))
-                result = cursor.fetchone()
-                conn.close()
+            started = time.perf_counter()
+            try:
+                product = self.inventory.get(product_id)
+            except services.DatabaseUnavailable:
+                if not self.system.offline:
+                    raise
+                if self.system.catalog is None:
+                    messagebox.showerror("Offline", "Product catalog not available offline - "
+                                                    "it was not loaded before the database went down.")
+                    return
+                product = self.system.cached_product(product_id)  # offline: sell from the cached catalog
+            metrics_exporter.SCAN_SECONDS.observe('nexus', value=time.perf_counter() - started)
+            metrics_exporter.SCANS.inc('nexus', 'found' if product else 'not_found')
+            
+            if product:
+                if quantity > product.stock:
+                    messagebox.showerror("Error", f"Only {product.stock} units available")
+                    return
                 
-                if result:
-                    prod_name, price, stock = result
-                    if quantity > stock:
-                        messagebox.showerror("Error", f"Only {stock} units available")
-                        return
-                    
-                    total = price * quantity
-                    self.cart_tree.insert('', 'end', values=(prod_name, f"${price:.2f}", quantity, f"${total:.2f}"))
-                    self.update_cart_totals()
-                    self.checkout_quantity.delete(0, 'end')
+                total = product.price * quantity
+                self.cart_tree.insert('', 'end', values=(product.name, f"${product.price:.2f}", quantity, f"${total:.2f}"))
+                self.update_cart_totals()
+                self.checkout_quantity.delete(0, 'end')
+        except pos_client.Unavailable as e:
+            messagebox.showerror("Database Error", str(e))
+        except services.DatabaseUnavailable:
+            pass  # get_connection has already reported it
         except ValueError:
             messagebox.showerror("Error", "Invalid quantity")
     
@@ -1388,39 +1791,28 @@ class StaffWindow:
             self.cart_tree.delete(selected[0])
             self.update_cart_totals()
     
-    def update_cart_totals(self):
-        subtotal = 0
+    def cart_lines(self):
+        """Cart rows as services.CartLine - the tree holds (name, "$price", qty, "$total")."""
+        lines = []
         for item in self.cart_tree.get_children():
             values = self.cart_tree.item(item)['values']
-            subtotal += float(values[3].replace(', '))
-        
-        discount = 0
+            lines.append(services.CartLine(None, str(values[0]), float(str(values[1]).lstrip('$')), int(values[2])))
+        return lines
+    
+    def selected_customer_id(self):
         customer = self.checkout_customer.get()
-        if customer:
-            customer_id = int(customer.split(' - ')[0])
-            conn = self.system.get_connection()
-            if conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT customer_type, loyalty_points FROM Customer_Details WHERE customer_id=%s", (customer_id,))
-                result = cursor.fetchone()
-                conn.close()
-                
-                if result:
-                    cust_type, points = result
-                    # Customer type discounts
-                    if cust_type == 'Premium':
-                        discount += subtotal * 0.15  # 15% discount
-                    elif cust_type == 'Student':
-                        discount += subtotal * 0.10  # 10% discount
-                    
-                    # Loyalty points discount (100 points = $10 discount)
-                    discount += (points // 100) * 10
-        
-        total = subtotal - discount
+        return int(customer.split(' - ')[0]) if customer else None
+    
+    def update_cart_totals(self):
+        # customer-type discount (Premium 15%, Student 10%) plus $10 per 100 loyalty points
+        try:
+            totals = self.checkout_service.quote(self.selected_customer_id(), self.cart_lines()).totals
+        except services.ServiceError:
+            totals = services.Totals.compute(self.cart_lines())
         
-        self.subtotal_label.config(text=f"Subtotal: ${subtotal:.2f}")
-        self.discount_label.config(text=f"Discount: ${discount:.2f}")
-        self.total_label.config(text=f"Total: ${total:.2f}")
+        self.subtotal_label.config(text=f"Subtotal: ${totals.subtotal:.2f}")
+        self.discount_label.config(text=f"Discount: ${totals.discount:.2f}")
+        self.total_label.config(text=f"Total: ${totals.grand_total:.2f}")
     
     def complete_checkout(self):
         customer = self.checkout_customer.get()
@@ -1433,72 +1825,82 @@ class StaffWindow:
             messagebox.showerror("Error", "Cart is empty")
             return
         
-        customer_id = int(customer.split(' - ')[0])
+        # stock, loyalty points and discounts in one transaction
+        started = time.perf_counter()
+        try:
+            result = self.checkout_service.checkout(self.selected_customer_id(), self.cart_lines())
+        except pos_client.Unavailable as e:
+            messagebox.showerror("Database Error", str(e))
+            return
+        except services.DatabaseUnavailable:
+            if self.system.offline:
+                self.checkout_offline()
+            return  # otherwise get_connection has already reported it
+        except services.ServiceError as e:
+            metrics_exporter.CHECKOUTS.inc('nexus', 'failed')
+            metrics_exporter.DB_ERRORS.inc('nexus', 'checkout')
+            messagebox.showerror("Checkout Error", str(e))
+            return
+        metrics_exporter.CHECKOUTS.inc('nexus', 'committed')
+        metrics_exporter.CHECKOUT_SECONDS.observe('nexus', value=time.perf_counter() - started)
         
-        # Calculate totals
-        subtotal = 0
-        for item in items:
-            values = self.cart_tree.item(item)['values']
-            subtotal += float(values[3].replace(', '))
+        messagebox.showinfo("Success", f"Checkout completed!\nTotal: ${result.totals.grand_total:.2f}\n"
+                                       f"New Loyalty Points: {result.new_points}")
         
-        # Update inventory and loyalty points
-        conn = self.system.get_connection()
-        if conn:
-            cursor = conn.cursor()
-            
-            # Get customer info
-            cursor.execute("SELECT customer_type, loyalty_points FROM Customer_Details WHERE customer_id=%s", (customer_id,))
-            cust_type, current_points = cursor.fetchone()
-            
-            # Calculate discount
-            discount = 0
-            if cust_type == 'Premium':
-                discount += subtotal * 0.15
-            elif cust_type == 'Student':
-                discount += subtotal * 0.10
-            
-            points_used = (current_points // 100) * 100
-            discount += (points_used // 100) * 10
-            
-            total = subtotal - discount
-            
-            # Update inventory
-            for item in items:
-                values = self.cart_tree.item(item)['values']
-                prod_name = values[0]
-                quantity = values[2]
-                
-                cursor.execute("UPDATE Product_Details SET product_number = product_number - %s WHERE product_name=%s",
-                             (quantity, prod_name))
-            
-            # Update loyalty points (earn 1 point per dollar spent, minus used points)
-            new_points = current_points - points_used + int(total)
-            cursor.execute("UPDATE Customer_Details SET loyalty_points=%s WHERE customer_id=%s",
-                         (new_points, customer_id))
-            
-            conn.commit()
-            conn.close()
-            
-            messagebox.showinfo("Success", f"Checkout completed!\nTotal: ${total:.2f}\nNew Loyalty Points: {new_points}")
-            
-            # Clear cart
-            for item in items:
-                self.cart_tree.delete(item)
-            self.update_cart_totals()
-            self.refresh_products()
-            self.load_products_for_checkout()
+        # Clear cart
+        for item in items:
+            self.cart_tree.delete(item)
+        self.update_cart_totals()
+        self.refresh_products()
+        self.load_products_for_checkout()
+    
+    def checkout_offline(self):
+        """Database unreachable: journal the sale locally; it is uploaded when the connection is back."""
+        lines = self.cart_lines()
+        try:
+            totals = self.system.offline_sales.record(self.selected_customer_id(), lines)
+        except OSError as e:
+            messagebox.showerror("Checkout Error", f"Could not save the sale offline: {e}")
+            return
+        self.system.sold_offline(lines)
+        self.system.show_offline_state()
+        metrics_exporter.CHECKOUTS.inc('nexus', 'offline')
+        messagebox.showinfo("Saved Offline", f"Database offline - sale saved on this computer.\n"
+                                             f"Total: ${totals.grand_total:.2f} (customer discounts and points "
+                                             f"are not applied offline; points are added on upload)")
+        for item in self.cart_tree.get_children():
+            self.cart_tree.delete(item)
+        self.update_cart_totals()
+        self.load_products_for_checkout()
+
+    def start_session(self):
+        """Reuse this dashboard for the next cashier: swap the user and reload data."""
+        self.header_label.config(text=f"Welcome, {self.system.current_user}")
+        self.refresh_products(refresh=False)
+        self.refresh_customers()
+        self.load_customers_for_checkout()
+        self.load_products_for_checkout()
+        self.root.deiconify()
     
     def logout(self):
         if messagebox.askyesno("Logout", "Are you sure you want to logout?"):
-            self.root.destroy()
-            system = NexusTechSystem()
-            login_window = LoginWindow(system)
-            login_window.root.mainloop()
+            # hand over with an empty cart; the window itself is kept for the next login
+            self.cart_tree.delete(*self.cart_tree.get_children())
+            self.checkout_customer.set('')
+            self.update_cart_totals()
+            self.root.withdraw()
+            self.system.logout()
 
 class AdminWindow:
     def __init__(self, system):
         self.system = system
-        self.root = tk.Tk()
+        self.reports = services.NexusReports(system.get_connection)
+        try:
+            self.reports.ensure_schema()
+        except services.DatabaseUnavailable:
+            pass  # retried by the first sales summary
+        self.root = tk.Toplevel(system.root)
+        self.root.protocol("WM_DELETE_WINDOW", system.quit)
         self.root.title("Nexus Tech - Admin Dashboard")
         self.root.geometry("1200x700")
         self.root.configure(bg='#ecf0f1')
@@ -1506,9 +1908,11 @@ class AdminWindow:
         # Header
         header = tk.Frame(self.root, bg='#2c3e50', height=60)
         header.pack(fill='x')
-        tk.Label(header, text=f"Admin: {system.current_user}", font=('Arial', 16, 'bold'),
-                bg='#2c3e50', fg='#ecf0f1').pack(side='left', padx=20, pady=15)
+        self.header_label = tk.Label(header, text=f"Admin: {system.current_user}", font=('Arial', 16, 'bold'),
+                                     bg='#2c3e50', fg='#ecf0f1')
+        self.header_label.pack(side='left', padx=20, pady=15)
         tk.Button(header, text="Logout", command=self.logout, bg='#e74c3c', fg='white').pack(side='right', padx=20)
+        system.offline_banner(header)
         
         # Notebook
         self.notebook = ttk.Notebook(self.root)
@@ -1518,8 +1922,6 @@ class AdminWindow:
         self.create_categories_tab()
         self.create_reports_tab()
         self.create_customer_history_tab()
-        
-        self.root.mainloop()
     
     
     def create_categories_tab(self):
@@ -1607,6 +2009,7 @@ class AdminWindow:
                 messagebox.showinfo("Success", "Category added successfully")
                 self.clear_category_form()
                 self.refresh_categories()
+                self.system.invalidate_catalog()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to add category: {str(e)}")
                 conn.close()
@@ -1637,6 +2040,7 @@ class AdminWindow:
                 messagebox.showinfo("Success", "Category updated successfully")
                 self.clear_category_form()
                 self.refresh_categories()
+                self.system.invalidate_catalog()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to update category: {str(e)}")
                 conn.close()
@@ -1670,6 +2074,7 @@ class AdminWindow:
                     messagebox.showinfo("Success", "Category deleted successfully")
                     self.clear_category_form()
                     self.refresh_categories()
+                    self.system.invalidate_catalog()
                 except Exception as e:
                     messagebox.showerror("Error", f"Failed to delete category: {str(e)}")
                     conn.close()
@@ -1694,6 +2099,19 @@ class AdminWindow:
         tk.Button(btn_frame, text="Customer Report", command=self.show_customer_report, 
                  bg='#9b59b6', fg='white', width=20, height=2).pack(side='left', padx=10)
         
+        # ABC/XYZ class filter for the sales summary
+        class_frame = tk.Frame(tab, bg='#ecf0f1')
+        class_frame.pack()
+        tk.Label(class_frame, text="ABC/XYZ Class:", bg='#ecf0f1').pack(side='left', padx=5)
+        self.class_filter = ttk.Combobox(class_frame, values=inventory_classes.CLASS_FILTERS, width=8, state='readonly')
+        self.class_filter.set('All')
+        self.class_filter.pack(side='left', padx=5)
+        self.class_filter.bind('<<ComboboxSelected>>', lambda e: self.show_sales_summary())
+        tk.Button(class_frame, text="Classify Products", command=self.classify_products,
+                 bg='#16a085', fg='white').pack(side='left', padx=5)
+        tk.Button(class_frame, text="Query Stats", command=lambda: query_metrics_window.WorstQueriesWindow(self.root),
+                 bg='#7f8c8d', fg='white').pack(side='left', padx=5)
+        
         # Report display area
         report_frame = tk.LabelFrame(tab, text="Report Details", bg='#ecf0f1', padx=10, pady=10)
         report_frame.pack(fill='both', expand=True, padx=10, pady=10)
@@ -1734,29 +2152,60 @@ class AdminWindow:
         
         self.history_text = tk.Text(history_frame, bg='white')
         self.history_text.pack(fill='both', expand=True)
+        
+        nav_frame = tk.Frame(history_frame, bg='#ecf0f1')
+        nav_frame.pack(fill='x', pady=5)
+        self.history_newer_btn = tk.Button(nav_frame, text="< Newer", command=self.newer_history_page,
+                                           state='disabled', width=10)
+        self.history_newer_btn.pack(side='left', padx=5)
+        self.history_older_btn = tk.Button(nav_frame, text="Older >", command=self.older_history_page,
+                                           state='disabled', width=10)
+        self.history_older_btn.pack(side='left', padx=5)
+        self.history_page_label = tk.Label(nav_frame, text="", bg='#ecf0f1')
+        self.history_page_label.pack(side='left', padx=10)
+        
+        self.history_customer_id = None
+        self.history_keys = [None]
+        self.history_next_key = None
+    
+    def fill_report(self, report, *args):
+        """Show the rows of a services.NexusReports method in the report tree."""
+        try:
+            rows = report(*args)
+        except services.DatabaseUnavailable:
+            return  # get_connection has already reported it
+        for row in rows:
+            self.report_tree.insert('', 'end', values=dataclasses.astuple(row))
     
     def show_sales_summary(self):
         self.report_tree.delete(*self.report_tree.get_children())
-        self.report_tree['columns'] = ('Product', 'Category', 'Price', 'Stock')
+        self.report_tree['columns'] = ('Product', 'Category', 'Price', 'Stock', 'Revenue', 'Class')
         self.report_tree['show'] = 'headings'
         
         self.report_tree.heading('Product', text='Product Name')
         self.report_tree.heading('Category', text='Category')
         self.report_tree.heading('Price', text='Price')
         self.report_tree.heading('Stock', text='Current Stock')
+        self.report_tree.heading('Revenue', text='Revenue')
+        self.report_tree.heading('Class', text='ABC/XYZ')
         
+        self.fill_report(self.reports.sales_summary, self.class_filter.get())
+    
+    def classify_products(self):
         conn = self.system.get_connection()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT p.product_name, c.category_name, p.product_price, p.product_number
-                FROM Product_Details p
-                JOIN Product_Category c ON p.category_id = c.category_id
-                ORDER BY p.product_name
-            """)
-            for row in cursor.fetchall():
-                self.report_tree.insert('', 'end', values=row)
+        if not conn:
+            return
+        try:
+            stats = inventory_classes.classify_mysql(conn)
+        except Exception as e:
+            messagebox.showerror("Error", f"Classification failed: {e}")
+            return
+        finally:
             conn.close()
+        summary = '\n'.join(f"{cls}: {n}" for cls, n in stats['classes'].items())
+        messagebox.showinfo("Products Classified",
+                           f"{stats['products']} products in {stats['seconds']:.2f}s\n\n{summary}")
+        self.show_sales_summary()
     
     def show_low_stock(self):
         self.report_tree.delete(*self.report_tree.get_children())
@@ -1768,24 +2217,7 @@ class AdminWindow:
         self.report_tree.heading('Stock', text='Stock Level')
         self.report_tree.heading('Status', text='Status')
         
-        conn = self.system.get_connection()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT p.product_name, c.category_name, p.product_number,
-                CASE 
-                    WHEN p.product_number = 0 THEN 'OUT OF STOCK'
-                    WHEN p.product_number < 10 THEN 'LOW STOCK'
-                    ELSE 'REORDER SOON'
-                END as status
-                FROM Product_Details p
-                JOIN Product_Category c ON p.category_id = c.category_id
-                WHERE p.product_number < 20
-                ORDER BY p.product_number
-            """)
-            for row in cursor.fetchall():
-                self.report_tree.insert('', 'end', values=row)
-            conn.close()
+        self.fill_report(self.reports.low_stock)
     
     def show_customer_report(self):
         self.report_tree.delete(*self.report_tree.get_children())
@@ -1798,17 +2230,7 @@ class AdminWindow:
         self.report_tree.heading('Contact', text='Contact')
         self.report_tree.heading('Email', text='Email')
         
-        conn = self.system.get_connection()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT customer_name, customer_type, loyalty_points, customer_contact, customer_email
-                FROM Customer_Details
-                ORDER BY loyalty_points DESC
-            """)
-            for row in cursor.fetchall():
-                self.report_tree.insert('', 'end', values=row)
-            conn.close()
+        self.fill_report(self.reports.customers)
     
     def load_customers_for_history(self):
         conn = self.system.get_connection()
@@ -1844,13 +2266,58 @@ class AdminWindow:
                 info += f"Loyalty Points: {cust_data[5]}\n"
                 self.customer_info.insert('1.0', info)
                 
-                self.history_text.delete('1.0', 'end')
-                self.history_text.insert('1.0', "Purchase history functionality can be extended by creating a Transactions table.\nThis would store all checkout records with timestamps and product details.")
+                self.history_customer_id = customer_id
+                self.history_keys = [None]
+                self.load_history_page()
+    
+    def load_history_page(self):
+        conn = self.system.get_connection()
+        if not conn:
+            return
+        try:
+            cms = CustomerManagementSystem(conn)
+            transactions, self.history_next_key = cms.get_transaction_history_page(
+                self.history_customer_id, self.history_keys[-1])
+        finally:
+            conn.close()
+        
+        self.history_text.delete('1.0', 'end')
+        if not transactions and len(self.history_keys) == 1:
+            self.history_text.insert('1.0', "No purchases recorded for this customer.")
+        for t_id, t_date, amount, items, discount, method in transactions:
+            self.history_text.insert('end', f"#{t_id}  {t_date}  ${float(amount):.2f}  "
+                                            f"(discount ${float(discount or 0):.2f}, {method or 'N/A'})\n")
+            if items:
+                self.history_text.insert('end', f"    {items}\n")
+        
+        self.history_page_label.config(text=f"Page {len(self.history_keys)}")
+        self.history_newer_btn.config(state='normal' if len(self.history_keys) > 1 else 'disabled')
+        self.history_older_btn.config(state='normal' if self.history_next_key else 'disabled')
+    
+    def older_history_page(self):
+        if self.history_next_key:
+            self.history_keys.append(self.history_next_key)
+            self.load_history_page()
+    
+    def newer_history_page(self):
+        if len(self.history_keys) > 1:
+            self.history_keys.pop()
+            self.load_history_page()
+    
+    def start_session(self):
+        """Reuse this dashboard for the next admin: swap the user and reload data."""
+        self.header_label.config(text=f"Admin: {self.system.current_user}")
+        self.refresh_categories()
+        self.load_customers_for_history()
+        self.root.deiconify()
     
     def logout(self):
-        self.root.destroy()
-        system = NexusTechSystem()
-        LoginWindow(system).run()
+        # clear what the previous admin was looking at, then hide (not destroy) the window
+        self.history_customer.set('')
+        self.customer_info.delete('1.0', 'end')
+        self.history_text.delete('1.0', 'end')
+        self.root.withdraw()
+        self.system.logout()
 
 # Database setup SQL script (run this first in MySQL)
 """
@@ -1886,6 +2353,34 @@ CREATE TABLE IF NOT EXISTS Product_Details (
     FOREIGN KEY (category_id) REFERENCES Product_Category(category_id)
 );
 
+CREATE TABLE IF NOT EXISTS Transaction_History (
+    transaction_id INT PRIMARY KEY AUTO_INCREMENT,
+    customer_id INT NOT NULL,
+    transaction_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    total_amount DECIMAL(10,2) NOT NULL,
+    items_purchased TEXT,
+    discount_applied DECIMAL(10,2) DEFAULT 0,
+    payment_method VARCHAR(50),
+    FOREIGN KEY (customer_id) REFERENCES Customer_Details(customer_id) ON DELETE CASCADE,
+    INDEX idx_customer_date (customer_id, transaction_date)
+);
+
+CREATE TABLE IF NOT EXISTS Transaction_Items (
+    item_id INT PRIMARY KEY AUTO_INCREMENT,
+    transaction_id INT NOT NULL,
+    customer_id INT NOT NULL,
+    product_id INT,
+    product_name VARCHAR(200) NOT NULL,
+    category_id INT,
+    quantity INT NOT NULL DEFAULT 1,
+    unit_price DECIMAL(10,2),
+    line_total DECIMAL(10,2),
+    FOREIGN KEY (transaction_id) REFERENCES Transaction_History(transaction_id) ON DELETE CASCADE,
+    INDEX idx_items_transaction (transaction_id),
+    INDEX idx_items_customer_category (customer_id, category_id),
+    INDEX idx_items_product (product_id)
+);
+
 -- Insert sample data
 INSERT INTO Staff_Details (staff_name, staff_password) VALUES 
 ('admin', SHA2('admin123', 256)),
@@ -1913,9 +2408,4 @@ if __name__ == "__main__":
     print("Starting Nexus Tech System...")
     system = NexusTechSystem()
     print("System initialized")
-    login_window = LoginWindow(system)
-    print("Login window created")
-    login_window.root.mainloop()
-    system = NexusTechSystem()
-    login_window = LoginWindow(system)
-    login_window.root.mainloop()
+    system.run()
@@ -3,6 +3,13 @@ from tkinter import ttk, messagebox, simpledialog
 import sqlite3
 import os
 from functools import partial
+import sales_analytics
+import password_hashing
+import query_metrics
+import query_metrics_window
+import ui_monitor
+import action_profiler
+import services
 
 DB_FILE = 'shop_app.db'
 CATEGORIES = [f'Category {i+1}' for i in range(10)]
@@ -13,7 +20,7 @@ CATEGORIES = [f'Category {i+1}' for i in range(10)]
 
 def init_db():
     new_db = not os.path.exists(DB_FILE)
-    conn = sqlite3.connect(DB_FILE)
+    conn = query_metrics.connect_sqlite(DB_FILE, 'test1')
     c = conn.cursor()
 
     c.execute('''
@@ -57,7 +64,7 @@ def init_db():
         ]
         for u, p, r, l in default_users:
             try:
-                c.execute("INSERT INTO users (username,password,role,loyalty_points) VALUES (?,?,?,?)", (u,p,r,l))
+                c.execute("INSERT INTO users (username,password,role,loyalty_points) VALUES (?,?,?,?)", (u,password_hashing.hash_password(p),r,l))
             except sqlite3.IntegrityError:
                 pass
 
@@ -81,9 +88,12 @@ class ShopApp(tk.Tk):
         super().__init__()
         self.title('Nexus Tech - Demo Shop')
         self.geometry('1000x650')
+        ui_monitor.install(self, 'shop')
+        action_profiler.install(self, 'shop')
         self.db = db_conn
         self.user = None
         self.cart = []
+        self.orders = services.OrderCheckout(db_conn)
 
         container = ttk.Frame(self)
         container.pack(fill='both', expand=True)
@@ -118,8 +128,12 @@ class ShopApp(tk.Tk):
         if not user:
             return 'username'  # username not found
         uid, uname, role, lp, card, stored_pw = user[0]
-        if stored_pw != password:
+        ok, new_hash = password_hashing.check_password(password, stored_pw)
+        if not ok:
             return 'password'  # password incorrect
+        if new_hash:
+            # re-save plain text / outdated hashes with the current settings
+            self.query('UPDATE users SET password=? WHERE id=?', (new_hash, uid))
         self.user = {'id': uid, 'username': uname, 'role': role, 'loyalty_points': lp, 'card_number': card}
         return 'success'
 
@@ -168,7 +182,7 @@ class CustomerRegisterPage(ttk.Frame):
             messagebox.showwarning('Error','Fill all fields')
             return
         try:
-            controller.query('INSERT INTO users (username,password,role,loyalty_points) VALUES (?,?,\"customer\",0)', (u,p))
+            controller.query('INSERT INTO users (username,password,role,loyalty_points) VALUES (?,?,\"customer\",0)', (u,password_hashing.hash_password(p)))
             messagebox.showinfo('OK','Registered successfully')
             controller.show_frame('CustomerLoginPage')
         except sqlite3.IntegrityError:
@@ -225,7 +239,7 @@ class StaffLoginPage(ttk.Frame):
         ttk.Button(self,text='Back',command=lambda:controller.show_frame('StartPage')).pack()
 
     def login(self,controller):
-        if controller.login(self.username.get(),self.password.get()):
+        if controller.login(self.username.get(),self.password.get()) == 'success':
             if controller.user['role'] not in ('staff','admin'):
                 messagebox.showerror('Denied','Not staff or admin')
                 controller.logout()
@@ -301,10 +315,7 @@ class ShoppingPage(ttk.Frame):
             self.update_total()
 
     def update_total(self):
-        total = 0.0
-        for pid,qty in self.controller.cart:
-            price = self.controller.query('SELECT price FROM products WHERE id=?',(pid,),fetch=True)[0][0]
-            total += price*qty
+        total = self.controller.orders.quote(self.controller.cart)
         self.total_label.config(text=f'Total: ${round(total,2)}')
 
     def view_cart(self):
@@ -329,7 +340,7 @@ class ShoppingPage(ttk.Frame):
         if not self.controller.cart:
             messagebox.showinfo('Empty','Cart is empty')
             return
-        total = sum(self.controller.query('SELECT price FROM products WHERE id=?',(pid,),fetch=True)[0][0]*qty for pid,qty in self.controller.cart)
+        total = self.controller.orders.quote(self.controller.cart)
         u = self.controller.user
         if not u or u['role']!='customer':
             messagebox.showinfo('Guest','You must be logged in to pay with card.')
@@ -342,12 +353,14 @@ class ShoppingPage(ttk.Frame):
             return
         # simulate deduction
         messagebox.showinfo('Payment','Payment successful (simulated).')
-        self.controller.query('INSERT INTO orders (user_id,total) VALUES (?,?)',(u['id'],total))
-        points = int(total//10)
-        self.controller.query('UPDATE users SET loyalty_points = loyalty_points + ? WHERE id=?',(points,u['id']))
+        try:
+            result = self.controller.orders.checkout(u['id'], self.controller.cart)
+        except services.ServiceError as e:
+            messagebox.showerror('Order', str(e))
+            return
         self.controller.cart.clear()
         self.update_total()
-        messagebox.showinfo('Done',f'Order completed, earned {points} loyalty points.')
+        messagebox.showinfo('Done',f'Order completed, earned {result.points_earned} loyalty points.')
 
 class CustomerAccountPage(ttk.Frame):
     def __init__(self, parent, controller):
@@ -388,15 +401,30 @@ class AdminReportsPage(ttk.Frame):
         super().__init__(parent)
         ttk.Label(self, text='Admin Reports', font=('Helvetica',16)).pack(pady=8)
         ttk.Button(self, text='Back', command=lambda: controller.show_frame('StartPage')).pack()
+        ttk.Button(self, text='Query Stats', command=lambda: query_metrics_window.WorstQueriesWindow(self)).pack(pady=4)
         self.txt=tk.Text(self,height=20)
         self.txt.pack(fill='both',expand=True,padx=8,pady=8)
         self.bind('<<ShowFrame>>', lambda e: self.refresh(controller))
 
+        self.analytics=None
+
     def refresh(self,controller):
         total=controller.query('SELECT SUM(total) FROM orders',fetch=True)[0][0]
         total=total or 0
         self.txt.delete('1.0','end')
         self.txt.insert('end',f'Total Sales: ${round(total,2)}\n')
+        if not sales_analytics.HAS_NUMPY:
+            return
+        if self.analytics is None:
+            self.analytics=sales_analytics.SalesAnalytics(table='orders',amount_col='total',conn=controller.db)
+        revenue,counts=self.analytics.hourly()
+        self.txt.insert('end','\nSales by hour:\n')
+        for h in range(24):
+            if counts[h]:
+                self.txt.insert('end',f'  {h:02d}:00  {counts[h]:>4} orders  ${revenue[h]:.2f}\n')
+        self.txt.insert('end','\nBusiest slots:\n')
+        for day,h,n,rev in self.analytics.busiest_slots():
+            self.txt.insert('end',f'  {day} {h:02d}:00  {n} orders  ${rev:.2f}\n')
 
 
 
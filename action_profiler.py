@@ -0,0 +1,140 @@
+"""
+Per-action cProfile capture for the Tk apps.
+
+With NEXUS_PROFILE=1 every user action (button command, key or mouse
+binding) runs under its own cProfile.Profile. Actions that take at least
+NEXUS_PROFILE_MIN_MS are kept: the profiles of each action are merged into
+profiles/<action>.prof (open with `python -m pstats` or snakeviz), and on
+exit profiles/summary.txt lists every action with its call count and time
+plus the top functions overall and per action.
+
+after() jobs (timers, the background-thread pollers) are not profiled; work
+done inside worker threads is not seen by cProfile either, only the Tk side
+that starts and collects it.
+
+When the variable is not set install() does nothing and Tk callbacks run
+exactly as before.
+
+Environment:
+    NEXUS_PROFILE=1             enable
+    NEXUS_PROFILE_DIR=profiles  output directory
+    NEXUS_PROFILE_MIN_MS=20     ignore actions faster than this
+"""
+
+import os
+import io
+import re
+import time
+import atexit
+import pstats
+import cProfile
+from datetime import datetime
+import tkinter as tk
+
+import ui_monitor
+
+# ------------ Config ------------
+ENABLED = os.environ.get("NEXUS_PROFILE", "0") == "1"
+PROFILE_DIR = os.environ.get("NEXUS_PROFILE_DIR", "profiles")
+MIN_MS = float(os.environ.get("NEXUS_PROFILE_MIN_MS", "20"))
+TOP_OVERALL = 40            # functions in the overall summary
+TOP_PER_ACTION = 15         # functions per action in the summary
+# ---------------------------------
+
+_ACTIVE = None
+_inner_call = None          # CallWrapper.__call__ as it was when install() ran
+
+
+def file_name(action):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", action).strip("_") or "action"
+
+
+class ActionProfiler:
+    def __init__(self, app_name, out_dir=PROFILE_DIR, min_ms=MIN_MS):
+        self.app_name = app_name
+        self.out_dir = out_dir
+        self.min_ms = min_ms
+        self.depth = 0
+        self.actions = {}       # action -> [calls, total_ms, max_ms, pstats.Stats]
+        self.started = datetime.now()
+        os.makedirs(out_dir, exist_ok=True)
+        atexit.register(self.write_summary)
+
+    def run(self, action, call, *args):
+        """Run call(*args) under a profiler and keep the result under action."""
+        if self.depth:
+            return call(*args)          # nested loop (modal dialog): the outer action owns it
+        prof = cProfile.Profile()
+        self.depth += 1
+        t0 = time.perf_counter()
+        prof.enable()
+        try:
+            return call(*args)
+        finally:
+            prof.disable()
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            self.depth -= 1
+            if elapsed_ms >= self.min_ms:
+                self.add(action, prof, elapsed_ms)
+
+    def add(self, action, prof, elapsed_ms):
+        entry = self.actions.get(action)
+        if entry is None:
+            entry = self.actions[action] = [0, 0.0, 0.0, pstats.Stats(prof)]
+        else:
+            entry[3].add(prof)
+        entry[0] += 1
+        entry[1] += elapsed_ms
+        entry[2] = max(entry[2], elapsed_ms)
+        try:
+            entry[3].dump_stats(os.path.join(self.out_dir, file_name(action) + ".prof"))
+        except OSError:
+            pass
+
+    def summary_text(self):
+        out = io.StringIO()
+        out.write(f"Action profile for {self.app_name}, {self.started:%Y-%m-%d %H:%M:%S} to "
+                  f"{datetime.now():%H:%M:%S} (actions >= {self.min_ms:g} ms)\n\n")
+        ranked = sorted(self.actions.items(), key=lambda kv: kv[1][1], reverse=True)
+        out.write(f"{'calls':>6} {'total ms':>10} {'avg ms':>9} {'max ms':>9}  action\n")
+        for action, (calls, total, worst, _) in ranked:
+            out.write(f"{calls:>6} {total:>10.1f} {total / calls:>9.1f} {worst:>9.1f}  {action}\n")
+        if not ranked:
+            return out.getvalue()
+
+        overall = pstats.Stats(stream=out)
+        for _, entry in ranked:
+            overall.add(entry[3])
+        out.write(f"\n===== Top {TOP_OVERALL} functions, all actions =====\n")
+        overall.sort_stats("tottime").print_stats(TOP_OVERALL)
+        for action, entry in ranked:
+            out.write(f"\n===== {action} =====\n")
+            stats = pstats.Stats(stream=out)
+            stats.add(entry[3]).sort_stats("cumulative").print_stats(TOP_PER_ACTION)
+        return out.getvalue()
+
+    def write_summary(self):
+        try:
+            with open(os.path.join(self.out_dir, "summary.txt"), "w", encoding="utf-8") as f:
+                f.write(self.summary_text())
+        except OSError:
+            pass
+
+
+def _profiled_call(self, *args):
+    code = getattr(self.func, "__code__", None)
+    if _ACTIVE is None or code is not None and code.co_name == "callit":
+        return _inner_call(self, *args)     # after() job, not a user action
+    return _ACTIVE.run(ui_monitor.callback_name(self.func), _inner_call, self, *args)
+
+
+def install(root, app_name=None):
+    """Profile root's user actions if NEXUS_PROFILE=1. Returns the profiler or None."""
+    global _ACTIVE, _inner_call
+    if not ENABLED:
+        return None
+    if _ACTIVE is None:
+        _inner_call = tk.CallWrapper.__call__
+        tk.CallWrapper.__call__ = _profiled_call
+        _ACTIVE = ActionProfiler(app_name or type(root).__name__)
+    return _ACTIVE
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the POS hot paths, run against a synthetic shop.db.
+
+Measures, with the same SQL the Tk screens issue:
+- checkout      commits per second and commit latency (services.ShopCheckout,
+                the Final Billing transaction: header, line items, stock, loyalty)
+- scan          barcode lookup latency (scanner entry)
+- product_search / customer_search   LIKE search latency
+- reports       runtime of each report job (sales history paging, busy hours,
+                ABC/XYZ classification, frequently-bought-together)
+
+Results go to a JSON file with the machine, Python/SQLite versions, git
+revision and data sizes, so runs can be compared between versions
+(--compare old.json prints the change per metric).
+
+Usage:
+    python benchmark_suite.py --scale small --out bench_results.json
+    python benchmark_suite.py --db bench.db --sales 2000000 --compare bench_results.json
+"""
+
+import os
+import json
+import time
+import random
+import shutil
+import sqlite3
+import platform
+import argparse
+import itertools
+import statistics
+import subprocess
+from datetime import datetime
+
+import services
+import synthetic_data
+import sales_history
+import sales_analytics
+import inventory_classes
+import recommendations
+
+# ------------ Config ------------
+RESULTS_FILE = "bench_results.json"
+SCALES = {
+    # name: (products, customers, sales)
+    "small": (2000, 5000, 100000),
+    "medium": (10000, 50000, 1000000),
+    "large": (50000, 200000, 5000000),
+}
+CHECKOUTS = 500             # checkout transactions timed
+LOOKUPS = 2000              # scans / searches timed
+SEARCHES = 200
+REPORT_RUNS = 3             # best of N for each report
+# ---------------------------------
+
+
+def latency_stats(samples_ms):
+    samples = sorted(samples_ms)
+    n = len(samples)
+
+    def pct(p):
+        return samples[min(n - 1, int(n * p))]
+
+    return {
+        'count': n,
+        'mean_ms': statistics.mean(samples),
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+        'max_ms': samples[-1],
+    }
+
+
+def connect(db_file):
+    # same settings as Final Billing's db_connect
+    conn = sqlite3.connect(db_file)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+    return conn
+
+
+# ---------- Benchmarks ----------
+def bench_checkout(db_file, rng, n=CHECKOUTS):
+    """One connection + transaction per sale through services.ShopCheckout, as POSApp.checkout does."""
+    conn = connect(db_file)
+    products = conn.execute("SELECT id, name, price FROM products").fetchall()
+    customers = conn.execute("SELECT MAX(id) FROM customers").fetchone()[0] or 0
+    conn.close()
+    invoices = (f"BENCH{i:09d}" for i in itertools.count())
+    shop = services.ShopCheckout(lambda: connect(db_file), synthetic_data.TAX_RATE, invoice_no=lambda: next(invoices))
+    cw = synthetic_data.zipf_cum_weights(len(products))
+    times = []
+    started = time.perf_counter()
+    for i in range(n):
+        k = rng.choices(range(1, len(synthetic_data.BASKET_WEIGHTS) + 1),
+                        weights=synthetic_data.BASKET_WEIGHTS)[0]
+        cart = [products[j] for j in set(rng.choices(range(len(products)), cum_weights=cw, k=k))]
+        cust = rng.randrange(1, customers + 1) if customers and rng.random() < synthetic_data.CUSTOMER_SHARE else None
+        sale = services.Sale([services.CartLine(p['id'], p['name'], p['price']) for p in cart], "Cash", "bench", cust)
+
+        t0 = time.perf_counter()
+        shop.checkout(sale)
+        times.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+    return dict(latency_stats(times), per_second=n / elapsed)
+
+
+def _timed_queries(conn, sql, params_list):
+    times = []
+    for params in params_list:
+        t0 = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        times.append((time.perf_counter() - t0) * 1000)
+    return latency_stats(times)
+
+
+def bench_scan(conn, rng, n=LOOKUPS):
+    """Barcode lookups, popular items scanned more often."""
+    barcodes = [r[0] for r in conn.execute("SELECT barcode FROM products WHERE barcode IS NOT NULL")]
+    rng.shuffle(barcodes)
+    picks = rng.choices(barcodes, cum_weights=synthetic_data.zipf_cum_weights(len(barcodes)), k=n)
+    return _timed_queries(conn, "SELECT id, name, price, stock FROM products WHERE barcode=? COLLATE NOCASE",
+                          [(b,) for b in picks])
+
+
+def bench_product_search(conn, rng, n=SEARCHES):
+    words = synthetic_data.BRANDS + [w for _, ws in synthetic_data.CATEGORIES.values() for w in ws]
+    terms = [rng.choice(words) if rng.random() < 0.7 else f"{rng.randrange(100, 999)}" for _ in range(n)]
+    return _timed_queries(conn, "SELECT id, name, price, stock, COALESCE(barcode,'') as barcode FROM products "
+                                "WHERE name LIKE ? OR category LIKE ? OR barcode LIKE ? ORDER BY id",
+                          [(f"%{t}%",) * 3 for t in terms])
+
+
+def bench_customer_search(conn, rng, n=SEARCHES):
+    terms = [rng.choice(synthetic_data.LAST_NAMES) if rng.random() < 0.6 else f"07{rng.randrange(10, 99)}{rng.randrange(100)}"
+             for _ in range(n)]
+    return _timed_queries(conn, "SELECT id,name,phone,email,loyalty_points FROM customers "
+                                "WHERE name LIKE ? OR phone LIKE ? ORDER BY id DESC",
+                          [(f"%{t}%",) * 2 for t in terms])
+
+
+def _best_of(fn, runs=REPORT_RUNS):
+    best = None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_reports(db_file, runs=REPORT_RUNS):
+    """Seconds (best of `runs`) per report; reports needing missing packages are skipped."""
+    results = {}
+
+    def history_pages():
+        conn = sales_history.connect(db_file)
+        key = None
+        for _ in range(20):
+            _, key = sales_history.fetch_page(conn, key)
+        conn.close()
+
+    results['sales_history_20_pages'] = _best_of(history_pages, runs)
+
+    if sales_analytics.HAS_NUMPY:
+        def busy_hours():
+            sa = sales_analytics.SalesAnalytics(db_file)
+            sa.hourly(), sa.daily(), sa.heatmap()
+
+        results['busy_hours'] = _best_of(busy_hours, runs)
+        results['abc_xyz_classification'] = _best_of(lambda: inventory_classes.classify_sqlite(db_file), runs)
+    else:
+        results['busy_hours'] = results['abc_xyz_classification'] = "skipped: numpy not installed"
+    results['frequently_bought_together'] = _best_of(lambda: recommendations.build_companions(db_file), runs)
+    return results
+
+
+# ---------- Suite ----------
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_suite(db_file, products, customers, sales, seed=synthetic_data.SEED, regenerate=False, progress=print):
+    """Generate (if needed) and benchmark db_file. Returns the result dict."""
+    if regenerate or not os.path.exists(db_file):
+        progress(f"Generating {db_file}: {products:,} products, {customers:,} customers, {sales:,} sales ...")
+        data = synthetic_data.generate(db_file, products, customers, sales, seed=seed)
+        progress(f"  done in {data['seconds']:.1f}s")
+    rng = random.Random(seed)
+
+    conn = connect(db_file)
+    counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+              for t in ("products", "customers", "sales", "sales_items")}
+    results = {}
+    progress("Scan lookups ...")
+    results['scan'] = bench_scan(conn, rng)
+    progress("Product search ...")
+    results['product_search'] = bench_product_search(conn, rng)
+    progress("Customer search ...")
+    results['customer_search'] = bench_customer_search(conn, rng)
+    conn.close()
+
+    # checkout and build_companions write, so they run on a copy to keep the data set reproducible
+    work = db_file + ".checkout"
+    shutil.copyfile(db_file, work)
+    try:
+        progress("Reports ...")
+        results['reports'] = bench_reports(work)
+        progress("Checkout ...")
+        results['checkout'] = bench_checkout(work, rng)
+    finally:
+        os.remove(work)
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec="seconds"),
+        'revision': git_revision(),
+        'machine': {
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'numpy': sales_analytics.HAS_NUMPY,
+        },
+        'data': dict(counts, seed=seed, db_bytes=os.path.getsize(db_file)),
+        'results': results,
+    }
+
+
+def flatten(results, prefix=""):
+    """{'scan.p95_ms': 0.12, ...} for comparing two runs."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old, new):
+    """Lines describing the change per metric (latencies and runtimes: lower is better)."""
+    a, b = flatten(old['results']), flatten(new['results'])
+    lines = []
+    for key in sorted(a.keys() & b.keys()):
+        if key.endswith(".count") or not a[key]:
+            continue
+        change = (b[key] - a[key]) / a[key] * 100
+        better = change > 0 if key.endswith("per_second") else change < 0
+        flag = "" if abs(change) < 10 else ("  better" if better else "  WORSE")
+        lines.append(f"  {key:<45} {a[key]:>12.3f} -> {b[key]:>12.3f}  ({change:+.1f}%){flag}")
+    return lines
+
+
+def print_summary(report):
+    r = report['results']
+    print(f"\nData: {report['data']['products']:,} products, {report['data']['customers']:,} customers, "
+          f"{report['data']['sales']:,} sales, {report['data']['sales_items']:,} line items")
+    for name in ("scan", "product_search", "customer_search"):
+        s = r[name]
+        print(f"  {name:<18} p50 {s['p50_ms']:.3f} ms   p95 {s['p95_ms']:.3f} ms   max {s['max_ms']:.3f} ms")
+    c = r['checkout']
+    print(f"  {'checkout':<18} {c['per_second']:.0f} sales/s   p50 {c['p50_ms']:.2f} ms   p95 {c['p95_ms']:.2f} ms")
+    for name, seconds in r['reports'].items():
+        shown = f"{seconds:.3f} s" if isinstance(seconds, float) else seconds
+        print(f"  {name:<30} {shown}")
+
+
+# ---------- Run ----------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark checkout, search and reports on synthetic data")
+    ap.add_argument("--scale", choices=sorted(SCALES), default="small")
+    ap.add_argument("--db", help="benchmark database (default bench_<scale>.db)")
+    ap.add_argument("--products", type=int)
+    ap.add_argument("--customers", type=int)
+    ap.add_argument("--sales", type=int)
+    ap.add_argument("--seed", type=int, default=synthetic_data.SEED)
+    ap.add_argument("--regenerate", action="store_true", help="rebuild the database even if it exists")
+    ap.add_argument("--out", default=RESULTS_FILE)
+    ap.add_argument("--compare", help="earlier results JSON to compare against")
+    args = ap.parse_args()
+
+    products, customers, sales = SCALES[args.scale]
+    report = run_suite(args.db or f"bench_{args.scale}.db", args.products or products,
+                       args.customers or customers, args.sales or sales, args.seed, args.regenerate)
+    print_summary(report)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.out}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        print(f"\nCompared with {args.compare} ({old.get('revision')}, {old.get('timestamp')}):")
+        print("\n".join(compare(old, report)) or "  nothing comparable")
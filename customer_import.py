@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Bulk customer import from old systems and spreadsheets.
+
+Rows are streamed from the CSV, phone numbers and e-mail addresses are
+normalized, and every row is checked against an in-memory hash index of the
+customers already on file (phone key and e-mail), which also catches
+duplicates inside the file itself. New customers are inserted with
+executemany in short chunked transactions, with a brief pause between
+chunks so the tills can take the database lock during a large import.
+
+Accepted headers (case-insensitive):
+    name / customer_name, phone / contact / mobile, email,
+    address, type / customer_type, loyalty_points / points (all but name optional)
+
+Works on shop.db (`customers`) and on the MySQL nexus_tech database
+(`Customer_Details`).
+
+Usage:
+    python customer_import.py customers.csv [--db shop.db] [--rejects rejects.csv]
+"""
+
+import re
+import time
+import sqlite3
+import argparse
+from datetime import datetime
+
+from product_import import iter_csv, ImportReport
+
+# ------------ Config ------------
+DB_FILE = "shop.db"
+CHUNK_ROWS = 1000           # rows per transaction - keeps each lock short
+CHUNK_PAUSE = 0.02          # seconds between chunks so tills can get the lock
+PHONE_MATCH_DIGITS = 9      # trailing digits compared, so 077... and +9477... match
+CUSTOMER_TYPES = ("Regular", "VIP", "Student")
+# ---------------------------------
+
+HEADER_ALIASES = {
+    "name": "name", "customer_name": "name", "full_name": "name",
+    "phone": "phone", "contact": "phone", "mobile": "phone", "telephone": "phone",
+    "customer_contact": "phone",
+    "email": "email", "e-mail": "email", "customer_email": "email",
+    "address": "address", "customer_address": "address",
+    "type": "type", "customer_type": "type",
+    "loyalty_points": "points", "points": "points",
+}
+
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+# ---------- Normalization ----------
+def normalize_phone(text):
+    """Digits only, keeping a leading + (00 prefix becomes +). None when empty."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    if text.startswith("00"):
+        text = "+" + text[2:]
+    digits = re.sub(r"\D", "", text)
+    if not digits:
+        return None
+    return ("+" + digits) if text.startswith("+") else digits
+
+
+def phone_key(phone):
+    """Index key for a normalized phone: its trailing PHONE_MATCH_DIGITS digits."""
+    return phone.lstrip("+")[-PHONE_MATCH_DIGITS:] if phone else None
+
+
+def normalize_email(text):
+    text = (text or "").strip().lower()
+    return text or None
+
+
+def validate(row):
+    """Return ((name, phone, email, address, type, points), None) or (None, reason)."""
+    name = " ".join(row.get("name", "").split())
+    if not name:
+        return None, "missing name"
+    if len(name) > 100:
+        return None, "name longer than 100 characters"
+    phone = normalize_phone(row.get("phone"))
+    if phone and not 7 <= len(phone.lstrip("+")) <= 15:
+        return None, f"invalid phone {row.get('phone')!r}"
+    email = normalize_email(row.get("email"))
+    if email and not EMAIL_RE.match(email):
+        return None, f"invalid email {row.get('email')!r}"
+    customer_type = row.get("type", "").strip().title() or "Regular"
+    if customer_type.upper() == "VIP":
+        customer_type = "VIP"
+    if customer_type not in CUSTOMER_TYPES:
+        return None, f"unknown customer type {row.get('type')!r}"
+    try:
+        points = int(float(row.get("points", "") or 0))
+    except (ValueError, OverflowError):
+        return None, f"invalid loyalty points {row.get('points')!r}"
+    return (name, phone, email, row.get("address") or None, customer_type, max(points, 0)), None
+
+
+# ---------- Report ----------
+class CustomerImportReport(ImportReport):
+    columns = ("name", "phone", "email", "address", "type", "points")
+
+    def __init__(self):
+        super().__init__()
+        self.duplicates = 0
+
+    @property
+    def rows_per_second(self):
+        total = self.inserted + self.duplicates + self.rejected
+        return total / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self):
+        return (f"{self.inserted} inserted, {self.duplicates} duplicates skipped, {self.rejected} rejected "
+                f"in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s)")
+
+
+# ---------- Index ----------
+class CustomerIndex:
+    """Hash index over phone keys and e-mails of every known customer."""
+
+    def __init__(self, rows=()):
+        self.phones = set()
+        self.emails = set()
+        for phone, email in rows:
+            self.add(normalize_phone(phone), normalize_email(email))
+
+    def add(self, phone, email):
+        if phone:
+            self.phones.add(phone_key(phone))
+        if email:
+            self.emails.add(email)
+
+    def contains(self, phone, email):
+        return bool((phone and phone_key(phone) in self.phones) or (email and email in self.emails))
+
+
+# ---------- Targets ----------
+def sql_phone_key(col):
+    """
+    phone_key(normalize_phone(col)) as an SQLite expression, for phones written
+    with digits and the usual separators (space - ( ) . / +).
+    """
+    digits = f"trim({col})"
+    for sep in (" ", "-", "(", ")", ".", "/", "+"):
+        digits = f"replace({digits}, '{sep}', '')"
+    return f"NULLIF(substr({digits}, -{PHONE_MATCH_DIGITS}), '')"
+
+
+def sql_email_key(col):
+    """normalize_email(col) as an SQLite expression."""
+    return f"NULLIF(lower(trim({col})), '')"
+
+
+class SqliteCustomers:
+    """shop.db customers (name, phone, email, loyalty_points)."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.ensure_indexes(conn)
+
+    def known(self):
+        # the stored keys, so bulk import and the till's duplicate check agree
+        return self.conn.execute("SELECT phone_key, email_key FROM customers")
+
+    @staticmethod
+    def ensure_indexes(conn):
+        """
+        phone_key/email_key columns behind exists(), kept current by triggers so rows
+        written by any program (other front ends, older versions) are matched too.
+        """
+        cols = {row[1] for row in conn.execute("PRAGMA table_info(customers)")}
+        keys = f"phone_key = {sql_phone_key('NEW.phone')}, email_key = {sql_email_key('NEW.email')}"
+        for col in ("phone_key", "email_key"):
+            if col not in cols:
+                conn.execute(f"ALTER TABLE customers ADD COLUMN {col} TEXT")
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS customers_keys_insert AFTER INSERT ON customers
+            BEGIN UPDATE customers SET {keys} WHERE id = NEW.id; END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS customers_keys_update AFTER UPDATE OF phone, email ON customers
+            BEGIN UPDATE customers SET {keys} WHERE id = NEW.id; END
+        """)
+        if "phone_key" not in cols or "email_key" not in cols:
+            conn.execute(f"UPDATE customers SET phone_key = {sql_phone_key('phone')}, "
+                         f"email_key = {sql_email_key('email')}")
+        conn.execute("DROP INDEX IF EXISTS idx_customers_phone")
+        conn.execute("DROP INDEX IF EXISTS idx_customers_email")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_phone_key ON customers(phone_key)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_email_key ON customers(email_key)")
+        conn.commit()
+
+    @staticmethod
+    def exists(conn, phone, email):
+        """True if a customer has the same phone key or e-mail, as CustomerIndex.contains (indexed)."""
+        phone, email = phone_key(normalize_phone(phone)), normalize_email(email)
+        if not phone and not email:
+            return False
+        return conn.execute("SELECT 1 FROM customers WHERE phone_key=? OR email_key=? LIMIT 1",
+                            (phone, email)).fetchone() is not None
+
+    def write(self, rows):
+        self.conn.executemany("INSERT INTO customers (name, phone, email, loyalty_points) VALUES (?, ?, ?, ?)",
+                              [(name, phone, email, points) for name, phone, email, _, _, points in rows])
+        self.conn.commit()
+
+
+class MySQLCustomers:
+    """nexus_tech Customer_Details."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def known(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT customer_contact, customer_email FROM Customer_Details")
+        return cursor.fetchall()
+
+    def write(self, rows):
+        now = datetime.now()
+        cursor = self.conn.cursor()
+        cursor.executemany("""
+            INSERT INTO Customer_Details
+            (customer_name, customer_contact, customer_email, customer_address,
+             customer_type, loyalty_points, membership_level, registration_date)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, [row + ('Bronze', now) for row in rows])
+        self.conn.commit()
+
+
+# ---------- Import ----------
+def import_rows(rows, target, chunk_rows=CHUNK_ROWS, pause=CHUNK_PAUSE, progress=None):
+    """Validate, de-duplicate and insert (line_no, row) pairs. Returns a CustomerImportReport."""
+    report = CustomerImportReport()
+    index = CustomerIndex(target.known())
+    chunk = []
+
+    def flush():
+        target.write(chunk)
+        report.inserted += len(chunk)
+        chunk.clear()
+        if progress:
+            progress(report)
+        if pause:
+            time.sleep(pause)
+
+    try:
+        for line_no, row in rows:
+            rec, reason = validate(row)
+            if rec is None:
+                report.reject(line_no, reason, row)
+                continue
+            phone, email = rec[1], rec[2]
+            if index.contains(phone, email):
+                report.duplicates += 1
+                continue
+            index.add(phone, email)
+            chunk.append(rec)
+            if len(chunk) >= chunk_rows:
+                flush()
+        if chunk:
+            flush()
+    except Exception:
+        target.conn.rollback()
+        raise
+    finally:
+        report.seconds = time.perf_counter() - report.started
+    return report
+
+
+def iter_customers_csv(path):
+    return iter_csv(path, HEADER_ALIASES, required=("name",))
+
+
+def import_csv_sqlite(path, db_file=DB_FILE, chunk_rows=CHUNK_ROWS, progress=None):
+    # wait for a busy till rather than failing the chunk
+    conn = sqlite3.connect(db_file, timeout=30)
+    try:
+        return import_rows(iter_customers_csv(path), SqliteCustomers(conn), chunk_rows, progress=progress)
+    finally:
+        conn.close()
+
+
+def import_csv_mysql(path, conn, chunk_rows=CHUNK_ROWS, progress=None):
+    return import_rows(iter_customers_csv(path), MySQLCustomers(conn), chunk_rows, progress=progress)
+
+
+# ---------- Run ----------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Bulk import customers from CSV into shop.db")
+    ap.add_argument("csv")
+    ap.add_argument("--db", default=DB_FILE)
+    ap.add_argument("--chunk", type=int, default=CHUNK_ROWS)
+    ap.add_argument("--rejects", help="write rejected rows to this CSV")
+    args = ap.parse_args()
+    report = import_csv_sqlite(args.csv, args.db, args.chunk)
+    print(report.summary())
+    for line_no, reason, _ in report.rejects[:20]:
+        print(f"  line {line_no}: {reason}")
+    if args.rejects and report.rejects:
+        report.write_rejects(args.rejects)
+        print(f"Rejected rows written to {args.rejects}")
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+ABC/XYZ inventory classification.
+
+ABC ranks products by their share of revenue: the products that together
+make up the first 80% of revenue are A, the next 15% B and the rest C.
+XYZ rates how steady weekly demand is, by the coefficient of variation
+(std / mean) of units sold per week: X <= 0.5, Y <= 1.0, Z above that or no
+sales at all.
+
+The whole catalog is classified in one pass: line items are loaded once,
+bucketed into a products x weeks demand matrix with np.bincount and reduced
+along the week axis. Results are stored in a `product_classes` table so the
+product lists and reports can filter on them.
+
+Works on shop.db (sales_items / sales) and on the MySQL nexus_tech database
+(Transaction_Items / Transaction_History).
+
+Usage:
+    python inventory_classes.py [shop.db] [--weeks 26]
+"""
+
+import time
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+
+# NumPy does the per-product / per-week aggregation
+HAS_NUMPY = True
+try:
+    import numpy as np
+except Exception:
+    HAS_NUMPY = False
+
+# ------------ Config ------------
+DB_FILE = "shop.db"
+WEEKS = 26                  # demand history used for XYZ
+A_SHARE = 0.80              # cumulative revenue share covered by class A
+B_SHARE = 0.95              # ... by classes A and B
+X_CV = 0.5                  # max coefficient of variation for X
+Y_CV = 1.0                  # ... for Y
+CLASS_FILTERS = ["All", "A", "B", "C", "X", "Y", "Z",
+                 "AX", "AY", "AZ", "BX", "BY", "BZ", "CX", "CY", "CZ"]
+# ---------------------------------
+
+
+# ---------- Classification ----------
+def classify(product_ids, item_products, item_weeks, item_qty, item_revenue, weeks=WEEKS):
+    """
+    Vectorized ABC/XYZ classification.
+
+    product_ids: every product in the catalog
+    item_*:      one entry per line item (product id, weeks ago, units, revenue)
+    Returns a list of (product_id, abc, xyz, revenue, revenue_share, cv).
+    """
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    order = np.argsort(product_ids)
+    catalog = product_ids[order]
+    n = len(catalog)
+    if n == 0:
+        return []
+
+    # position of every line item's product in the catalog (unknown products dropped)
+    pos = np.searchsorted(catalog, item_products)
+    pos = np.minimum(pos, n - 1)
+    known = (catalog[pos] == item_products) & (item_weeks >= 0) & (item_weeks < weeks)
+    pos, item_weeks = pos[known], item_weeks[known]
+    item_qty, item_revenue = item_qty[known], item_revenue[known]
+
+    # ABC - cumulative revenue share, best sellers first
+    revenue = np.bincount(pos, weights=item_revenue, minlength=n)
+    total = revenue.sum()
+    share = revenue / total if total > 0 else np.zeros(n)
+    ranked = np.argsort(-revenue, kind="stable")
+    before = np.empty(n)
+    before[ranked] = np.cumsum(share[ranked]) - share[ranked]   # share of everything ranked above
+    abc = np.where(before < A_SHARE, "A", np.where(before < B_SHARE, "B", "C"))
+    abc[revenue <= 0] = "C"
+
+    # XYZ - variability of weekly demand
+    demand = np.bincount(pos * weeks + item_weeks, weights=item_qty, minlength=n * weeks).reshape(n, weeks)
+    mean = demand.mean(axis=1)
+    std = demand.std(axis=1)
+    cv = np.divide(std, mean, out=np.full(n, np.inf), where=mean > 0)
+    xyz = np.where(cv <= X_CV, "X", np.where(cv <= Y_CV, "Y", "Z"))
+
+    return [(int(catalog[i]), str(abc[i]), str(xyz[i]), float(revenue[i]), float(share[i]),
+             float(cv[i]) if np.isfinite(cv[i]) else None)
+            for i in range(n)]
+
+
+def _columns(rows, dtypes):
+    """Split fetched rows into one NumPy array per column."""
+    if not rows:
+        return [np.empty(0, dtype=d) for d in dtypes]
+    return [np.array([r[i] or 0 for r in rows], dtype=d) for i, d in enumerate(dtypes)]
+
+
+# ---------- shop.db (sqlite) ----------
+def ensure_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS product_classes (
+            product_id INTEGER PRIMARY KEY,
+            abc TEXT,
+            xyz TEXT,
+            revenue REAL,
+            revenue_share REAL,
+            cv REAL,
+            classified_at TEXT
+        )
+    """)
+    conn.commit()
+
+
+def classify_sqlite(db_file=DB_FILE, weeks=WEEKS):
+    """Classify every product in shop.db and store the result. Returns a stats dict."""
+    if not HAS_NUMPY:
+        raise RuntimeError("ABC/XYZ classification requires the 'numpy' package.\nInstall with: pip install numpy")
+    started = time.perf_counter()
+    now = datetime.now()
+    since = (now - timedelta(weeks=weeks)).strftime("%Y-%m-%d %H:%M:%S")
+    conn = sqlite3.connect(db_file)
+    try:
+        ensure_table(conn)
+        product_ids = [r[0] for r in conn.execute("SELECT id FROM products")]
+        rows = conn.execute("""
+            SELECT si.product_id,
+                   CAST((julianday(?) - julianday(s.timestamp)) / 7 AS INTEGER),
+                   si.qty, si.subtotal
+            FROM sales_items si
+            JOIN sales s ON s.id = si.sale_id
+            WHERE s.timestamp >= ? AND si.product_id IS NOT NULL
+        """, (now.strftime("%Y-%m-%d %H:%M:%S"), since)).fetchall()
+        result = classify(product_ids, *_columns(rows, ("i8", "i8", "f8", "f8")), weeks=weeks)
+
+        stamp = now.strftime("%Y-%m-%d %H:%M:%S")
+        with conn:
+            conn.execute("DELETE FROM product_classes")
+            conn.executemany("INSERT INTO product_classes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [r + (stamp,) for r in result])
+    finally:
+        conn.close()
+    return _stats(result, len(rows), started)
+
+
+def load_classes(conn):
+    """{product_id: "AX"} for every classified product in shop.db."""
+    ensure_table(conn)
+    return {pid: abc + xyz for pid, abc, xyz in conn.execute("SELECT product_id, abc, xyz FROM product_classes")}
+
+
+# ---------- nexus_tech (MySQL) ----------
+MYSQL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS Product_Classes (
+    product_id INT PRIMARY KEY,
+    abc CHAR(1) NOT NULL,
+    xyz CHAR(1) NOT NULL,
+    revenue DECIMAL(12,2),
+    revenue_share DOUBLE,
+    cv DOUBLE,
+    classified_at DATETIME,
+    FOREIGN KEY (product_id) REFERENCES Product_Details(product_id) ON DELETE CASCADE
+)
+"""
+
+
+def classify_mysql(conn, weeks=WEEKS):
+    """Classify Product_Details from Transaction_Items and store it in Product_Classes."""
+    if not HAS_NUMPY:
+        raise RuntimeError("ABC/XYZ classification requires the 'numpy' package.\nInstall with: pip install numpy")
+    started = time.perf_counter()
+    now = datetime.now()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(MYSQL_SCHEMA)
+        cursor.execute("SELECT product_id FROM Product_Details")
+        product_ids = [r[0] for r in cursor.fetchall()]
+        cursor.execute("""
+            SELECT i.product_id, FLOOR(DATEDIFF(%s, t.transaction_date) / 7),
+                   i.quantity, COALESCE(i.line_total, 0)
+            FROM Transaction_Items i
+            JOIN Transaction_History t ON t.transaction_id = i.transaction_id
+            WHERE t.transaction_date >= %s AND i.product_id IS NOT NULL
+        """, (now, now - timedelta(weeks=weeks)))
+        rows = cursor.fetchall()
+        result = classify(product_ids, *_columns(rows, ("i8", "i8", "f8", "f8")), weeks=weeks)
+
+        cursor.execute("DELETE FROM Product_Classes")
+        cursor.executemany("""
+            INSERT INTO Product_Classes (product_id, abc, xyz, revenue, revenue_share, cv, classified_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, [r + (now,) for r in result])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return _stats(result, len(rows), started)
+
+
+def _stats(result, line_items, started):
+    counts = {}
+    for r in result:
+        counts[r[1] + r[2]] = counts.get(r[1] + r[2], 0) + 1
+    return {
+        'products': len(result),
+        'line_items': line_items,
+        'classes': dict(sorted(counts.items())),
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def class_matches(cls, wanted):
+    """True if a combined class like "AX" passes a CLASS_FILTERS choice ("All", "A", "X", "AX"...)."""
+    if not wanted or wanted == "All":
+        return True
+    if not cls:
+        return False
+    if len(wanted) == 2:
+        return cls == wanted
+    return wanted in cls
+
+
+# ---------- Run ----------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="ABC/XYZ classification of the product catalog")
+    ap.add_argument("db", nargs="?", default=DB_FILE)
+    ap.add_argument("--weeks", type=int, default=WEEKS)
+    args = ap.parse_args()
+    stats = classify_sqlite(args.db, args.weeks)
+    print(f"Classified {stats['products']} products from {stats['line_items']} line items "
+          f"in {stats['seconds']:.2f}s")
+    for cls, n in stats['classes'].items():
+        print(f"  {cls}: {n}")
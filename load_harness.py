@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Multi-till load harness for Final Billing's checkout.
+
+Starts N worker processes that each behave like a till: pick a basket
+(popular products more often), check stock the way the scan entry does, and
+check out through services.ShopCheckout - the code POSApp.checkout runs -
+against one shared database, with no Tk window or display.
+
+A checkout that fails because the database is locked or the invoice number
+collides (invoice numbers have one-second resolution) is retried with
+backoff, like a cashier pressing Checkout again. When all workers finish,
+the database is checked against the workers' own record:
+
+- lost_updates   products whose stock does not equal start - sold
+- oversold       products with negative stock
+- unreported     committed sales a worker did not see succeed, or the reverse
+- orphan_sales   sale headers with no line items
+
+The harness works on a copy (load_test.db), never on the source database.
+
+Usage:
+    python load_harness.py --workers 4 --rate 5 --duration 30
+    python load_harness.py --db shop.db --workers 8 --rate 0 --checkouts 200 --stock 20 --journal-mode wal
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import functools
+import multiprocessing as mp
+from collections import Counter
+
+import services
+import synthetic_data
+from benchmark_suite import latency_stats
+
+# ------------ Config ------------
+WORK_DB = "load_test.db"
+MAX_RETRIES = 5
+BACKOFF_S = 0.05            # first retry delay, doubled each time
+SYNTH_PRODUCTS = 2000       # used when no --db is given
+SYNTH_CUSTOMERS = 2000
+# ---------------------------------
+
+
+def classify(message):
+    text = message.lower()
+    if "locked" in text or "busy" in text:
+        return "locked"
+    if "unique" in text and "invoice_no" in text:
+        return "invoice_collision"
+    return "other"
+
+
+def worker(n, db_file, rate, duration, checkouts, seed, start_at, results):
+    connect = functools.partial(services.sqlite_connect, db_file)
+    shop = services.ShopCheckout(connect, synthetic_data.TAX_RATE)
+    inventory = services.ShopInventory(connect)
+    rng = random.Random(seed * 1000 + n)
+    conn = connect()
+    products = [(r['id'], r['name'], r['price']) for r in conn.execute("SELECT id, name, price FROM products")]
+    max_customer = conn.execute("SELECT MAX(id) FROM customers").fetchone()[0] or 0
+    conn.close()
+    rng.shuffle(products)
+    cum_weights = synthetic_data.zipf_cum_weights(len(products))
+    baskets = range(1, len(synthetic_data.BASKET_WEIGHTS) + 1)
+
+    latencies, errors, sold = [], Counter(), Counter()
+    committed = failed = retries = skipped = out_of_stock = 0
+    interval = 1.0 / rate if rate > 0 else 0.0
+    while time.time() < start_at:
+        time.sleep(0.001)
+    started = time.perf_counter()
+    i = 0
+    while True:
+        if checkouts and i >= checkouts or not checkouts and time.perf_counter() - started >= duration:
+            break
+        if interval:
+            delay = started + i * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        i += 1
+
+        # build the cart the way the scan entry does: look up stock, refuse what is not there
+        k = rng.choices(baskets, weights=synthetic_data.BASKET_WEIGHTS)[0]
+        lines = []
+        for pid, name, price in {products[j] for j in rng.choices(range(len(products)), cum_weights=cum_weights, k=k)}:
+            if not inventory.available(pid):
+                out_of_stock += 1
+                continue
+            lines.append(services.CartLine(pid, name, price, 1))
+        if not lines:
+            skipped += 1
+            continue
+        customer = rng.randrange(1, max_customer + 1) if max_customer and rng.random() < synthetic_data.CUSTOMER_SHARE else None
+        sale = services.Sale(lines, "Cash", f"load-{n}", customer)
+
+        t0 = time.perf_counter()
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                shop.checkout(sale)
+                ok = True
+            except (services.ServiceError, sqlite3.OperationalError) as e:
+                ok, message = False, str(e)
+            if ok:
+                break
+            kind = classify(message)
+            errors[kind] += 1
+            if kind == "other" or attempt == MAX_RETRIES:
+                break
+            retries += 1
+            time.sleep(BACKOFF_S * 2 ** attempt)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        if ok:
+            committed += 1
+            for line in lines:
+                sold[line.product_id] += line.qty
+        else:
+            failed += 1
+
+    results.put({
+        'worker': n,
+        'attempts': i,
+        'committed': committed,
+        'failed': failed,
+        'retries': retries,
+        'skipped_empty_cart': skipped,
+        'out_of_stock_refusals': out_of_stock,
+        'errors': dict(errors),
+        'latencies_ms': latencies,
+        'sold': dict(sold),
+        'seconds': time.perf_counter() - started,
+    })
+
+
+# ---------- Setup / checks ----------
+def prepare(source, work, stock=None, journal_mode=None, seed=synthetic_data.SEED):
+    if source:
+        for suffix in ("", "-journal", "-wal", "-shm"):
+            if os.path.exists(work + suffix):
+                os.remove(work + suffix)
+        shutil.copyfile(source, work)
+    else:
+        synthetic_data.generate(work, SYNTH_PRODUCTS, SYNTH_CUSTOMERS, 0, seed=seed)
+    conn = sqlite3.connect(work)
+    if stock is not None:
+        conn.execute("UPDATE products SET stock=?", (stock,))
+        conn.commit()
+    if journal_mode:
+        conn.execute(f"PRAGMA journal_mode={journal_mode}")
+    before = dict(conn.execute("SELECT id, COALESCE(stock, 0) FROM products"))
+    last_sale = conn.execute("SELECT COALESCE(MAX(id), 0) FROM sales").fetchone()[0]
+    conn.close()
+    return before, last_sale
+
+
+def check(db_file, before, last_sale, reports):
+    conn = sqlite3.connect(db_file)
+    after = dict(conn.execute("SELECT id, COALESCE(stock, 0) FROM products"))
+    db_sold = dict(conn.execute("SELECT si.product_id, SUM(si.qty) FROM sales_items si "
+                                "JOIN sales s ON s.id = si.sale_id WHERE s.id > ? GROUP BY si.product_id",
+                                (last_sale,)))
+    db_sales = conn.execute("SELECT COUNT(*) FROM sales WHERE id > ?", (last_sale,)).fetchone()[0]
+    orphans = conn.execute("SELECT COUNT(*) FROM sales s WHERE s.id > ? AND NOT EXISTS "
+                           "(SELECT 1 FROM sales_items si WHERE si.sale_id = s.id)", (last_sale,)).fetchone()[0]
+    duplicates = conn.execute("SELECT COUNT(*) FROM (SELECT invoice_no FROM sales WHERE id > ? "
+                              "GROUP BY invoice_no HAVING COUNT(*) > 1)", (last_sale,)).fetchone()[0]
+    conn.close()
+
+    reported = Counter()
+    for r in reports:
+        reported.update({int(k): v for k, v in r['sold'].items()})
+    lost = [pid for pid, start in before.items() if after.get(pid, 0) != start - db_sold.get(pid, 0)]
+    mismatched = [pid for pid in set(db_sold) | set(reported) if db_sold.get(pid, 0) != reported.get(pid, 0)]
+    return {
+        'sales_in_db': db_sales,
+        'sales_reported': sum(r['committed'] for r in reports),
+        'lost_updates': len(lost),
+        'oversold': sum(1 for pid, s in after.items() if s < 0 and before.get(pid, 0) >= 0),
+        'unreported_products': len(mismatched),
+        'orphan_sales': orphans,
+        'duplicate_invoices': duplicates,
+    }
+
+
+def run(workers, rate, duration, checkouts, source=None, work=WORK_DB, stock=None, journal_mode=None,
+        seed=synthetic_data.SEED, progress=print):
+    progress(f"Preparing {work} from {source or 'synthetic data'} ...")
+    before, last_sale = prepare(source, work, stock, journal_mode, seed)
+    results = mp.Queue()
+    start_at = time.time() + 1.0        # let every process load before the clock starts
+    procs = [mp.Process(target=worker, args=(n, work, rate, duration, checkouts, seed, start_at, results))
+             for n in range(workers)]
+    for p in procs:
+        p.start()
+    progress(f"{workers} tills running ...")
+    reports = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    reports.sort(key=lambda r: r['worker'])
+
+    latencies = [ms for r in reports for ms in r['latencies_ms']]
+    wall = max(r['seconds'] for r in reports)
+    errors = Counter()
+    for r in reports:
+        errors.update(r['errors'])
+    committed = sum(r['committed'] for r in reports)
+    return {
+        'workers': workers,
+        'rate_per_worker': rate,
+        'journal_mode': journal_mode or "default",
+        'seconds': wall,
+        'committed': committed,
+        'failed': sum(r['failed'] for r in reports),
+        'throughput_per_s': committed / wall if wall else 0.0,
+        'latency': latency_stats(latencies) if latencies else {},
+        'retries': sum(r['retries'] for r in reports),
+        'errors': dict(errors),
+        'out_of_stock_refusals': sum(r['out_of_stock_refusals'] for r in reports),
+        'consistency': check(work, before, last_sale, reports),
+        'per_worker': [{k: v for k, v in r.items() if k not in ("latencies_ms", "sold")} for r in reports],
+    }
+
+
+def print_summary(report):
+    lat, c = report['latency'], report['consistency']
+    print(f"\n{report['workers']} tills, {report['rate_per_worker'] or 'unthrottled'} checkouts/s each, "
+          f"journal {report['journal_mode']}, {report['seconds']:.1f}s")
+    print(f"  committed {report['committed']}, failed {report['failed']}, "
+          f"{report['throughput_per_s']:.1f} checkouts/s")
+    if lat:
+        print(f"  latency p50 {lat['p50_ms']:.1f} ms  p95 {lat['p95_ms']:.1f} ms  "
+              f"p99 {lat['p99_ms']:.1f} ms  max {lat['max_ms']:.1f} ms")
+    print(f"  retries {report['retries']}, errors {report['errors'] or 'none'}, "
+          f"out-of-stock refusals {report['out_of_stock_refusals']}")
+    print(f"  consistency: lost updates {c['lost_updates']}, oversold {c['oversold']}, "
+          f"unreported {c['unreported_products']}, orphan sales {c['orphan_sales']}, "
+          f"duplicate invoices {c['duplicate_invoices']} "
+          f"({c['sales_in_db']} sales in db / {c['sales_reported']} reported)")
+
+
+# ---------- Run ----------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Concurrent checkout load test for Final Billing")
+    ap.add_argument("--db", help="source database to copy (default: generate synthetic data)")
+    ap.add_argument("--work", default=WORK_DB, help=f"working copy (default {WORK_DB})")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--rate", type=float, default=5.0, help="checkouts per second per till, 0 = as fast as possible")
+    ap.add_argument("--duration", type=float, default=30.0, help="seconds to run (ignored with --checkouts)")
+    ap.add_argument("--checkouts", type=int, default=0, help="checkouts per till instead of a duration")
+    ap.add_argument("--stock", type=int, help="reset every product's stock to this before starting")
+    ap.add_argument("--journal-mode", choices=("delete", "wal", "truncate", "persist"))
+    ap.add_argument("--seed", type=int, default=synthetic_data.SEED)
+    ap.add_argument("--out", help="write the report as JSON")
+    args = ap.parse_args()
+
+    if args.db and os.path.abspath(args.db) == os.path.abspath(args.work):
+        sys.exit("--work must differ from --db; the harness never writes to the source database")
+    report = run(args.workers, args.rate, args.duration, args.checkouts, args.db, args.work,
+                 args.stock, args.journal_mode, args.seed)
+    print_summary(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.out}")
@@ -0,0 +1,322 @@
+"""
+In-process counters and histograms, served over HTTP on localhost in the
+Prometheus text exposition format.
+
+Recording is always on and costs about a microsecond per event (a dict
+lookup, a lock, a bisect and two additions); the HTTP endpoint only starts
+when NEXUS_METRICS=1. Besides the counters defined here, every scrape also
+reports the query statistics from query_metrics, the event-loop lag from
+ui_monitor (when it is running) and any gauges registered with gauge(), such
+as the MySQL pool usage in Nexus_Tech.
+
+    curl http://127.0.0.1:9464/metrics
+
+Environment:
+    NEXUS_METRICS=1             start the HTTP endpoint
+    NEXUS_METRICS_PORT=9464     port (always bound to 127.0.0.1)
+"""
+
+import os
+import sys
+import time
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import query_metrics
+import ui_monitor
+
+# ------------ Config ------------
+ENABLED = os.environ.get("NEXUS_METRICS", "0") == "1"
+HOST = "127.0.0.1"
+PORT = int(os.environ.get("NEXUS_METRICS_PORT", "9464"))
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# ---------------------------------
+
+_LOCK = threading.Lock()
+_METRICS = []           # Counter / Histogram / _GaugeFunc in registration order
+_STARTED = time.time()
+_server = None
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+# ---------- Metric types ----------
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        with _LOCK:
+            self.value += amount
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        if not self.labelnames:
+            self.children[()] = _CounterChild()
+        _METRICS.append(self)
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            with _LOCK:
+                child = self.children.setdefault(values, _CounterChild())
+        return child
+
+    def inc(self, *values, amount=1):
+        self.labels(*values).inc(amount)
+
+    def samples(self):
+        for values, child in list(self.children.items()):
+            yield f"{self.name}{_labels(self.labelnames, values)} {_num(child.value)}"
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        i = bisect_left(self.bounds, value)
+        with _LOCK:
+            self.counts[i] += 1
+            self.sum += value
+
+    def timer(self):
+        return _Timer(self)
+
+
+class _Timer:
+    """with HISTOGRAM.labels('pos').timer(): ... - observes the elapsed seconds."""
+
+    __slots__ = ("child", "started")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.children = {}
+        if not self.labelnames:
+            self.children[()] = _HistogramChild(self.buckets)
+        _METRICS.append(self)
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            with _LOCK:
+                child = self.children.setdefault(values, _HistogramChild(self.buckets))
+        return child
+
+    def observe(self, *values, value):
+        self.labels(*values).observe(value)
+
+    def samples(self):
+        for values, child in list(self.children.items()):
+            with _LOCK:
+                counts, total = list(child.counts), child.sum
+            yield from histogram_lines(self.name, self.labelnames, values, self.buckets, counts, total)
+
+
+class _GaugeFunc:
+    kind = "gauge"
+
+    def __init__(self, name, help_text, fn):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+
+    def samples(self):
+        try:
+            value = self.fn()
+        except Exception:
+            return
+        if value is not None:
+            yield f"{self.name} {_num(value)}"
+
+
+def histogram_lines(name, labelnames, values, bounds, counts, total):
+    """Exposition lines for one histogram series from per-bucket (non-cumulative) counts."""
+    running = 0
+    for bound, n in zip(bounds, counts):
+        running += n
+        le = 'le="%g"' % bound
+        yield f"{name}_bucket{_labels(labelnames, values, le)} {running}"
+    running += counts[-1]
+    le = 'le="+Inf"'
+    yield f"{name}_bucket{_labels(labelnames, values, le)} {running}"
+    yield f"{name}_sum{_labels(labelnames, values)} {_num(float(total))}"
+    yield f"{name}_count{_labels(labelnames, values)} {running}"
+
+
+def gauge(name, help_text, fn):
+    """Register a gauge whose value is read from fn() at scrape time."""
+    for m in _METRICS:
+        if m.name == name:
+            m.fn = fn
+            return m
+    g = _GaugeFunc(name, help_text, fn)
+    _METRICS.append(g)
+    return g
+
+
+# ---------- Application metrics ----------
+CHECKOUTS = Counter("nexus_checkouts_total", "Checkout attempts that reached the database, by result",
+                    ("app", "result"))
+CHECKOUT_SECONDS = Histogram("nexus_checkout_duration_seconds", "Checkout transaction time", ("app",))
+SCANS = Counter("nexus_scan_lookups_total", "Barcode / product-id lookups, by result", ("app", "result"))
+SCAN_SECONDS = Histogram("nexus_scan_lookup_duration_seconds", "Barcode / product-id lookup time", ("app",))
+DB_ERRORS = Counter("nexus_db_errors_total", "Database errors, by where they happened", ("app", "kind"))
+DB_ACQUIRE_SECONDS = Histogram("nexus_db_connection_acquire_seconds", "Time to get a database connection",
+                               ("app", "source"))
+UI_ERRORS = Counter("nexus_ui_callback_errors_total", "Uncaught exceptions in Tk callbacks", ("app",))
+
+
+# ---------- Scrape ----------
+def _query_lines():
+    reg = query_metrics.REGISTRY
+    bounds = tuple(b / 1000 for b in query_metrics.BUCKETS_MS)
+    with reg.lock:
+        stats = list(reg.stats.values())
+        counts = [0] * (len(bounds) + 1)
+        total_ms = slow = rows = 0
+        for st in stats:
+            for i, n in enumerate(st.buckets):
+                counts[i] += n
+            total_ms += st.total_ms
+            slow += st.slow
+            rows += st.rows
+    yield "# HELP nexus_db_query_duration_seconds Statement time including fetch (query_metrics)"
+    yield "# TYPE nexus_db_query_duration_seconds histogram"
+    yield from histogram_lines("nexus_db_query_duration_seconds", (), (), bounds, counts, total_ms / 1000)
+    yield "# HELP nexus_db_slow_queries_total Statements over the slow-query threshold"
+    yield "# TYPE nexus_db_slow_queries_total counter"
+    yield f"nexus_db_slow_queries_total {slow}"
+    yield "# HELP nexus_db_rows_total Rows returned or affected"
+    yield "# TYPE nexus_db_rows_total counter"
+    yield f"nexus_db_rows_total {rows}"
+    yield "# HELP nexus_db_statement_fingerprints Distinct statement fingerprints seen"
+    yield "# TYPE nexus_db_statement_fingerprints gauge"
+    yield f"nexus_db_statement_fingerprints {len(stats)}"
+
+
+def _ui_lines():
+    mon = ui_monitor._ACTIVE
+    if mon is None:
+        return
+    drift = list(mon.drift)
+    yield "# HELP nexus_ui_timer_drift_seconds How late the event-loop probe fired (ui_monitor)"
+    yield "# TYPE nexus_ui_timer_drift_seconds summary"
+    for q, v in zip(("0.5", "0.95", "0.99"), ui_monitor.percentiles(drift).values()):
+        yield f'nexus_ui_timer_drift_seconds{{quantile="{q}"}} {_num(v / 1000)}'
+    yield f"nexus_ui_timer_drift_seconds_sum {_num(sum(drift) / 1000)}"
+    yield f"nexus_ui_timer_drift_seconds_count {len(drift)}"
+    callbacks = list(mon.callbacks.values())
+    yield "# HELP nexus_ui_stalls_total Tk callbacks that blocked the event loop past the stall threshold"
+    yield "# TYPE nexus_ui_stalls_total counter"
+    yield f"nexus_ui_stalls_total {sum(c[3] for c in callbacks)}"
+    yield "# HELP nexus_ui_callbacks_total Tk callbacks run"
+    yield "# TYPE nexus_ui_callbacks_total counter"
+    yield f"nexus_ui_callbacks_total {sum(c[0] for c in callbacks)}"
+
+
+def render():
+    """The full exposition text."""
+    lines = []
+    for m in list(_METRICS):
+        samples = list(m.samples())
+        if not samples:
+            continue
+        lines.append(f"# HELP {m.name} {m.help}")
+        lines.append(f"# TYPE {m.name} {m.kind}")
+        lines.extend(samples)
+    lines.extend(_query_lines())
+    lines.extend(_ui_lines())
+    lines.append("# HELP nexus_process_uptime_seconds Seconds since the metrics module was loaded")
+    lines.append("# TYPE nexus_process_uptime_seconds gauge")
+    lines.append(f"nexus_process_uptime_seconds {_num(time.time() - _STARTED)}")
+    return "\n".join(lines) + "\n"
+
+
+# ---------- HTTP ----------
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _count_ui_errors(root, app):
+    original = root.report_callback_exception
+
+    def report(exc, val, tb):
+        UI_ERRORS.inc(app)
+        original(exc, val, tb)
+
+    root.report_callback_exception = report
+
+
+def start(root=None, app="pos", port=PORT):
+    """Serve /metrics on 127.0.0.1 if NEXUS_METRICS=1. Returns the server or None."""
+    global _server
+    if root is not None:
+        _count_ui_errors(root, app)
+    if not ENABLED or _server is not None:
+        return _server
+    try:
+        _server = ThreadingHTTPServer((HOST, port), _Handler)
+    except OSError as e:
+        print(f"metrics endpoint not started on {HOST}:{port}: {e}", file=sys.stderr)
+        return None
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Salted, tunable password hashing shared by every login screen.
+
+Hashes are self-describing strings, so the cost can be raised later without
+breaking existing accounts:
+
+    scrypt$<n>$<r>$<p>$<salt b64>$<hash b64>
+    pbkdf2_sha256$<iterations>$<salt b64>$<hash b64>
+
+The cost factor is calibrated once on the store hardware (see `calibrate`)
+to a target verification latency and saved to password_hashing.json. Stored
+values that are not in this format - unsalted SHA-256 hex digests
+(NexusTechSystem) or plain text (Login_Page, Test1.py) - still verify, and
+`check_password` hands back a fresh hash so the caller can upgrade the
+account on a successful login.
+
+Usage:
+    python password_hashing.py calibrate [--target-ms 250] [--algorithm scrypt|pbkdf2_sha256]
+    python password_hashing.py bench [--runs 20]
+"""
+
+import os
+import sys
+import json
+import time
+import hmac
+import base64
+import hashlib
+import argparse
+import statistics
+
+# ------------ Config ------------
+CONFIG_FILE = "password_hashing.json"
+TARGET_MS = 250             # verification latency budget per login
+SALT_BYTES = 16
+HASH_BYTES = 32
+DEFAULTS = {
+    "scrypt": {"n": 2 ** 14, "r": 8, "p": 1},
+    "pbkdf2_sha256": {"iterations": 600000},
+}
+# ---------------------------------
+
+HAS_SCRYPT = hasattr(hashlib, "scrypt")
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _is_sha256_hex(stored):
+    return len(stored) == 64 and all(c in "0123456789abcdef" for c in stored.lower())
+
+
+class PasswordHasher:
+    """Hash and verify passwords with one algorithm and cost setting."""
+
+    def __init__(self, algorithm="scrypt", **params):
+        if algorithm == "scrypt" and not HAS_SCRYPT:
+            algorithm = "pbkdf2_sha256"
+            params = {}
+        if algorithm not in DEFAULTS:
+            raise ValueError(f"Unknown password hashing algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.params = dict(DEFAULTS[algorithm], **params)
+
+    # ---------- Hashing ----------
+    def _derive(self, algorithm, params, password, salt):
+        if algorithm == "scrypt":
+            n, r, p = params["n"], params["r"], params["p"]
+            return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                                  maxmem=256 * n * r + 1024 * 1024, dklen=HASH_BYTES)
+        return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt,
+                                   params["iterations"], dklen=HASH_BYTES)
+
+    def hash(self, password):
+        salt = os.urandom(SALT_BYTES)
+        digest = self._derive(self.algorithm, self.params, password, salt)
+        if self.algorithm == "scrypt":
+            p = self.params
+            return f"scrypt${p['n']}${p['r']}${p['p']}${_b64(salt)}${_b64(digest)}"
+        return f"pbkdf2_sha256${self.params['iterations']}${_b64(salt)}${_b64(digest)}"
+
+    @staticmethod
+    def parse(stored):
+        """(algorithm, params, salt, digest), or None for a legacy value."""
+        parts = (stored or "").split("$")
+        try:
+            if parts[0] == "scrypt" and len(parts) == 6:
+                params = {"n": int(parts[1]), "r": int(parts[2]), "p": int(parts[3])}
+                return "scrypt", params, _unb64(parts[4]), _unb64(parts[5])
+            if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+                return "pbkdf2_sha256", {"iterations": int(parts[1])}, _unb64(parts[2]), _unb64(parts[3])
+        except ValueError:
+            return None
+        return None
+
+    # ---------- Verifying ----------
+    def verify(self, password, stored):
+        """True if `password` matches `stored` (current format, SHA-256 hex or plain text)."""
+        if not stored:
+            return False
+        parsed = self.parse(stored)
+        if parsed is None:
+            if _is_sha256_hex(stored):
+                candidate = hashlib.sha256(password.encode("utf-8")).hexdigest()
+                return hmac.compare_digest(candidate, stored.lower())
+            return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+        algorithm, params, salt, digest = parsed
+        if algorithm == "scrypt" and not HAS_SCRYPT:
+            return False
+        return hmac.compare_digest(self._derive(algorithm, params, password, salt), digest)
+
+    def needs_rehash(self, stored):
+        """True for legacy values and hashes made with another algorithm or a lower cost."""
+        parsed = self.parse(stored)
+        if parsed is None:
+            return True
+        algorithm, params = parsed[0], parsed[1]
+        return algorithm != self.algorithm or params != self.params
+
+    def check_and_upgrade(self, password, stored):
+        """(ok, new_hash): new_hash is set when the account should be re-saved."""
+        if not self.verify(password, stored):
+            return False, None
+        return True, self.hash(password) if self.needs_rehash(stored) else None
+
+
+# ---------- Calibration ----------
+def _time_once(hasher):
+    salt = os.urandom(SALT_BYTES)
+    started = time.perf_counter()
+    hasher._derive(hasher.algorithm, hasher.params, "calibration-password", salt)
+    return (time.perf_counter() - started) * 1000
+
+
+def calibrate(target_ms=TARGET_MS, algorithm="scrypt"):
+    """
+    Pick the highest cost whose verification stays within target_ms on this machine.
+    Returns a PasswordHasher with those settings.
+    """
+    if algorithm == "scrypt" and HAS_SCRYPT:
+        n = 2 ** 12
+        best = n
+        while n <= 2 ** 20:
+            ms = min(_time_once(PasswordHasher("scrypt", n=n)) for _ in range(3))
+            if ms > target_ms:
+                break
+            best = n
+            n *= 2
+        return PasswordHasher("scrypt", n=best)
+
+    # PBKDF2 cost is linear in the iteration count
+    probe = 100000
+    ms = min(_time_once(PasswordHasher("pbkdf2_sha256", iterations=probe)) for _ in range(3))
+    iterations = max(100000, int(probe * target_ms / max(ms, 0.001)) // 1000 * 1000)
+    return PasswordHasher("pbkdf2_sha256", iterations=iterations)
+
+
+def save_config(hasher, target_ms, path=CONFIG_FILE):
+    data = {"algorithm": hasher.algorithm, "params": hasher.params, "target_ms": target_ms}
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def load_hasher(path=CONFIG_FILE):
+    """Hasher from the calibrated config, or the defaults when there is none."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return PasswordHasher(data["algorithm"], **data.get("params", {}))
+    except (OSError, ValueError, KeyError):
+        return PasswordHasher()
+
+
+_hasher = None
+
+
+def get_hasher():
+    global _hasher
+    if _hasher is None:
+        _hasher = load_hasher()
+    return _hasher
+
+
+def hash_password(password):
+    return get_hasher().hash(password)
+
+
+def check_password(password, stored):
+    """(ok, new_hash) using the configured hasher - see PasswordHasher.check_and_upgrade."""
+    return get_hasher().check_and_upgrade(password, stored)
+
+
+# ---------- Benchmark ----------
+def benchmark(runs=20, hasher=None, budget_ms=None):
+    """Time `runs` verifications. Returns a stats dict (mean_ms, p95_ms, max_ms, within_budget)."""
+    hasher = hasher or get_hasher()
+    if budget_ms is None:
+        try:
+            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+                budget_ms = json.load(f).get("target_ms", TARGET_MS)
+        except (OSError, ValueError):
+            budget_ms = TARGET_MS
+    stored = hasher.hash("benchmark-password")
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        hasher.verify("benchmark-password", stored)
+        times.append((time.perf_counter() - started) * 1000)
+    times.sort()
+    p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+    return {
+        'algorithm': hasher.algorithm,
+        'params': hasher.params,
+        'mean_ms': statistics.mean(times),
+        'p95_ms': p95,
+        'max_ms': times[-1],
+        'budget_ms': budget_ms,
+        'within_budget': p95 <= budget_ms,
+    }
+
+
+# ---------- Run ----------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Password hashing calibration and benchmark")
+    sub = ap.add_subparsers(dest="command", required=True)
+    cal = sub.add_parser("calibrate", help="pick the cost for this machine and save it")
+    cal.add_argument("--target-ms", type=float, default=TARGET_MS)
+    cal.add_argument("--algorithm", choices=sorted(DEFAULTS), default="scrypt")
+    bench = sub.add_parser("bench", help="time login verification with the saved settings")
+    bench.add_argument("--runs", type=int, default=20)
+    args = ap.parse_args(argv)
+
+    if args.command == "calibrate":
+        hasher = calibrate(args.target_ms, args.algorithm)
+        save_config(hasher, args.target_ms)
+        print(f"Saved {hasher.algorithm} {hasher.params} to {CONFIG_FILE}")
+        args.runs = 10
+
+    stats = benchmark(args.runs)
+    print(f"{stats['algorithm']} {stats['params']}: mean {stats['mean_ms']:.1f} ms, "
+          f"p95 {stats['p95_ms']:.1f} ms, max {stats['max_ms']:.1f} ms "
+          f"(budget {stats['budget_ms']:.0f} ms)")
+    if not stats['within_budget']:
+        print("Login verification is over budget - run calibrate again on this machine.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Till side of pos_server.py.
+
+PosClient holds one socket to the server; its attributes stand in for the
+services a till would otherwise build on its own connections, with the same
+method names and return types:
+
+    shop / billing       ShopCheckout / BillingCheckout  (totals, checkout)
+    inventory            ShopInventory                   (lookup, get, search, available)
+    customers            ShopCustomers                   (search, add)
+    nexus_inventory      NexusInventory                  (get)
+    nexus_checkout       NexusCheckout                   (quote, checkout)
+
+Errors come back as the same services exceptions. A server that cannot be
+reached, or whose database is down, raises Unavailable - a
+DatabaseUnavailable that, unlike NexusTechSystem.get_connection's, has not
+been shown to the user yet. Writes are resent once under the same key if
+the reply is lost (the server applies them once); if the resend fails too,
+ResultUnknown says the sale may or may not have been recorded.
+
+Environment:
+    NEXUS_POS_SERVER=127.0.0.1:8765     use the server (unset: tills work on the database directly)
+"""
+
+import os
+import uuid
+import socket
+import threading
+
+import services
+import pos_protocol
+from pos_protocol import HEADER, OK
+
+# ------------ Config ------------
+SERVER = os.environ.get("NEXUS_POS_SERVER", "")
+TIMEOUT_S = 10.0
+# ---------------------------------
+
+
+class Unavailable(services.DatabaseUnavailable):
+    pass
+
+
+class ResultUnknown(Unavailable):
+    """A write was sent but neither it nor its resend was answered."""
+
+
+class PosClient:
+    def __init__(self, host, port, tax_rate=0.15, timeout=TIMEOUT_S):
+        self.address = (host, port)
+        self.timeout = timeout
+        self.sock = None
+        self.next_id = 0
+        self.lock = threading.Lock()        # one request at a time per client
+        self.shop = RemoteCheckout(self, 'shop', tax_rate)
+        self.billing = RemoteCheckout(self, 'billing', tax_rate, ("Nothing in cart.",))
+        self.inventory = RemoteInventory(self)
+        self.customers = RemoteCustomers(self)
+        self.nexus_inventory = RemoteNexusInventory(self)
+        self.nexus_checkout = RemoteNexusCheckout(self)
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def _recv_exactly(self, n):
+        buf = bytearray()
+        while len(buf) < n:
+            chunk = self.sock.recv(n - len(buf))
+            if not chunk:
+                raise ConnectionError("POS server closed the connection")
+            buf += chunk
+        return bytes(buf)
+
+    def call(self, op, *args):
+        """Send one request and wait for its reply; reconnects and resends once if the socket went stale."""
+        with self.lock:
+            self.next_id += 1
+            if op in pos_protocol.KEYED_OPS:
+                args = (uuid.uuid4().hex, *args)    # a resend under the same key is applied once
+            message = pos_protocol.pack([self.next_id, op, *args])
+            sent = False
+            for attempt in (1, 2):
+                try:
+                    if self.sock is None:
+                        self.sock = self._connect()
+                    sent = True
+                    self.sock.sendall(message)
+                    size = pos_protocol.check_length(HEADER.unpack(self._recv_exactly(HEADER.size))[0])
+                    reply = pos_protocol.unpack(self._recv_exactly(size))
+                    break
+                except (OSError, ValueError) as e:
+                    self.close_socket()
+                    if attempt == 2:
+                        where = f"{self.address[0]}:{self.address[1]}"
+                        if sent and op in pos_protocol.KEYED_OPS:
+                            raise ResultUnknown(f"Lost contact with POS server {where} before it confirmed: {e}\n"
+                                                f"It may have been recorded - check before trying again.") from e
+                        raise Unavailable(f"POS server {where} is not reachable: {e}") from e
+        if reply[1] == OK:
+            return reply[2]
+        cls = pos_protocol.error_class(reply[2])
+        raise (Unavailable if issubclass(cls, services.DatabaseUnavailable) else cls)(reply[3])
+
+    def close_socket(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def ping(self):
+        return self.call('ping') == "pong"
+
+
+# ---------- Remote services ----------
+class RemoteCheckout:
+    def __init__(self, client, kind, tax_rate, empty_message=()):
+        self.client = client
+        self.kind = kind
+        self.tax_rate = tax_rate
+        self.EMPTY_MESSAGE = empty_message
+
+    def totals(self, sale):
+        # same arithmetic as the server; no round trip needed to show the total
+        return services.Totals.compute(sale.lines, self.tax_rate, sale.discount_percent, sale.discount_amount)
+
+    def checkout(self, sale):
+        if not sale.lines:
+            raise services.EmptyCart(*self.EMPTY_MESSAGE)
+        return pos_protocol.decode_sale_result(self.client.call('checkout', self.kind, pos_protocol.encode_sale(sale)))
+
+
+class RemoteInventory:
+    def __init__(self, client):
+        self.client = client
+
+    def lookup(self, code):
+        return pos_protocol.decode_product(self.client.call('lookup', code))
+
+    def get(self, product_id):
+        return pos_protocol.decode_product(self.client.call('get', product_id))
+
+    def search(self, term=None, category=None):
+        return pos_protocol.decode_products(self.client.call('search', term, category))
+
+    def available(self, product_id, qty=1):
+        return self.client.call('available', product_id, qty)
+
+
+class RemoteCustomers:
+    def __init__(self, client):
+        self.client = client
+
+    def search(self, term=None):
+        return pos_protocol.decode_customers(self.client.call('customers.search', term))
+
+    def add(self, name, phone=None, email=None, allow_duplicate=False):
+        return pos_protocol.decode_customer(self.client.call('customers.add', name, phone, email, allow_duplicate))
+
+
+class RemoteNexusInventory:
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, product_id):
+        return pos_protocol.decode_product(self.client.call('nexus.get', product_id))
+
+
+class RemoteNexusCheckout:
+    def __init__(self, client):
+        self.client = client
+
+    def quote(self, customer_id, lines):
+        return pos_protocol.decode_nexus_quote(self.client.call('nexus.quote', customer_id, pos_protocol.encode(lines)))
+
+    def checkout(self, customer_id, lines):
+        if not lines:
+            raise services.EmptyCart()
+        return pos_protocol.decode_nexus_sale_result(
+            self.client.call('nexus.checkout', customer_id, pos_protocol.encode(lines)))
+
+
+def from_env(tax_rate=0.15):
+    """A PosClient for NEXUS_POS_SERVER (host:port, or just a port on 127.0.0.1), else None."""
+    if not SERVER:
+        return None
+    host, _, port = SERVER.rpartition(":")
+    return PosClient(host or "127.0.0.1", int(port), tax_rate)
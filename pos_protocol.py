@@ -0,0 +1,105 @@
+"""
+Wire format between pos_server and pos_client.
+
+Every message is a 4-byte big-endian length followed by that many bytes of
+UTF-8 JSON (no whitespace). Requests and replies are positional lists so a
+typical scan is well under 100 bytes:
+
+    request   [id, op, arg, ...]
+              [id, op, key, arg, ...]           KEYED_OPS
+    reply     [id, 0, result]                   success
+              [id, 1, error_class, message]     failure (a services.ServiceError subclass name)
+
+Replies carry the request id, so a client may pipeline several requests on
+one connection. Writes (KEYED_OPS) carry a client-generated key as their
+first argument; the server runs each key once and answers a resend - after
+a timeout or dropped connection - with the first outcome, so a till can
+retry a checkout without recording the sale twice. Service dataclasses travel as dataclasses.astuple() lists;
+the decode_* functions rebuild them.
+"""
+
+import json
+import struct
+import dataclasses
+
+import services
+
+HEADER = struct.Struct(">I")
+MAX_FRAME = 16 * 1024 * 1024       # refuse anything larger (a corrupt or foreign peer)
+OK, ERROR = 0, 1
+KEYED_OPS = frozenset({'checkout', 'customers.add', 'nexus.checkout'})
+
+
+def pack(message):
+    body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(len(body)) + body
+
+
+def unpack(body):
+    return json.loads(body.decode("utf-8"))
+
+
+def check_length(n):
+    if n > MAX_FRAME:
+        raise ValueError(f"frame of {n} bytes exceeds {MAX_FRAME}")
+    return n
+
+
+def error_class(name):
+    """services exception class for a reply's error name (ServiceError if unknown)."""
+    cls = getattr(services, name, None)
+    return cls if isinstance(cls, type) and issubclass(cls, services.ServiceError) else services.ServiceError
+
+
+# ---------- Dataclass codecs ----------
+def encode(obj):
+    if obj is None:
+        return None
+    if isinstance(obj, list):
+        return [encode(o) for o in obj]
+    return dataclasses.astuple(obj)
+
+
+def encode_sale(sale):
+    return [[dataclasses.astuple(l) for l in sale.lines], sale.payment_method, sale.staff, sale.customer_id,
+            sale.discount_percent, sale.discount_amount, sale.payment_details]
+
+
+def decode_lines(rows):
+    return [services.CartLine(*r) for r in rows]
+
+
+def decode_sale(data):
+    return services.Sale(decode_lines(data[0]), *data[1:])
+
+
+def decode_totals(data):
+    return services.Totals(*data)
+
+
+def decode_sale_result(data):
+    return services.SaleResult(data[0], data[1], decode_totals(data[2]), data[3])
+
+
+def decode_product(data):
+    return services.Product(*data) if data is not None else None
+
+
+def decode_products(rows):
+    return [services.Product(*r) for r in rows]
+
+
+def decode_customer(data):
+    return services.Customer(*data)
+
+
+def decode_customers(rows):
+    return [services.Customer(*r) for r in rows]
+
+
+def decode_nexus_quote(data):
+    return services.NexusQuote(decode_totals(data[0]), *data[1:])
+
+
+def decode_nexus_sale_result(data):
+    return services.NexusSaleResult(decode_totals(data[0]), data[1])
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Local POS server - one process owns shop.db and the tills talk to it.
+
+Without it every till opens its own connections, reads the catalog itself
+and takes the database write lock for each checkout, so adding tills adds
+lock contention and SQLITE_BUSY retries (see load_harness.py). With it:
+
+- reads (scan lookup, product search, stock checks) are answered from one
+  in-memory catalog shared by all tills; it is reloaded only when another
+  program commits to shop.db (PRAGMA data_version changes - the product
+  manager, receiving, repricing), and at least every REFRESH_S seconds
+- checkouts go through a queue to a single writer thread that commits
+  whatever has queued up as one transaction (group commit), each sale in its
+  own SAVEPOINT so a bad sale is rolled back without failing its neighbours
+- invoice numbers come from one allocator, so two tills in the same second
+  no longer collide on the UNIQUE invoice_no (INV<timestamp>, then
+  INV<timestamp>-2, -3 ... within that second)
+- writes are keyed by the till (see pos_protocol.KEYED_OPS) and the last
+  RECENT_KEYS keys are remembered, so a checkout resent after a lost reply
+  gets the first result instead of being recorded twice
+- with --nexus it also serves the Nexus staff checkout on its own MySQL pool;
+  Nexus checkouts are serialized too, which keeps the read-then-write
+  loyalty points update from losing points between tills
+
+The checkout code itself is the services package the tills would run
+locally. The protocol is in pos_protocol.py, the till side in pos_client.py.
+Tills use the server when NEXUS_POS_SERVER=host:port is set.
+
+Usage:
+    python pos_server.py                          # shop.db on 127.0.0.1:8765
+    python pos_server.py --db shop.db --port 8765 --nexus
+"""
+
+import sys
+import time
+import sqlite3
+import asyncio
+import argparse
+import functools
+import dataclasses
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import services
+import metrics_exporter
+import pos_protocol
+from pos_protocol import HEADER, OK, ERROR
+
+# ------------ Config ------------
+DB_FILE = "shop.db"
+HOST = "127.0.0.1"          # local tills only
+PORT = 8765
+TAX_RATE = 0.15             # same as Final Billing.py / Billing_and_Product.py
+LOYALTY_PER_DOLLAR = 0.1
+MAX_BATCH = 64              # sales per group commit
+REFRESH_S = 60.0            # reload the catalog at least this often
+NEXUS_POOL_SIZE = 5
+RECENT_KEYS = 4096          # keyed writes remembered for de-duplicating resends
+# ---------------------------------
+
+REQUESTS = metrics_exporter.Counter("nexus_pos_server_requests_total", "Requests served, by op and result",
+                                    ("op", "result"))
+REQUEST_SECONDS = metrics_exporter.Histogram("nexus_pos_server_request_duration_seconds",
+                                             "Time from request to reply", ("op",))
+BATCH_SIZE = metrics_exporter.Histogram("nexus_pos_server_commit_batch_size", "Sales per group commit", (),
+                                        buckets=(1, 2, 4, 8, 16, 32, 64))
+
+
+class InvoiceAllocator:
+    """generate_invoice_no(), with -2, -3 ... appended for further sales in the same second."""
+
+    def __init__(self):
+        self.last = None
+        self.count = 0
+
+    def __call__(self):
+        base = services.generate_invoice_no()
+        if base == self.last:
+            self.count += 1
+            return f"{base}-{self.count}"
+        self.last, self.count = base, 1
+        return base
+
+
+# ---------- Catalog cache ----------
+class Catalog:
+    """shop.db products in memory, answering like services.ShopInventory."""
+
+    def __init__(self):
+        self.products = {}          # id -> services.Product, in id order
+        self.barcodes = {}          # barcode.lower() -> id
+        self.version = None         # PRAGMA data_version the cache matches
+        self.loaded_at = 0.0
+
+    def load(self, conn):
+        rows = conn.execute("SELECT id, name, price, stock, category, barcode FROM products ORDER BY id").fetchall()
+        self.products = {r[0]: services.Product(*r) for r in rows}
+        self.barcodes = {p.barcode.lower(): p.id for p in self.products.values() if p.barcode}
+        self.loaded_at = time.monotonic()
+
+    def lookup(self, code):
+        code = (code or "").strip()
+        if not code:
+            return None
+        pid = self.barcodes.get(code.lower())
+        if pid is None and code.isdigit():
+            pid = int(code)
+        return self.products.get(pid)
+
+    def get(self, product_id):
+        return self.products.get(product_id)
+
+    def search(self, term=None, category=None):
+        if category:
+            return [p for p in self.products.values() if p.category == category]
+        if term:
+            t = term.lower()
+            return [p for p in self.products.values()
+                    if t in p.name.lower() or t in (p.category or "").lower() or t in (p.barcode or "").lower()]
+        return list(self.products.values())
+
+    def available(self, product_id, qty=1):
+        p = self.products.get(product_id)
+        return p is not None and (p.stock is None or p.stock >= qty)
+
+    def sold(self, lines):
+        """Apply a committed sale's stock decrement, as the UPDATE did."""
+        for l in lines:
+            p = self.products.get(l.product_id)
+            if p is not None and p.stock is not None:
+                self.products[l.product_id] = dataclasses.replace(p, stock=p.stock - l.qty)
+
+
+# ---------- Server ----------
+class PosServer:
+    def __init__(self, db_file=DB_FILE, tax_rate=TAX_RATE, loyalty_per_dollar=LOYALTY_PER_DOLLAR,
+                 nexus_config=None, max_batch=MAX_BATCH):
+        self.db_file = db_file
+        self.max_batch = max_batch
+        connect = functools.partial(services.sqlite_connect, db_file, check_same_thread=False)
+        self.invoice_no = InvoiceAllocator()
+        # connect is unused for group commits (apply() runs on the writer's connection)
+        self.checkouts = {
+            'shop': services.ShopCheckout(connect, tax_rate, loyalty_per_dollar, self.invoice_no),
+            'billing': services.BillingCheckout(connect, tax_rate, loyalty_per_dollar, self.invoice_no),
+        }
+        self.customers = services.ShopCustomers(connect)
+        self.catalog = Catalog()
+        self.probe = connect()                                  # data_version checks, event-loop thread only
+        self.read_conn = connect()                              # catalog loads, reader thread only
+        self.write_conn = connect(isolation_level=None)         # explicit BEGIN/COMMIT, writer thread only
+        self.reader = ThreadPoolExecutor(1, thread_name_prefix="pos-read")
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix="pos-write")
+        self.nexus = None
+        if nexus_config:
+            self._start_nexus(nexus_config)
+        self.handlers = {
+            'ping': self.op_ping,
+            'lookup': self.op_lookup,
+            'get': self.op_get,
+            'search': self.op_search,
+            'available': self.op_available,
+            'customers.search': self.op_customers_search,
+            'customers.add': self.op_customers_add,
+            'checkout': self.op_checkout,
+            'nexus.get': self.op_nexus_get,
+            'nexus.quote': self.op_nexus_quote,
+            'nexus.checkout': self.op_nexus_checkout,
+        }
+        self.recent = OrderedDict()     # write key -> task, oldest first
+        self.queue = None
+        self.catalog_lock = None
+        self.tasks = set()
+
+    def _start_nexus(self, config):
+        from mysql.connector import pooling
+        pool = pooling.MySQLConnectionPool(pool_name='pos_server', pool_size=NEXUS_POOL_SIZE, **config)
+
+        def connect():
+            try:
+                return pool.get_connection()
+            except Exception as e:
+                raise services.DatabaseUnavailable(f"Error connecting to database: {e}") from e
+
+        self.nexus = {
+            'inventory': services.NexusInventory(connect),
+            'checkout': services.NexusCheckout(connect),
+            'reader': ThreadPoolExecutor(NEXUS_POOL_SIZE - 1, thread_name_prefix="pos-nexus-read"),
+            'writer': ThreadPoolExecutor(1, thread_name_prefix="pos-nexus-write"),
+        }
+        try:
+            self.nexus['checkout'].ensure_schema()
+        except services.DatabaseUnavailable:
+            pass  # retried by the first Nexus checkout
+
+    # ---------- Catalog freshness ----------
+    def _data_version(self):
+        return self.probe.execute("PRAGMA data_version").fetchone()[0]
+
+    def _stale(self):
+        return (self.catalog.version != self._data_version()
+                or time.monotonic() - self.catalog.loaded_at > REFRESH_S)
+
+    async def fresh_catalog(self):
+        if self._stale():
+            async with self.catalog_lock:
+                if self._stale():
+                    version = self._data_version()
+                    await asyncio.get_running_loop().run_in_executor(self.reader, self.catalog.load, self.read_conn)
+                    self.catalog.version = version
+        return self.catalog
+
+    # ---------- Group commit ----------
+    def _commit(self, batch):
+        """Writer thread: one transaction for the batch, one savepoint per sale. Returns results/exceptions."""
+        cur = self.write_conn.cursor()
+        outcomes = []
+        try:
+            cur.execute("BEGIN IMMEDIATE")
+            for service, sale in batch:
+                cur.execute("SAVEPOINT sale")
+                try:
+                    outcomes.append(service.apply(cur, sale))
+                    cur.execute("RELEASE sale")
+                except Exception as e:
+                    cur.execute("ROLLBACK TO sale")
+                    cur.execute("RELEASE sale")
+                    if not isinstance(e, services.ServiceError):
+                        e = services.CheckoutFailed(f"Failed to complete sale: {e}")
+                    outcomes.append(e)
+            cur.execute("COMMIT")
+        except sqlite3.Error as e:
+            if self.write_conn.in_transaction:
+                self.write_conn.execute("ROLLBACK")
+            return [services.CheckoutFailed(f"Failed to complete sale: {e}")] * len(batch)
+        return outcomes
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            BATCH_SIZE.observe(value=len(batch))
+            # hold the catalog lock so a reload cannot interleave with the stock decrements below
+            async with self.catalog_lock:
+                outcomes = await loop.run_in_executor(self.writer, self._commit,
+                                                      [(service, sale) for service, sale, _ in batch])
+                for (_, sale, future), outcome in zip(batch, outcomes):
+                    if isinstance(outcome, Exception):
+                        future.set_exception(outcome)
+                    else:
+                        self.catalog.sold(sale.lines)
+                        future.set_result(outcome)
+                self.catalog.version = self._data_version()
+
+    # ---------- Operations ----------
+    async def op_ping(self):
+        return "pong"
+
+    async def op_lookup(self, code):
+        return pos_protocol.encode((await self.fresh_catalog()).lookup(code))
+
+    async def op_get(self, product_id):
+        return pos_protocol.encode((await self.fresh_catalog()).get(product_id))
+
+    async def op_search(self, term=None, category=None):
+        return pos_protocol.encode((await self.fresh_catalog()).search(term, category))
+
+    async def op_available(self, product_id, qty=1):
+        return (await self.fresh_catalog()).available(product_id, qty)
+
+    async def op_customers_search(self, term=None):
+        loop = asyncio.get_running_loop()
+        return pos_protocol.encode(await loop.run_in_executor(self.reader, self.customers.search, term))
+
+    async def op_customers_add(self, name, phone=None, email=None, allow_duplicate=False):
+        loop = asyncio.get_running_loop()
+        add = functools.partial(self.customers.add, name, phone, email, allow_duplicate)
+        return pos_protocol.encode(await loop.run_in_executor(self.writer, add))
+
+    async def op_checkout(self, kind, sale):
+        service = self.checkouts.get(kind)
+        if service is None:
+            raise services.ServiceError(f"Unknown checkout {kind!r}.")
+        sale = pos_protocol.decode_sale(sale)
+        if not sale.lines:
+            raise services.EmptyCart(*service.EMPTY_MESSAGE)
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((service, sale, future))
+        return pos_protocol.encode(await future)
+
+    def _nexus(self):
+        if self.nexus is None:
+            raise services.DatabaseUnavailable("The POS server was started without --nexus.")
+        return self.nexus
+
+    async def op_nexus_get(self, product_id):
+        nexus = self._nexus()
+        loop = asyncio.get_running_loop()
+        return pos_protocol.encode(await loop.run_in_executor(nexus['reader'], nexus['inventory'].get, product_id))
+
+    async def op_nexus_quote(self, customer_id, lines):
+        nexus = self._nexus()
+        quote = functools.partial(nexus['checkout'].quote, customer_id, pos_protocol.decode_lines(lines))
+        return pos_protocol.encode(await asyncio.get_running_loop().run_in_executor(nexus['reader'], quote))
+
+    async def op_nexus_checkout(self, customer_id, lines):
+        nexus = self._nexus()
+        checkout = functools.partial(nexus['checkout'].checkout, customer_id, pos_protocol.decode_lines(lines))
+        return pos_protocol.encode(await asyncio.get_running_loop().run_in_executor(nexus['writer'], checkout))
+
+    async def _once(self, key, handler, args):
+        """Run a keyed write once; a resend of the same key waits for and returns the first outcome."""
+        task = self.recent.get(key)
+        if task is None:
+            task = asyncio.ensure_future(handler(*args))
+            self.recent[key] = task
+            while len(self.recent) > RECENT_KEYS:
+                self.recent.popitem(last=False)
+        return await asyncio.shield(task)
+
+    # ---------- Connections ----------
+    async def _handle(self, request, writer):
+        started = time.perf_counter()
+        rid, op, args = request[0], request[1], request[2:]
+        try:
+            handler = self.handlers.get(op)
+            if handler is None:
+                raise services.ServiceError(f"Unknown request {op!r}.")
+            if op in pos_protocol.KEYED_OPS:
+                result = await self._once(args[0], handler, args[1:])
+            else:
+                result = await handler(*args)
+            reply = [rid, OK, result]
+            REQUESTS.inc(op, "ok")
+        except services.ServiceError as e:
+            reply = [rid, ERROR, type(e).__name__, str(e)]
+            REQUESTS.inc(op, "error")
+        except Exception as e:
+            print(f"pos_server: {op} failed: {e!r}", file=sys.stderr)
+            reply = [rid, ERROR, "ServiceError", f"POS server error: {e}"]
+            REQUESTS.inc(op, "error")
+        REQUEST_SECONDS.observe(op, value=time.perf_counter() - started)
+        if not writer.is_closing():
+            writer.write(pos_protocol.pack(reply))
+
+    async def _serve(self, reader, writer):
+        # requests on one connection run concurrently, so a queued checkout never holds up a scan
+        try:
+            while True:
+                size = pos_protocol.check_length(HEADER.unpack(await reader.readexactly(HEADER.size))[0])
+                request = pos_protocol.unpack(await reader.readexactly(size))
+                task = asyncio.create_task(self._handle(request, writer))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError as e:
+            print(f"pos_server: dropping client: {e}", file=sys.stderr)
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT, ready=None):
+        self.queue = asyncio.Queue()
+        self.catalog_lock = asyncio.Lock()
+        await self.fresh_catalog()
+        write_loop = asyncio.create_task(self._write_loop())
+        server = await asyncio.start_server(self._serve, host, port)
+        print(f"POS server on {host}:{port} - {len(self.catalog.products)} products from {self.db_file}"
+              f"{' + nexus' if self.nexus else ''}")
+        if ready is not None:
+            ready()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            write_loop.cancel()
+
+
+def nexus_config():
+    """The MySQL settings the Nexus front end connects with."""
+    import Nexus_Tech
+    return dict(Nexus_Tech.NexusTechSystem().db_config)
+
+
+# ---------- Run ----------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Local POS server shared by the tills")
+    ap.add_argument("--db", default=DB_FILE)
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--max-batch", type=int, default=MAX_BATCH, help="sales per group commit")
+    ap.add_argument("--nexus", action="store_true", help="also serve the Nexus staff checkout (MySQL)")
+    args = ap.parse_args()
+
+    pos = PosServer(args.db, nexus_config=nexus_config() if args.nexus else None, max_batch=args.max_batch)
+    metrics_exporter.start(None, "pos_server", port=metrics_exporter.PORT + 1)
+    try:
+        asyncio.run(pos.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
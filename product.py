@@ -2,6 +2,11 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import sqlite3
 
+import repricing
+import query_metrics
+import ui_monitor
+import action_profiler
+
 DB_FILE = "shop.db"
 #tkinter：Python 自带的图形界面库，tk 是窗口控件（Button、Label 等）的前缀。
 #ttk：tkinter 的“美化版控件”，外观更好看一点。
@@ -39,9 +44,14 @@ class App(tk.Tk):
         super().__init__()
         self.title("Simple Product Manager")
         self.geometry("900x600")
+        # 界面卡顿监控，只有设置 NEXUS_UI_MONITOR=1 才会启用
+        ui_monitor.install(self, "product")
+        # 设置 NEXUS_PROFILE=1 时，每个按钮操作都会用 cProfile 记录到 profiles/ 目录
+        action_profiler.install(self, "product")
 
         # 整个程序只用一个数据库连接
-        self.conn = sqlite3.connect(DB_FILE)
+        # query_metrics 会记录每条 SQL 的耗时，慢查询写进 slow_queries.log
+        self.conn = query_metrics.connect_sqlite(DB_FILE, "product")
 
         # 把页面放进来
         self.page = ProductPage(self, self.conn)
@@ -138,6 +148,8 @@ class ProductPage(ttk.Frame):
                    command=self.update_product).pack(side="left", padx=5)
         ttk.Button(btn_frame, text="Delete Selected",
                    command=self.delete_product).pack(side="left", padx=5)
+        ttk.Button(btn_frame, text="Bulk Reprice...",
+                   command=self.bulk_reprice).pack(side="left", padx=5)
 
         # 先加载一次数据
         self.load_products()
@@ -331,6 +343,17 @@ class ProductPage(ttk.Frame):
 #删除后刷新表格。
 
 
+    # ---------- 批量调价 ----------
+    def bulk_reprice(self):
+        # 选中了多行就只调这几行，否则按类别/名称/价格表整体调价
+        sel = self.tree.selection()
+        ids = [int(self.tree.item(i, "values")[0]) for i in sel] if len(sel) > 1 else None
+        repricing.RepriceWindow(self, self.conn, on_applied=self.load_products, product_ids=ids)
+#RepriceWindow：先 Preview 预览哪些价格会变，再 Apply 一次性提交（一条 UPDATE）。
+#每次改价都会写进 price_history 表，方便以后查历史价格。
+#调价完成后调用 load_products() 刷新表格。
+
+
 # ---------- 入口 ----------
 if __name__ == "__main__":
     init_db()
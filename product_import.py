@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Bulk product import from a supplier CSV.
+
+The file is streamed row by row (never loaded whole), every row is validated,
+categories are resolved through a name -> id map built once, and rows are
+written with executemany in large transactions. Existing products are
+updated in place (matched by barcode, or by name when there is no barcode),
+new ones are inserted. Rejected rows are collected with their line number
+and reason.
+
+Accepted headers (case-insensitive):
+    category, name / product_name, price / product_price,
+    stock / quantity / product_number, barcode (optional)
+
+Works on shop.db (`products`) and on the MySQL nexus_tech database
+(`Product_Details` / `Product_Category`).
+
+Usage:
+    python product_import.py supplier.csv [--db shop.db] [--rejects rejects.csv]
+"""
+
+import csv
+import math
+import time
+import sqlite3
+import argparse
+
+# ------------ Config ------------
+DB_FILE = "shop.db"
+BATCH_ROWS = 5000           # rows per transaction
+MAX_REJECTS_KEPT = 10000    # rejected rows kept in memory for the report
+# ---------------------------------
+
+HEADER_ALIASES = {
+    "category": "category", "category_name": "category",
+    "name": "name", "product_name": "name",
+    "price": "price", "product_price": "price",
+    "stock": "stock", "quantity": "stock", "qty": "stock", "product_number": "stock",
+    "barcode": "barcode",
+}
+
+
+# ---------- Reading & validation ----------
+def iter_csv(path, aliases=HEADER_ALIASES, required=("name", "price")):
+    """Yield (line_no, row dict with normalized keys) without loading the whole file."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        keys = [aliases.get(h.strip().lower().replace(" ", "_")) for h in header]
+        missing = [k for k in required if k not in keys]
+        if missing:
+            raise ValueError(f"CSV is missing required column(s): {', '.join(missing)}")
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            yield reader.line_num, {k: v.strip() for k, v in zip(keys, row) if k}
+
+
+def validate(row):
+    """Return ((category, name, price, stock, barcode), None) or (None, reason)."""
+    name = row.get("name", "")
+    if not name:
+        return None, "missing name"
+    if len(name) > 200:
+        return None, "name longer than 200 characters"
+    try:
+        price = round(float(row.get("price", "").replace("$", "").replace(",", "")), 2)
+    except ValueError:
+        return None, f"invalid price {row.get('price')!r}"
+    if not math.isfinite(price):
+        return None, f"invalid price {row.get('price')!r}"
+    if price < 0:
+        return None, "negative price"
+    stock_text = row.get("stock", "") or "0"
+    try:
+        stock = int(float(stock_text))
+    except (ValueError, OverflowError):     # OverflowError: "inf", "1e400"
+        return None, f"invalid stock {stock_text!r}"
+    if stock < 0:
+        return None, "negative stock"
+    return (row.get("category", ""), name, price, stock, row.get("barcode") or None), None
+
+
+# ---------- Report ----------
+class ImportReport:
+    columns = ("category", "name", "price", "stock", "barcode")
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.rejected = 0
+        self.rejects = []       # (line_no, reason, row) - first MAX_REJECTS_KEPT only
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def reject(self, line_no, reason, row):
+        self.rejected += 1
+        if len(self.rejects) < MAX_REJECTS_KEPT:
+            self.rejects.append((line_no, reason, row))
+
+    @property
+    def rows_per_second(self):
+        total = self.inserted + self.updated + self.rejected
+        return total / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self):
+        return (f"{self.inserted} inserted, {self.updated} updated, {self.rejected} rejected "
+                f"in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s)")
+
+    def write_rejects(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["line", "reason"] + list(self.columns))
+            for line_no, reason, row in self.rejects:
+                writer.writerow([line_no, reason] + [row.get(k, "") for k in self.columns])
+
+
+# ---------- Targets ----------
+class SqliteProducts:
+    """shop.db products: category is a text column, barcode is the preferred key."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.by_barcode = {}
+        self.by_name = {}
+        for pid, name, barcode in conn.execute("SELECT id, name, barcode FROM products"):
+            if barcode:
+                self.by_barcode[barcode] = pid
+            if name:
+                self.by_name.setdefault(name.lower(), pid)
+
+    def category(self, name):
+        return name
+
+    def existing(self, name, barcode):
+        if barcode and barcode in self.by_barcode:
+            return self.by_barcode[barcode]
+        return self.by_name.get(name.lower())
+
+    def write(self, inserts, updates):
+        cur = self.conn.cursor()
+        if updates:
+            cur.executemany("UPDATE products SET category=?, name=?, price=?, stock=?, "
+                            "barcode=COALESCE(?, barcode) WHERE id=?", updates)
+        if inserts:
+            last_id = cur.execute("SELECT COALESCE(MAX(id), 0) FROM products").fetchone()[0]
+            cur.executemany("INSERT INTO products (category, name, price, stock, barcode) VALUES (?, ?, ?, ?, ?)",
+                            inserts)
+            # learn the new ids (all above last_id inside this transaction) so later batches update them
+            for pid, name, barcode in cur.execute("SELECT id, name, barcode FROM products WHERE id > ?", (last_id,)):
+                self.remember(name, barcode, pid)
+        self.conn.commit()
+
+    def remember(self, name, barcode, pid):
+        if barcode:
+            self.by_barcode[barcode] = pid
+        self.by_name.setdefault(name.lower(), pid)
+
+
+class MySQLProducts:
+    """nexus_tech Product_Details: categories are ids, products are matched by name."""
+
+    def __init__(self, conn, create_categories=True):
+        self.conn = conn
+        self.create_categories = create_categories
+        cursor = conn.cursor()
+        cursor.execute("SELECT category_id, category_name FROM Product_Category")
+        self.categories = {name.lower(): cid for cid, name in cursor.fetchall()}
+        cursor.execute("SELECT product_id, product_name FROM Product_Details")
+        self.by_name = {}
+        for pid, name in cursor.fetchall():
+            self.by_name.setdefault(name.lower(), pid)
+
+    def category(self, name):
+        """Category id for a name; unknown categories are created once (or rejected)."""
+        key = name.lower()
+        if key not in self.categories:
+            if not name or not self.create_categories:
+                return None
+            cursor = self.conn.cursor()
+            cursor.execute("INSERT INTO Product_Category (category_name) VALUES (%s)", (name,))
+            self.categories[key] = cursor.lastrowid
+        return self.categories[key]
+
+    def existing(self, name, barcode):
+        return self.by_name.get(name.lower())
+
+    def write(self, inserts, updates):
+        cursor = self.conn.cursor()
+        if updates:
+            cursor.executemany("""
+                UPDATE Product_Details SET category_id=%s, product_name=%s, product_price=%s, product_number=%s
+                WHERE product_id=%s
+            """, [(cat, name, price, stock, pid) for cat, name, price, stock, _, pid in updates])
+        if inserts:
+            # multi-row INSERT: mysql.connector rewrites executemany into one statement
+            cursor.executemany("""
+                INSERT INTO Product_Details (category_id, product_name, product_price, product_number)
+                VALUES (%s, %s, %s, %s)
+            """, [rec[:4] for rec in inserts])
+            # learn the new ids so later batches update these products instead of duplicating them
+            names = [rec[1] for rec in inserts]
+            cursor.execute(f"SELECT product_id, product_name FROM Product_Details WHERE product_name IN "
+                           f"({', '.join(['%s'] * len(names))})", names)
+            for pid, name in cursor.fetchall():
+                self.by_name.setdefault(name.lower(), pid)
+        self.conn.commit()
+
+
+# ---------- Import ----------
+def import_rows(rows, target, batch_rows=BATCH_ROWS, progress=None):
+    """Validate and upsert (line_no, row) pairs into target. Returns an ImportReport."""
+    report = ImportReport()
+    inserts, updates = [], []
+    pending = {}        # key -> index in inserts, so duplicates inside one batch update instead
+
+    def flush():
+        target.write(inserts, updates)
+        report.inserted += len(inserts)
+        report.updated += len(updates)
+        inserts.clear()
+        updates.clear()
+        pending.clear()
+        if progress:
+            progress(report)
+
+    try:
+        for line_no, row in rows:
+            rec, reason = validate(row)
+            if rec is None:
+                report.reject(line_no, reason, row)
+                continue
+            category, name, price, stock, barcode = rec
+            category_key = target.category(category)
+            if category_key is None:
+                report.reject(line_no, f"unknown category {category!r}", row)
+                continue
+            rec = (category_key, name, price, stock, barcode)
+
+            key = barcode or name.lower()
+            pid = target.existing(name, barcode)
+            if pid is not None:
+                updates.append(rec + (pid,))
+            elif key in pending:
+                inserts[pending[key]] = rec      # later line for the same new product wins
+            else:
+                pending[key] = len(inserts)
+                inserts.append(rec)
+
+            if len(inserts) + len(updates) >= batch_rows:
+                flush()
+        if inserts or updates:
+            flush()
+    except Exception:
+        target.conn.rollback()
+        raise
+    finally:
+        report.seconds = time.perf_counter() - report.started
+    return report
+
+
+def import_csv_sqlite(path, db_file=DB_FILE, batch_rows=BATCH_ROWS, progress=None):
+    conn = sqlite3.connect(db_file)
+    try:
+        # the whole import is one writer; skip the per-commit fsync of the rollback journal
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return import_rows(iter_csv(path), SqliteProducts(conn), batch_rows, progress)
+    finally:
+        conn.close()
+
+
+def import_csv_mysql(path, conn, batch_rows=BATCH_ROWS, create_categories=True, progress=None):
+    return import_rows(iter_csv(path), MySQLProducts(conn, create_categories), batch_rows, progress)
+
+
+# ---------- Run ----------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Bulk import products from CSV into shop.db")
+    ap.add_argument("csv")
+    ap.add_argument("--db", default=DB_FILE)
+    ap.add_argument("--batch", type=int, default=BATCH_ROWS)
+    ap.add_argument("--rejects", help="write rejected rows to this CSV")
+    args = ap.parse_args()
+    report = import_csv_sqlite(args.csv, args.db, args.batch)
+    print(report.summary())
+    for line_no, reason, _ in report.rejects[:20]:
+        print(f"  line {line_no}: {reason}")
+    if args.rejects and report.rejects:
+        report.write_rejects(args.rejects)
+        print(f"Rejected rows written to {args.rejects}")
@@ -0,0 +1,380 @@
+"""
+Query timing for every data-access helper, plus a slow-query log. The Tk
+view of the worst queries is in query_metrics_window, so headless processes
+(pos_server, the benchmarks) never import tkinter.
+
+Statements are grouped by fingerprint (literals replaced by ?, IN lists
+collapsed, whitespace normalized), and each fingerprint keeps a call count,
+a latency histogram, rows returned and connection-acquire time. Latency
+covers execute plus fetching the result, so a SELECT that streams rows is
+charged for all of them. Statements slower than SLOW_MS are appended to
+the slow-query log (fingerprint only - parameter values are never written).
+
+sqlite connections come from connect_sqlite(), which returns a
+sqlite3.Connection subclass (row_factory, isinstance checks and the rest
+behave as before). MySQL connections are wrapped with instrument().
+
+Environment:
+    NEXUS_QUERY_METRICS=0        turn instrumentation off
+    NEXUS_SLOW_QUERY_MS=100      slow-query threshold in milliseconds
+    NEXUS_SLOW_QUERY_LOG=path    slow-query log file (default slow_queries.log)
+"""
+
+import os
+import re
+import time
+import sqlite3
+import threading
+from bisect import bisect_left
+from datetime import datetime
+from functools import lru_cache
+
+# ------------ Config ------------
+ENABLED = os.environ.get("NEXUS_QUERY_METRICS", "1") != "0"
+SLOW_MS = float(os.environ.get("NEXUS_SLOW_QUERY_MS", "100"))
+SLOW_LOG = os.environ.get("NEXUS_SLOW_QUERY_LOG", "slow_queries.log")
+BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]   # + overflow
+# ---------------------------------
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+_VALUES_RE = re.compile(r"(VALUES\s*\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Normalized statement text: literals -> ?, placeholder lists -> (...)."""
+    text = _STRING_RE.sub("?", sql)
+    text = _NUMBER_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("(...)", text)
+    text = _VALUES_RE.sub(r"\1", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+# ---------- Registry ----------
+class QueryStats:
+    __slots__ = ("fingerprint", "count", "total_ms", "max_ms", "rows", "acquire_ms", "slow", "buckets", "sources")
+
+    def __init__(self, fp):
+        self.fingerprint = fp
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.acquire_ms = 0.0
+        self.slow = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.sources = set()
+
+    def percentile(self, p):
+        """Upper bound of the histogram bucket holding the p-th percentile (ms)."""
+        target = p * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target and n:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            'fingerprint': self.fingerprint,
+            'sources': sorted(self.sources),
+            'count': self.count,
+            'total_ms': self.total_ms,
+            'mean_ms': self.total_ms / self.count if self.count else 0.0,
+            'p95_ms': self.percentile(0.95),
+            'max_ms': self.max_ms,
+            'rows': self.rows,
+            'acquire_ms': self.acquire_ms,
+            'slow': self.slow,
+            'histogram': dict(zip([f"<={b}" for b in BUCKETS_MS] + ["more"], self.buckets)),
+        }
+
+
+class MetricsRegistry:
+    """Process-wide statement statistics (thread-safe)."""
+
+    def __init__(self, slow_ms=SLOW_MS, slow_log=SLOW_LOG):
+        self.slow_ms = slow_ms
+        self.slow_log = slow_log
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.started = time.time()
+
+    def record(self, sql, ms, rows=0, acquire_ms=0.0, source=None):
+        fp = fingerprint(sql)
+        with self.lock:
+            st = self.stats.get(fp)
+            if st is None:
+                st = self.stats[fp] = QueryStats(fp)
+            st.count += 1
+            st.total_ms += ms
+            st.rows += max(rows, 0)
+            st.acquire_ms += acquire_ms
+            if ms > st.max_ms:
+                st.max_ms = ms
+            st.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+            if source:
+                st.sources.add(source)
+            slow = ms >= self.slow_ms
+            if slow:
+                st.slow += 1
+        if slow:
+            self._log_slow(fp, ms, rows, acquire_ms, source)
+
+    def _log_slow(self, fp, ms, rows, acquire_ms, source):
+        line = (f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | {ms:9.1f} ms | rows {rows} | "
+                f"acquire {acquire_ms:.1f} ms | {source or '-'} | {fp}\n")
+        try:
+            with open(self.slow_log, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError:
+            pass
+
+    def snapshot(self, sort="total_ms", limit=None):
+        """Stats dicts, worst first by `sort` (total_ms, p95_ms, max_ms, mean_ms or count)."""
+        with self.lock:
+            rows = [st.as_dict() for st in self.stats.values()]
+        rows.sort(key=lambda r: r[sort], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
+            self.started = time.time()
+
+
+REGISTRY = MetricsRegistry()
+
+
+class _Pending:
+    """Timing of the statement a cursor is currently executing / fetching."""
+
+    __slots__ = ("sql", "ms", "rows", "acquire_ms", "source")
+
+    def __init__(self, sql, ms, acquire_ms, source):
+        self.sql = sql
+        self.ms = ms
+        self.rows = 0
+        self.acquire_ms = acquire_ms
+        self.source = source
+
+    def finish(self):
+        REGISTRY.record(self.sql, self.ms, self.rows, self.acquire_ms, self.source)
+
+
+# ---------- sqlite ----------
+class InstrumentedCursor(sqlite3.Cursor):
+    _pending = None
+
+    def _begin(self, sql, started):
+        self._flush()
+        conn = self.connection
+        acquire, conn._acquire_ms = conn._acquire_ms, 0.0     # charged to the first statement
+        pending = _Pending(sql, (time.perf_counter() - started) * 1000, acquire, conn._source)
+        if self.description is None:
+            pending.rows = self.rowcount
+            pending.finish()
+        else:
+            self._pending = pending
+
+    def _flush(self):
+        if self._pending is not None:
+            self._pending.finish()
+            self._pending = None
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        self._begin(sql, started)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._begin(sql, started)
+        return self
+
+    def executescript(self, sql_script):
+        started = time.perf_counter()
+        super().executescript(sql_script)
+        self._begin(sql_script, started)
+        return self
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        if self._pending is not None:
+            self._pending.ms += (time.perf_counter() - started) * 1000
+            self._pending.rows += len(rows)
+            self._flush()
+        return rows
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if self._pending is not None:
+            self._pending.ms += (time.perf_counter() - started) * 1000
+            self._pending.rows += len(rows)
+            if not rows:
+                self._flush()
+        return rows
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        if self._pending is not None:
+            self._pending.ms += (time.perf_counter() - started) * 1000
+            if row is None:
+                self._flush()
+            else:
+                self._pending.rows += 1
+        return row
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._flush()
+            raise
+        if self._pending is not None:
+            self._pending.ms += (time.perf_counter() - started) * 1000
+            self._pending.rows += 1
+        return row
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        self._flush()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    _source = None
+    _acquire_ms = 0.0
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # the C shortcuts bypass cursor(), so route them through it
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def connect_sqlite(db_file, source=None, **kwargs):
+    """sqlite3.connect with statement timing (plain connection when metrics are off)."""
+    if not ENABLED:
+        return sqlite3.connect(db_file, **kwargs)
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_file, factory=InstrumentedConnection, **kwargs)
+    conn._acquire_ms = (time.perf_counter() - started) * 1000
+    conn._source = source
+    return conn
+
+
+# ---------- MySQL ----------
+class CursorProxy:
+    """Times execute/fetch on a DB-API cursor; everything else is passed through."""
+
+    def __init__(self, cursor, conn):
+        self._cursor = cursor
+        self._conn = conn
+        self._pending = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def _begin(self, sql, started):
+        self._flush()
+        acquire, self._conn._acquire_ms = self._conn._acquire_ms, 0.0
+        pending = _Pending(sql, (time.perf_counter() - started) * 1000, acquire, self._conn._source)
+        if self._cursor.description is None:
+            pending.rows = self._cursor.rowcount
+            pending.finish()
+        else:
+            self._pending = pending
+
+    def _flush(self):
+        if self._pending is not None:
+            self._pending.finish()
+            self._pending = None
+
+    def execute(self, sql, params=None, *args, **kwargs):
+        started = time.perf_counter()
+        result = self._cursor.execute(sql, params, *args, **kwargs)
+        self._begin(sql, started)
+        return result
+
+    def executemany(self, sql, seq_params, *args, **kwargs):
+        started = time.perf_counter()
+        result = self._cursor.executemany(sql, seq_params, *args, **kwargs)
+        self._begin(sql, started)
+        return result
+
+    def _fetched(self, started, rows, done):
+        if self._pending is not None:
+            self._pending.ms += (time.perf_counter() - started) * 1000
+            self._pending.rows += rows
+            if done:
+                self._flush()
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def fetchmany(self, *args, **kwargs):
+        started = time.perf_counter()
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._fetched(started, len(rows), not rows)
+        return rows
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(started, 0 if row is None else 1, row is None)
+        return row
+
+    def close(self):
+        self._flush()
+        return self._cursor.close()
+
+    def __del__(self):
+        self._flush()
+
+
+class ConnectionProxy:
+    """Wraps a mysql.connector (pooled) connection so its cursors are timed."""
+
+    def __init__(self, conn, source=None, acquire_ms=0.0):
+        self._conn = conn
+        self._source = source
+        self._acquire_ms = acquire_ms
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return CursorProxy(self._conn.cursor(*args, **kwargs), self)
+
+
+def instrument(conn, source=None, acquire_seconds=0.0):
+    """Wrap a MySQL connection (returns it unchanged when metrics are off or conn is None)."""
+    if not ENABLED or conn is None:
+        return conn
+    return ConnectionProxy(conn, source, acquire_seconds * 1000)
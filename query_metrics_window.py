@@ -0,0 +1,58 @@
+"""Tk view of query_metrics: the worst statements so far (the Query Stats buttons)."""
+
+import os
+import tkinter as tk
+from tkinter import ttk
+
+import query_metrics
+
+
+class WorstQueriesWindow(tk.Toplevel):
+    """Worst statements so far, sortable by total time, p95, max, mean or count."""
+
+    SORTS = {"Total time": "total_ms", "p95": "p95_ms", "Max": "max_ms", "Mean": "mean_ms", "Calls": "count"}
+
+    def __init__(self, parent, registry=None):
+        super().__init__(parent)
+        self.title("Query Metrics")
+        self.geometry("1100x520")
+        self.registry = registry or query_metrics.REGISTRY
+
+        top = ttk.Frame(self)
+        top.pack(fill="x", padx=8, pady=6)
+        ttk.Label(top, text="Sort by").pack(side="left")
+        self.sort_var = tk.StringVar(value="Total time")
+        sort = ttk.Combobox(top, textvariable=self.sort_var, values=list(self.SORTS), width=12, state="readonly")
+        sort.pack(side="left", padx=4)
+        sort.bind("<<ComboboxSelected>>", lambda e: self.refresh())
+        ttk.Button(top, text="Refresh", command=self.refresh).pack(side="left", padx=4)
+        ttk.Button(top, text="Reset", command=self.reset).pack(side="left", padx=4)
+        self.info = ttk.Label(top, text="")
+        self.info.pack(side="left", padx=10)
+        ttk.Button(top, text="Close", command=self.destroy).pack(side="right")
+
+        cols = ("calls", "total", "mean", "p95", "max", "rows", "acquire", "slow", "source", "statement")
+        self.tree = ttk.Treeview(self, columns=cols, show="headings")
+        for col, w, anchor in (("calls", 60, "e"), ("total", 80, "e"), ("mean", 70, "e"), ("p95", 70, "e"),
+                               ("max", 70, "e"), ("rows", 70, "e"), ("acquire", 70, "e"), ("slow", 50, "e"),
+                               ("source", 100, "w"), ("statement", 520, "w")):
+            self.tree.heading(col, text=col.title() + (" ms" if col in ("total", "mean", "p95", "max", "acquire") else ""))
+            self.tree.column(col, width=w, anchor=anchor, stretch=(col == "statement"))
+        self.tree.pack(fill="both", expand=True, padx=8, pady=(0, 8))
+        self.refresh()
+
+    def refresh(self):
+        rows = self.registry.snapshot(self.SORTS[self.sort_var.get()], limit=200)
+        self.tree.delete(*self.tree.get_children())
+        for r in rows:
+            self.tree.insert("", "end", values=(
+                r['count'], f"{r['total_ms']:.1f}", f"{r['mean_ms']:.2f}", f"{r['p95_ms']:.2f}",
+                f"{r['max_ms']:.2f}", r['rows'], f"{r['acquire_ms']:.1f}", r['slow'],
+                ", ".join(r['sources']), r['fingerprint'][:300]))
+        state = "" if query_metrics.ENABLED else "  (instrumentation is off: NEXUS_QUERY_METRICS=0)"
+        self.info.config(text=f"{len(rows)} statements, slow >= {self.registry.slow_ms:g} ms "
+                              f"logged to {os.path.abspath(self.registry.slow_log)}{state}")
+
+    def reset(self):
+        self.registry.reset()
+        self.refresh()
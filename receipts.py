@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Receipt formatting and batch reprinting.
+
+Receipt is the one receipt model shared by the on-screen, text and PDF
+views: POSApp builds it straight from the committed cart snapshot (no
+re-query of sales_items) and the batch reprinter builds it from the database,
+so a reprinted receipt looks exactly like the one printed at the till.
+
+render_batch() rebuilds every receipt for a date range from `sales` and
+`sales_items`, writes the text receipts into one compressed .tar.gz archive
+and fans the PDF rendering out across a process pool.
+
+Usage:
+    python receipts.py 2025-01-01 2025-01-31 [--db shop.db] [--out receipts] [--workers 4] [--no-pdf]
+"""
+
+import os
+import io
+import time
+import tarfile
+import sqlite3
+import argparse
+from functools import cached_property
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+# Try import for PDF generation
+HAS_REPORTLAB = True
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas as pdfcanvas
+except Exception:
+    HAS_REPORTLAB = False
+
+# ------------ Config ------------
+DB_FILE = "shop.db"
+RECEIPTS_DIR = "receipts"
+TAX_RATE = 0.15
+LOYALTY_PER_DOLLAR = 0.1
+PDF_CHUNK = 25             # receipts handed to a worker per task
+# ---------------------------------
+
+
+# ---------- Formatting ----------
+def format_receipt_lines(invoice_no, date, customer, staff, items, totals, payment_method,
+                         payment_details=None, loyalty_earned=0, tax_rate=TAX_RATE):
+    """
+    Build the receipt as a list of lines.
+    customer: (id, name) or None; items: iterable of (name, qty, price, subtotal).
+    """
+    lines = []
+    lines.append("=== NEXUS TECH SHOP ===")
+    lines.append(f"Invoice: {invoice_no}")
+    lines.append(f"Date: {date}")
+    if customer:
+        lines.append(f"Customer: {customer[1]} (ID:{customer[0]})")
+    lines.append(f"Staff: {staff}")
+    lines.append("-"*48)
+    lines.append(f"{'Item':30} {'Qty':>3} {'Price':>8} {'Sub':>9}")
+    lines.append("-"*48)
+    for name, qty, price, sub in items:
+        lines.append(f"{(name or '')[:30]:30} {qty:>3} {price:>8.2f} {sub:>9.2f}")
+    lines.append("-"*48)
+    lines.append(f"Subtotal: ${totals['subtotal']:.2f}")
+    lines.append(f"Tax ({tax_rate*100:.0f}%): ${totals['tax']:.2f}")
+    lines.append(f"Discount: -${totals['discount']:.2f}")
+    lines.append(f"Grand Total: ${totals['grand_total']:.2f}")
+    lines.append(f"Payment: {payment_method} {('('+str(payment_details)+')') if payment_details else ''}")
+    lines.append("-"*48)
+    if loyalty_earned:
+        lines.append(f"Loyalty points earned: {loyalty_earned}")
+    lines.append("Thank you for shopping with us!")
+    lines.append("=== Powered by POSApp ===")
+    return lines
+
+
+def write_receipt_pdf(path, lines):
+    """Render receipt lines to an A4 PDF (requires reportlab)."""
+    c = pdfcanvas.Canvas(path, pagesize=A4)
+    width, height = A4
+    x = 40
+    y = height - 40
+    line_height = 14
+    c.setFont("Courier", 10)
+    for line in lines:
+        if y < 40:
+            c.showPage()
+            y = height - 40
+            c.setFont("Courier", 10)
+        c.drawString(x, y, line)
+        y -= line_height
+    c.save()
+
+
+# ---------- Receipt model ----------
+class Receipt:
+    """
+    A completed sale as printed on a receipt.
+    items: list of (name, qty, price, subtotal); customer: (id, name) or None.
+    The formatted layout is computed once and reused by every view.
+    """
+
+    def __init__(self, invoice_no, date, staff, items, totals, payment_method,
+                 payment_details=None, customer=None, loyalty_earned=0, sale_id=None, tax_rate=TAX_RATE):
+        self.invoice_no = invoice_no
+        self.date = date
+        self.staff = staff
+        self.items = items
+        self.totals = totals
+        self.payment_method = payment_method
+        self.payment_details = payment_details
+        self.customer = customer
+        self.loyalty_earned = loyalty_earned
+        self.sale_id = sale_id
+        self.tax_rate = tax_rate
+
+    @classmethod
+    def from_cart(cls, invoice_no, cart, totals, payment_method, staff, payment_details=None,
+                  customer=None, loyalty_earned=0, sale_id=None, date=None, tax_rate=TAX_RATE):
+        """Snapshot a POSApp cart (list of dicts with name/qty/price/subtotal)."""
+        items = [(i['name'], i['qty'], i['price'], i['subtotal']) for i in cart]
+        date = date or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return cls(invoice_no, date, staff, items, dict(totals), payment_method,
+                   payment_details, customer, loyalty_earned, sale_id, tax_rate)
+
+    @cached_property
+    def lines(self):
+        return format_receipt_lines(self.invoice_no, self.date, self.customer, self.staff, self.items,
+                                    self.totals, self.payment_method, self.payment_details,
+                                    self.loyalty_earned, self.tax_rate)
+
+    @cached_property
+    def text(self):
+        return "\n".join(self.lines)
+
+    def save_text(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.text)
+
+    def save_pdf(self, path):
+        write_receipt_pdf(path, self.lines)
+
+
+# ---------- Rebuilding receipts from the database ----------
+def _date_bounds(date_from, date_to):
+    """Inclusive YYYY-MM-DD range -> [start, end) timestamps as stored by sqlite."""
+    start = datetime.strptime(date_from, "%Y-%m-%d")
+    end = datetime.strptime(date_to, "%Y-%m-%d") + timedelta(days=1)
+    return start.strftime("%Y-%m-%d %H:%M:%S"), end.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def load_receipts(conn, date_from, date_to, tax_rate=TAX_RATE):
+    """
+    Rebuild a Receipt for every sale in the date range.
+    Uses two range queries (headers, then all their items) instead of one query per sale.
+    """
+    start, end = _date_bounds(date_from, date_to)
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(sales)")]
+    total_col = "total" if "total" in cols else "subtotal"
+    details_col = "payment_details" if "payment_details" in cols else "card_type"
+
+    headers = conn.execute(f"""
+        SELECT s.id, s.invoice_no, s.timestamp, s.customer_id, c.name, s.staff,
+               s.{total_col}, s.tax, s.discount, s.grand_total, s.payment_method, s.{details_col}
+        FROM sales s
+        LEFT JOIN customers c ON c.id = s.customer_id
+        WHERE s.timestamp >= ? AND s.timestamp < ?
+        ORDER BY s.id
+    """, (start, end)).fetchall()
+    if not headers:
+        return []
+
+    items = {}
+    for sale_id, name, qty, price, sub in conn.execute("""
+        SELECT sale_id, name, qty, price, subtotal FROM sales_items
+        WHERE sale_id BETWEEN ? AND ?
+        ORDER BY sale_id, id
+    """, (headers[0][0], headers[-1][0])):
+        items.setdefault(sale_id, []).append((name, qty or 0, price or 0.0, sub or 0.0))
+
+    receipts = []
+    for (sale_id, invoice_no, ts, cust_id, cust_name, staff,
+         subtotal, tax, discount, grand_total, method, details) in headers:
+        totals = {'subtotal': subtotal or 0.0, 'tax': tax or 0.0,
+                  'discount': discount or 0.0, 'grand_total': grand_total or 0.0}
+        customer = (cust_id, cust_name) if cust_id else None
+        earned = int(totals['grand_total'] * LOYALTY_PER_DOLLAR) if cust_id else 0
+        receipts.append(Receipt(invoice_no or f"SALE{sale_id}", ts, staff, items.get(sale_id, []), totals,
+                                method, details, customer, earned, sale_id, tax_rate))
+    return receipts
+
+
+# ---------- Batch rendering ----------
+def _render_pdf_chunk(args):
+    """Worker: render a chunk of receipts to PDF files. Returns the number written."""
+    out_dir, chunk = args
+    for receipt in chunk:
+        receipt.save_pdf(os.path.join(out_dir, f"{receipt.invoice_no}.pdf"))
+    return len(chunk)
+
+
+def write_text_archive(path, receipts):
+    """Write all text receipts into one gzip-compressed tar archive."""
+    with tarfile.open(path, "w:gz") as tar:
+        for receipt in receipts:
+            data = (receipt.text + "\n").encode("utf-8")
+            info = tarfile.TarInfo(f"{receipt.invoice_no}.txt")
+            info.size = len(data)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(data))
+
+
+def render_batch(date_from, date_to, db_file=DB_FILE, out_dir=RECEIPTS_DIR, workers=None,
+                 pdf=True, chunk=PDF_CHUNK, progress=None):
+    """
+    Rebuild and render every receipt between date_from and date_to (YYYY-MM-DD, inclusive).
+    Returns a stats dict: receipts, archive, pdf_dir, seconds, per_second.
+    progress(done, total) is called from this process as PDF chunks finish.
+    """
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_file)
+    try:
+        receipts = load_receipts(conn, date_from, date_to)
+    finally:
+        conn.close()
+
+    os.makedirs(out_dir, exist_ok=True)
+    archive = os.path.join(out_dir, f"receipts_{date_from}_{date_to}.tar.gz")
+    write_text_archive(archive, receipts)
+
+    pdf_dir = None
+    if pdf and receipts:
+        if not HAS_REPORTLAB:
+            raise RuntimeError("PDF generation requires the 'reportlab' package.\nInstall with: pip install reportlab")
+        pdf_dir = os.path.join(out_dir, f"pdf_{date_from}_{date_to}")
+        os.makedirs(pdf_dir, exist_ok=True)
+        tasks = [(pdf_dir, receipts[i:i + chunk]) for i in range(0, len(receipts), chunk)]
+        done = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for n in pool.map(_render_pdf_chunk, tasks):
+                done += n
+                if progress:
+                    progress(done, len(receipts))
+
+    seconds = time.perf_counter() - started
+    return {
+        'receipts': len(receipts),
+        'archive': archive,
+        'pdf_dir': pdf_dir,
+        'seconds': seconds,
+        'per_second': len(receipts) / seconds if seconds > 0 else 0.0,
+    }
+
+
+# ---------- Run ----------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Rebuild receipts for a date range")
+    ap.add_argument("date_from", help="YYYY-MM-DD")
+    ap.add_argument("date_to", help="YYYY-MM-DD (inclusive)")
+    ap.add_argument("--db", default=DB_FILE)
+    ap.add_argument("--out", default=RECEIPTS_DIR)
+    ap.add_argument("--workers", type=int, default=None, help="PDF worker processes (default: CPU count)")
+    ap.add_argument("--no-pdf", action="store_true", help="only write the text archive")
+    args = ap.parse_args(argv)
+
+    stats = render_batch(args.date_from, args.date_to, args.db, args.out, args.workers, pdf=not args.no_pdf)
+    print(f"{stats['receipts']} receipts in {stats['seconds']:.2f}s "
+          f"({stats['per_second']:.1f} receipts/s)")
+    print(f"Text archive: {stats['archive']}")
+    if stats['pdf_dir']:
+        print(f"PDFs: {stats['pdf_dir']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+Goods receiving - scan or type an incoming delivery, then post it at once.
+
+Scans only touch an in-memory ReceivingSession (product id -> units), so a
+500-line delivery costs no database round trips until it is posted. Posting
+is one transaction: executemany adds the units to stock and executemany
+writes one stock-movement row per line with the delivery reference, so
+every restock leaves a record of what arrived, when and who received it.
+
+Works on shop.db (`products.stock`, movements in `stock_movements`) and on
+the MySQL nexus_tech database (`Product_Details.product_number`,
+movements in `Stock_Movements`).
+"""
+
+import re
+import time
+import sqlite3
+from datetime import datetime
+import tkinter as tk
+from tkinter import ttk, messagebox, simpledialog
+
+DB_FILE = "shop.db"
+# an "x" needs a space on the product side, so "Xbox 360" or "Pro Max 2" is not read as a quantity
+SCAN_RE = re.compile(r"^\s*(\d+)\s*(?:\*|[xX]\s)\s*(.+?)\s*$|^\s*(.+?)\s*(?:\*|\s[xX])\s*(\d+)\s*$")
+
+
+# ---------- Backends ----------
+class SqliteStock:
+    def __init__(self, conn):
+        self.conn = conn
+        self.has_barcode = any(r[1] == "barcode" for r in conn.execute("PRAGMA table_info(products)"))
+
+    def ensure_table(self):
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS stock_movements (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                product_id INTEGER,
+                qty_change INTEGER,
+                kind TEXT,
+                reference TEXT,
+                staff TEXT,
+                created_at TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_product ON stock_movements(product_id, created_at)")
+        self.conn.commit()
+
+    def catalog(self):
+        """[(id, name, barcode, stock)] for every product."""
+        barcode = "barcode" if self.has_barcode else "NULL"
+        return self.conn.execute(f"SELECT id, name, {barcode}, COALESCE(stock, 0) FROM products").fetchall()
+
+    def post(self, lines, kind, reference, staff):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cur = self.conn.cursor()
+        cur.executemany("UPDATE products SET stock = COALESCE(stock, 0) + ? WHERE id = ?",
+                        [(qty, pid) for pid, qty in lines])
+        updated = cur.rowcount
+        cur.executemany("INSERT INTO stock_movements (product_id, qty_change, kind, reference, staff, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        [(pid, qty, kind, reference, staff, now) for pid, qty in lines])
+        return updated
+
+
+class MySQLStock:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def ensure_table(self):
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS Stock_Movements (
+                movement_id INT AUTO_INCREMENT PRIMARY KEY,
+                product_id INT,
+                qty_change INT,
+                kind VARCHAR(20),
+                reference VARCHAR(100),
+                staff VARCHAR(50),
+                created_at DATETIME,
+                INDEX idx_stock_movements_product (product_id, created_at)
+            )
+        """)
+        self.conn.commit()
+
+    def catalog(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT product_id, product_name, NULL, COALESCE(product_number, 0) FROM Product_Details")
+        return cursor.fetchall()
+
+    def post(self, lines, kind, reference, staff):
+        now = datetime.now()
+        cursor = self.conn.cursor()
+        # mysql.connector only batches INSERTs, so the stock changes go in one CASE update
+        ids = [pid for pid, _ in lines]
+        cases = " ".join(["WHEN %s THEN %s"] * len(lines))
+        cursor.execute(f"""
+            UPDATE Product_Details
+            SET product_number = COALESCE(product_number, 0) + CASE product_id {cases} END
+            WHERE product_id IN ({', '.join(['%s'] * len(ids))})
+        """, [v for line in lines for v in line] + ids)
+        updated = cursor.rowcount
+        cursor.executemany("""
+            INSERT INTO Stock_Movements (product_id, qty_change, kind, reference, staff, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, [(pid, qty, kind, reference, staff, now) for pid, qty in lines])
+        return updated
+
+
+def backend_for(conn):
+    return SqliteStock(conn) if isinstance(conn, sqlite3.Connection) else MySQLStock(conn)
+
+
+def parse_scan(text):
+    """'12*ABC', '12 x ABC', 'ABC x12', 'ABC*12' -> ('ABC', 12); anything else -> (text, 1)."""
+    m = SCAN_RE.match(text)
+    if m:
+        if m.group(1):
+            return m.group(2), int(m.group(1))
+        return m.group(3), int(m.group(4))
+    return text.strip(), 1
+
+
+# ---------- Session ----------
+class ReceivingSession:
+    """One delivery being received: quantities accumulate in memory until post()."""
+
+    def __init__(self, conn, kind="receive"):
+        self.conn = conn
+        self.kind = kind
+        self.db = backend_for(conn)
+        self.db.ensure_table()
+        self.qty = {}           # product_id -> units received, in scan order
+        self.reload_catalog()
+
+    def reload_catalog(self):
+        self.products = {}
+        self.by_barcode = {}
+        self.by_name = {}
+        for pid, name, barcode, stock in self.db.catalog():
+            self.products[pid] = (name, int(stock or 0))
+            if barcode:
+                self.by_barcode[str(barcode)] = pid
+            if name:
+                self.by_name.setdefault(name.lower(), pid)
+
+    def find(self, code):
+        """Product id for a barcode, exact name or numeric id; None if unknown."""
+        code = code.strip()
+        if code in self.by_barcode:
+            return self.by_barcode[code]
+        if code.lower() in self.by_name:
+            return self.by_name[code.lower()]
+        if code.isdigit() and int(code) in self.products:
+            return int(code)
+        return None
+
+    def parse(self, text):
+        """parse_scan(text), unless the whole text already names a product."""
+        if self.find(text) is not None:
+            return text.strip(), 1
+        return parse_scan(text)
+
+    def add(self, code, qty=1):
+        """Add units of a product; returns (product_id, units now on this delivery)."""
+        pid = self.find(code)
+        if pid is None:
+            raise KeyError(code)
+        self.qty[pid] = self.qty.get(pid, 0) + qty
+        if self.qty[pid] <= 0:
+            del self.qty[pid]
+            return pid, 0
+        return pid, self.qty[pid]
+
+    def set_qty(self, pid, qty):
+        if qty > 0:
+            self.qty[pid] = qty
+        else:
+            self.qty.pop(pid, None)
+
+    def remove(self, pid):
+        self.qty.pop(pid, None)
+
+    def clear(self):
+        self.qty.clear()
+
+    def lines(self):
+        """[(product_id, name, stock before, units received)]"""
+        return [(pid, self.products[pid][0], self.products[pid][1], qty) for pid, qty in self.qty.items()]
+
+    @property
+    def units(self):
+        return sum(self.qty.values())
+
+    def __len__(self):
+        return len(self.qty)
+
+    def post(self, reference="", staff=None):
+        """
+        Add every line to stock and record the movements in one commit.
+        Returns a stats dict (lines, units, seconds). The session is emptied.
+        """
+        if not self.qty:
+            return {'lines': 0, 'units': 0, 'seconds': 0.0}
+        started = time.perf_counter()
+        lines = list(self.qty.items())
+        try:
+            updated = self.db.post(lines, self.kind, reference or None, staff)
+            if updated != len(lines):
+                raise ValueError(f"{len(lines) - updated} product(s) on this delivery no longer exist")
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        for pid, qty in lines:
+            name, stock = self.products[pid]
+            self.products[pid] = (name, stock + qty)
+        stats = {'lines': len(lines), 'units': sum(q for _, q in lines),
+                 'seconds': time.perf_counter() - started}
+        self.clear()
+        return stats
+
+
+# ---------- Window ----------
+class ReceivingWindow(tk.Toplevel):
+    """Scan a delivery (barcode, name or id; '12*code' for a quantity) and post it."""
+
+    def __init__(self, parent, conn, staff=None, on_posted=None, owns_conn=False):
+        super().__init__(parent)
+        self.title("Receive Stock")
+        self.geometry("760x560")
+        self.conn = conn
+        self.owns_conn = owns_conn      # close conn with the window (pooled MySQL connections)
+        self.staff = staff
+        self.on_posted = on_posted
+        self.session = ReceivingSession(conn)
+
+        top = ttk.Frame(self)
+        top.pack(fill="x", padx=8, pady=6)
+        ttk.Label(top, text="Delivery ref / supplier").grid(row=0, column=0, sticky="e")
+        self.ref_var = tk.StringVar()
+        ttk.Entry(top, textvariable=self.ref_var, width=30).grid(row=0, column=1, padx=4, sticky="w")
+        ttk.Label(top, text="Scan / code").grid(row=1, column=0, sticky="e")
+        self.scan_var = tk.StringVar()
+        scan = ttk.Entry(top, textvariable=self.scan_var, width=30)
+        scan.grid(row=1, column=1, padx=4, pady=4, sticky="w")
+        scan.bind("<Return>", self.on_scan)
+        ttk.Label(top, text="Qty").grid(row=1, column=2, sticky="e")
+        self.qty_var = tk.StringVar(value="1")
+        ttk.Spinbox(top, from_=1, to=100000, textvariable=self.qty_var, width=7).grid(row=1, column=3, padx=4)
+        ttk.Button(top, text="Add", command=self.on_scan).grid(row=1, column=4, padx=4)
+        scan.focus_set()
+
+        cols = ("id", "name", "stock", "received", "after")
+        self.tree = ttk.Treeview(self, columns=cols, show="headings", height=16)
+        for col, w in (("id", 60), ("name", 320), ("stock", 90), ("received", 90), ("after", 90)):
+            self.tree.heading(col, text=col.title())
+            self.tree.column(col, width=w, anchor="center")
+        self.tree.pack(fill="both", expand=True, padx=8)
+        self.tree.bind("<Double-1>", self.edit_qty)
+
+        bottom = ttk.Frame(self)
+        bottom.pack(fill="x", padx=8, pady=6)
+        ttk.Button(bottom, text="Remove Line", command=self.remove_line).pack(side="left")
+        ttk.Button(bottom, text="Post Delivery", command=self.post).pack(side="left", padx=4)
+        self.status = ttk.Label(bottom, text="")
+        self.status.pack(side="left", padx=10)
+        ttk.Button(bottom, text="Close", command=self.close).pack(side="right")
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+    def destroy(self):
+        if self.owns_conn:
+            self.conn.close()
+        super().destroy()
+
+    def refresh(self):
+        self.tree.delete(*self.tree.get_children())
+        for pid, name, stock, qty in self.session.lines():
+            self.tree.insert("", "end", iid=str(pid), values=(pid, name, stock, qty, stock + qty))
+        self.status.config(text=f"{len(self.session)} lines, {self.session.units} units")
+
+    def on_scan(self, event=None):
+        code, qty = self.session.parse(self.scan_var.get())
+        if not code:
+            return
+        try:
+            if qty == 1:
+                qty = int(self.qty_var.get() or 1)
+            pid, _ = self.session.add(code, qty)
+        except ValueError:
+            messagebox.showerror("Receive", "Quantity must be a whole number.", parent=self)
+            return
+        except KeyError:
+            self.bell()
+            messagebox.showwarning("Receive", f"No product matches '{code}'.", parent=self)
+            return
+        self.scan_var.set("")
+        self.qty_var.set("1")
+        self.refresh()
+        if self.tree.exists(str(pid)):
+            self.tree.see(str(pid))
+            self.tree.selection_set(str(pid))
+
+    def edit_qty(self, event=None):
+        sel = self.tree.selection()
+        if not sel:
+            return
+        pid = int(sel[0])
+        current = self.session.qty.get(pid, 0)
+        qty = simpledialog.askinteger("Quantity", "Units received:", initialvalue=current, minvalue=0, parent=self)
+        if qty is None:
+            return
+        self.session.set_qty(pid, qty)
+        self.refresh()
+
+    def remove_line(self):
+        for iid in self.tree.selection():
+            self.session.remove(int(iid))
+        self.refresh()
+
+    def post(self):
+        if not len(self.session):
+            messagebox.showinfo("Receive", "Nothing scanned yet.", parent=self)
+            return
+        if not messagebox.askyesno("Post Delivery", f"Add {self.session.units} units on {len(self.session)} lines to stock?", parent=self):
+            return
+        try:
+            stats = self.session.post(self.ref_var.get().strip(), self.staff)
+        except Exception as e:
+            messagebox.showerror("Receive", f"Posting failed, nothing was changed: {e}", parent=self)
+            return
+        self.refresh()
+        self.ref_var.set("")
+        messagebox.showinfo("Delivery Posted",
+                            f"{stats['lines']} lines / {stats['units']} units posted in {stats['seconds']:.2f}s", parent=self)
+        if self.on_posted:
+            self.on_posted()
+
+    def close(self):
+        if len(self.session) and not messagebox.askyesno(
+                "Receive", "Discard the scanned delivery without posting it?", parent=self):
+            return
+        self.destroy()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Frequently-bought-together recommendations.
+
+An offline job reads `sales_items` basket by basket and counts how often
+each pair of products appears in the same sale. The counts are kept sparse:
+every co-purchased pair is encoded as a single int64 and reduced with
+np.unique, so memory grows with the number of distinct pairs, not with
+products squared. For every product the top-k companions by lift (or
+confidence) are written to `product_companions`. The till loads that table
+into a dict once, so a lookup is O(1) when an item is added to the cart.
+
+    confidence(a -> b) = baskets(a and b) / baskets(a)
+    lift(a, b)         = baskets(a and b) * baskets / (baskets(a) * baskets(b))
+
+Usage:
+    python recommendations.py [shop.db] [--top 5] [--min-support 2] [--metric lift|confidence]
+"""
+
+import time
+import sqlite3
+import argparse
+from collections import Counter
+from itertools import combinations
+
+# NumPy makes the pair counting vectorized; a Counter is used without it
+HAS_NUMPY = True
+try:
+    import numpy as np
+except Exception:
+    HAS_NUMPY = False
+
+# ------------ Config ------------
+DB_FILE = "shop.db"
+TOP_K = 5
+MIN_SUPPORT = 2             # baskets a pair must share before it is suggested
+METRIC = "lift"             # "lift" or "confidence"
+CHUNK_SALES = 20000         # sales read per round trip (baskets are never split)
+# ---------------------------------
+
+
+# ---------- Schema ----------
+def ensure_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS product_companions (
+            product_id INTEGER,
+            rank INTEGER,
+            companion_id INTEGER,
+            score REAL,
+            confidence REAL,
+            support INTEGER,
+            PRIMARY KEY (product_id, rank)
+        )
+    """)
+    conn.commit()
+
+
+# ---------- Reading baskets ----------
+def iter_basket_chunks(conn, chunk_sales=CHUNK_SALES):
+    """Yield sorted (sale_id, product_id) rows covering whole sales, one chunk at a time."""
+    last = 0
+    while True:
+        row = conn.execute("SELECT MAX(id) FROM (SELECT id FROM sales WHERE id > ? ORDER BY id LIMIT ?)",
+                           (last, chunk_sales)).fetchone()
+        if row[0] is None:
+            return
+        upper = row[0]
+        rows = conn.execute("""
+            SELECT DISTINCT sale_id, product_id FROM sales_items
+            WHERE sale_id > ? AND sale_id <= ? AND product_id IS NOT NULL
+            ORDER BY sale_id, product_id
+        """, (last, upper)).fetchall()
+        last = upper
+        if rows:
+            yield rows
+
+
+# ---------- Counting ----------
+def _merge_counts(keys, counts, new_keys, new_counts):
+    """Add (new_keys, new_counts) into the sparse (keys, counts) pair."""
+    if len(keys) == 0:
+        return new_keys, new_counts
+    merged, inverse = np.unique(np.concatenate([keys, new_keys]), return_inverse=True)
+    return merged, np.bincount(inverse, weights=np.concatenate([counts, new_counts]),
+                               minlength=len(merged)).astype(np.int64)
+
+
+def _count_numpy(conn, chunk_sales):
+    """Sparse pair counts with NumPy. Returns (products, item_counts, pair_a, pair_b, pair_counts, baskets)."""
+    width = (conn.execute("SELECT MAX(product_id) FROM sales_items").fetchone()[0] or 0) + 1
+    empty = np.empty(0, dtype=np.int64)
+    products, item_counts = empty, empty
+    pair_keys, pair_counts = empty, empty
+    baskets = 0
+
+    for rows in iter_basket_chunks(conn, chunk_sales):
+        arr = np.array(rows, dtype=np.int64)
+        sales, prods = arr[:, 0], arr[:, 1]
+        baskets += int(np.count_nonzero(np.r_[True, sales[1:] != sales[:-1]]))
+        products, item_counts = _merge_counts(products, item_counts, *np.unique(prods, return_counts=True))
+
+        # rows are sorted by (sale, product): pair each row with the k-th row after it
+        # while both belong to the same sale; k only goes up to the largest basket
+        codes = []
+        k = 1
+        while k < len(sales):
+            same = sales[k:] == sales[:-k]
+            if not same.any():
+                break
+            codes.append(prods[:-k][same] * width + prods[k:][same])
+            k += 1
+        if codes:
+            pair_keys, pair_counts = _merge_counts(pair_keys, pair_counts,
+                                                   *np.unique(np.concatenate(codes), return_counts=True))
+
+    # translate product ids to positions in `products` so counts can be indexed directly
+    a = np.searchsorted(products, pair_keys // width)
+    b = np.searchsorted(products, pair_keys % width)
+    return products, item_counts, a, b, pair_counts, baskets
+
+
+def _count_python(conn, chunk_sales):
+    """Same result as _count_numpy using Counters (no NumPy available)."""
+    items, pairs, baskets = Counter(), Counter(), 0
+    for rows in iter_basket_chunks(conn, chunk_sales):
+        basket, current = [], None
+        for sale_id, product_id in rows + [(None, None)]:
+            if sale_id != current:
+                if basket:
+                    baskets += 1
+                    items.update(basket)
+                    pairs.update(combinations(basket, 2))
+                basket, current = [], sale_id
+            basket.append(product_id)
+    return items, pairs, baskets
+
+
+def score_pairs(n_ab, n_a, n_b, baskets, metric=METRIC):
+    """Score of recommending b to someone buying a."""
+    confidence = n_ab / n_a
+    if metric == "confidence":
+        return confidence, confidence
+    return n_ab * baskets / (n_a * n_b), confidence
+
+
+# ---------- Building ----------
+def compute_companions(conn, top_k=TOP_K, min_support=MIN_SUPPORT, metric=METRIC, chunk_sales=CHUNK_SALES):
+    """Return rows (product_id, rank, companion_id, score, confidence, support), best first per product."""
+    if HAS_NUMPY:
+        products, item_counts, a, b, n_ab, baskets = _count_numpy(conn, chunk_sales)
+        keep = n_ab >= min_support
+        a, b, n_ab = a[keep], b[keep], n_ab[keep]
+        # each pair counts in both directions
+        src = np.concatenate([a, b])
+        dst = np.concatenate([b, a])
+        n_ab = np.concatenate([n_ab, n_ab]).astype("f8")
+        if len(src) == 0:
+            return []
+        score, confidence = score_pairs(n_ab, item_counts[src], item_counts[dst], baskets, metric)
+        # sort by product, then best score; keep the first top_k of each product
+        order = np.lexsort((-n_ab, -score, src))
+        src, dst, score, confidence, n_ab = src[order], dst[order], score[order], confidence[order], n_ab[order]
+        starts = np.r_[0, np.flatnonzero(np.diff(src)) + 1]
+        rank = np.arange(len(src)) - np.repeat(starts, np.diff(np.r_[starts, len(src)]))
+        top = rank < top_k
+        return list(zip(products[src[top]].tolist(), (rank[top] + 1).tolist(), products[dst[top]].tolist(),
+                        score[top].tolist(), confidence[top].tolist(), n_ab[top].astype(int).tolist()))
+
+    items, pairs, baskets = _count_python(conn, chunk_sales)
+    candidates = {}
+    for (a, b), n_ab in pairs.items():
+        if n_ab < min_support:
+            continue
+        for x, y in ((a, b), (b, a)):
+            score, confidence = score_pairs(n_ab, items[x], items[y], baskets, metric)
+            candidates.setdefault(x, []).append((score, n_ab, y, confidence))
+    rows = []
+    for pid in sorted(candidates):
+        best = sorted(candidates[pid], key=lambda c: (-c[0], -c[1]))[:top_k]
+        for rank, (score, n_ab, cid, confidence) in enumerate(best, start=1):
+            rows.append((pid, rank, cid, score, confidence, n_ab))
+    return rows
+
+
+def build_companions(db_file=DB_FILE, top_k=TOP_K, min_support=MIN_SUPPORT, metric=METRIC, chunk_sales=CHUNK_SALES):
+    """Recompute product_companions. Returns a stats dict: products, pairs, seconds."""
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_file)
+    try:
+        ensure_table(conn)
+        rows = compute_companions(conn, top_k, min_support, metric, chunk_sales)
+        # replace the whole table in one transaction so the till never sees half a rebuild
+        with conn:
+            conn.execute("DELETE FROM product_companions")
+            conn.executemany("INSERT INTO product_companions VALUES (?, ?, ?, ?, ?, ?)", rows)
+    finally:
+        conn.close()
+    return {
+        'products': len({r[0] for r in rows}),
+        'pairs': len(rows),
+        'seconds': time.perf_counter() - started,
+    }
+
+
+# ---------- Lookup ----------
+def load_companions(conn):
+    """
+    {product_id: [(companion_id, name, price, score), ...]} for the till.
+    Companions that are out of stock or deleted are left out.
+    """
+    ensure_table(conn)
+    companions = {}
+    for pid, cid, name, price, score in conn.execute("""
+        SELECT pc.product_id, pc.companion_id, p.name, p.price, pc.score
+        FROM product_companions pc
+        JOIN products p ON p.id = pc.companion_id
+        WHERE (p.stock IS NULL OR p.stock > 0)  -- untracked stock is always sellable, as in ShopInventory.available
+        ORDER BY pc.product_id, pc.rank
+    """):
+        companions.setdefault(pid, []).append((cid, name, price or 0.0, score))
+    return companions
+
+
+# ---------- Run ----------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Rebuild frequently-bought-together suggestions")
+    ap.add_argument("db", nargs="?", default=DB_FILE)
+    ap.add_argument("--top", type=int, default=TOP_K)
+    ap.add_argument("--min-support", type=int, default=MIN_SUPPORT)
+    ap.add_argument("--metric", choices=["lift", "confidence"], default=METRIC)
+    args = ap.parse_args()
+    stats = build_companions(args.db, args.top, args.min_support, args.metric)
+    print(f"{stats['pairs']} suggestions for {stats['products']} products in {stats['seconds']:.2f}s")
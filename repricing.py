@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""
+Bulk repricing - percentage / absolute / fixed price changes for a whole
+category, a name filter or an uploaded price list, as one set-based
+transaction plus a Tk window with a dry-run preview.
+
+Every change is two statements no matter how many SKUs it touches: an
+INSERT ... SELECT that records old and new prices in the price history,
+then one UPDATE with the same WHERE clause. Rows whose price would not
+change are left alone. A price list is loaded into a temp table first and
+joined in the same way.
+
+Works on shop.db (`products`, history in `price_history`) and on the MySQL
+nexus_tech database (`Product_Details`, history in `Price_History`).
+
+Usage:
+    python repricing.py --percent 10 --category Phones [--db shop.db] [--apply]
+    python repricing.py --price-list prices.csv [--apply]
+"""
+
+import math
+import time
+import sqlite3
+import argparse
+from datetime import datetime
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+
+from product_import import iter_csv
+
+# ------------ Config ------------
+DB_FILE = "shop.db"
+PREVIEW_ROWS = 500          # rows shown in the preview table
+MODES = ["percent", "absolute", "set"]
+# ---------------------------------
+
+PRICE_LIST_ALIASES = {
+    "id": "id", "product_id": "id",
+    "barcode": "barcode",
+    "name": "name", "product_name": "name",
+    "price": "price", "new_price": "price", "product_price": "price",
+}
+
+
+# ---------- Backends ----------
+class SqliteBackend:
+    ph = "?"
+    id = "id"
+    name = "name"
+    price = "price"
+    category = "category"
+    source = "products"
+    update_target = "products"
+    list_expr = "(SELECT r.new_price FROM reprice_list r WHERE r.product_id = products.id)"
+    list_where = "id IN (SELECT product_id FROM reprice_list)"
+    history_table = "price_history"
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.has_barcode = any(r[1] == "barcode" for r in conn.execute("PRAGMA table_info(products)"))
+
+    def ensure_history(self):
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS price_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                product_id INTEGER,
+                old_price REAL,
+                new_price REAL,
+                changed_at TEXT,
+                reason TEXT,
+                changed_by TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_price_history_product ON price_history(product_id, changed_at)")
+        self.conn.commit()
+
+    def stamp(self):
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def categories(self):
+        return [r[0] for r in self.conn.execute(
+            "SELECT DISTINCT category FROM products WHERE category IS NOT NULL AND category <> '' ORDER BY category")]
+
+    def product_keys(self):
+        """(id, name, barcode) for every product, to resolve a price list."""
+        barcode = "barcode" if self.has_barcode else "NULL"
+        return self.conn.execute(f"SELECT id, name, {barcode} FROM products").fetchall()
+
+    def load_list(self, rows):
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS reprice_list (product_id INTEGER PRIMARY KEY, new_price REAL)")
+        self.conn.execute("DELETE FROM reprice_list")
+        self.conn.executemany("INSERT OR REPLACE INTO reprice_list VALUES (?, ?)", rows)
+
+
+class MySQLBackend:
+    ph = "%s"
+    id = "p.product_id"
+    name = "p.product_name"
+    price = "p.product_price"
+    category = "c.category_name"
+    source = "Product_Details p LEFT JOIN Product_Category c ON c.category_id = p.category_id"
+    update_target = source
+    # a MySQL temp table can only be opened once per statement, so the list is joined
+    list_expr = "r.new_price"
+    list_where = "1=1"
+    history_table = "Price_History"
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.has_barcode = False
+
+    def ensure_history(self):
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS Price_History (
+                history_id INT AUTO_INCREMENT PRIMARY KEY,
+                product_id INT,
+                old_price DECIMAL(10,2),
+                new_price DECIMAL(10,2),
+                changed_at DATETIME,
+                reason VARCHAR(200),
+                changed_by VARCHAR(50),
+                INDEX idx_price_history_product (product_id, changed_at)
+            )
+        """)
+        self.conn.commit()
+
+    def stamp(self):
+        return datetime.now()
+
+    def categories(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT category_name FROM Product_Category ORDER BY category_name")
+        return [r[0] for r in cursor.fetchall()]
+
+    def product_keys(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT product_id, product_name, NULL FROM Product_Details")
+        return cursor.fetchall()
+
+    def load_list(self, rows):
+        cursor = self.conn.cursor()
+        cursor.execute("CREATE TEMPORARY TABLE IF NOT EXISTS reprice_list "
+                       "(product_id INT PRIMARY KEY, new_price DECIMAL(10,2))")
+        cursor.execute("DELETE FROM reprice_list")
+        cursor.executemany("REPLACE INTO reprice_list VALUES (%s, %s)", rows)
+        self.source = self.update_target = (MySQLBackend.source +
+                                            " JOIN reprice_list r ON r.product_id = p.product_id")
+
+
+def backend_for(conn):
+    """SqliteBackend for a sqlite3 connection, MySQLBackend for anything else."""
+    return SqliteBackend(conn) if isinstance(conn, sqlite3.Connection) else MySQLBackend(conn)
+
+
+# ---------- Rules ----------
+def _finite(what, x):
+    x = float(x)
+    if not math.isfinite(x):
+        raise ValueError(f"{what} must be a finite number, not {x}")
+    return x
+
+
+class PriceRule:
+    """
+    What to change and which products to change.
+
+    mode:  "percent" (value is +/- %), "absolute" (value is added) or "set" (value is the new price)
+    filters: category, name_contains, min_price / max_price, product_ids
+    price_list: {product_id: new_price} - replaces mode/value for the listed products
+    """
+
+    def __init__(self, mode="percent", value=0.0, category=None, name_contains=None,
+                 min_price=None, max_price=None, product_ids=None, price_list=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown repricing mode: {mode}")
+        self.mode = mode
+        self.value = _finite("value", value)
+        self.category = category
+        self.name_contains = name_contains
+        self.min_price = None if min_price is None else _finite("min price", min_price)
+        self.max_price = None if max_price is None else _finite("max price", max_price)
+        self.product_ids = list(product_ids) if product_ids else None
+        self.price_list = price_list
+
+    def describe(self):
+        if self.price_list is not None:
+            change = f"price list ({len(self.price_list)} products)"
+        elif self.mode == "percent":
+            change = f"{self.value:+g}%"
+        elif self.mode == "absolute":
+            change = f"{self.value:+.2f}"
+        else:
+            change = f"set to {self.value:.2f}"
+        scope = []
+        if self.category:
+            scope.append(f"category {self.category}")
+        if self.name_contains:
+            scope.append(f"name contains {self.name_contains!r}")
+        if self.min_price is not None or self.max_price is not None:
+            scope.append(f"price {self.min_price or 0}-{self.max_price if self.max_price is not None else 'any'}")
+        if self.product_ids:
+            scope.append(f"{len(self.product_ids)} selected products")
+        return change + (" for " + ", ".join(scope) if scope else " for all products")
+
+    def expression(self, db):
+        """(sql, params) computing the new price, rounded to cents and never negative."""
+        if self.price_list is not None:
+            raw, params = db.list_expr, []
+        elif self.mode == "percent":
+            raw, params = f"{db.price} * {db.ph}", [1 + self.value / 100.0]
+        elif self.mode == "absolute":
+            raw, params = f"{db.price} + {db.ph}", [self.value]
+        else:
+            raw, params = db.ph, [self.value]
+        return f"ROUND(CASE WHEN {raw} < 0 THEN 0 ELSE {raw} END, 2)", params * 2
+
+    def where(self, db):
+        """(sql, params) selecting the products the rule applies to."""
+        clauses, params = [], []
+        if self.price_list is not None:
+            clauses.append(db.list_where)
+        if self.category:
+            clauses.append(f"{db.category} = {db.ph}")
+            params.append(self.category)
+        if self.name_contains:
+            clauses.append(f"{db.name} LIKE {db.ph}")
+            params.append(f"%{self.name_contains}%")
+        if self.min_price is not None:
+            clauses.append(f"{db.price} >= {db.ph}")
+            params.append(self.min_price)
+        if self.max_price is not None:
+            clauses.append(f"{db.price} <= {db.ph}")
+            params.append(self.max_price)
+        if self.product_ids:
+            clauses.append(f"{db.id} IN ({', '.join([db.ph] * len(self.product_ids))})")
+            params.extend(self.product_ids)
+        return (" AND ".join(clauses) or "1=1"), params
+
+
+def read_price_list(path, db):
+    """
+    Resolve a CSV price list (id / barcode / name + price) to {product_id: price}.
+    Returns (prices, unmatched) where unmatched is [(line_no, reason)].
+    """
+    by_id, by_barcode, by_name = set(), {}, {}
+    for pid, name, barcode in db.product_keys():
+        by_id.add(pid)
+        if barcode:
+            by_barcode[str(barcode)] = pid
+        if name:
+            by_name.setdefault(name.lower(), pid)
+
+    prices, unmatched = {}, []
+    for line_no, row in iter_csv(path, PRICE_LIST_ALIASES, required=("price",)):
+        try:
+            price = round(float(row.get("price", "").replace("$", "").replace(",", "")), 2)
+        except ValueError:
+            unmatched.append((line_no, f"invalid price {row.get('price')!r}"))
+            continue
+        if not math.isfinite(price):
+            unmatched.append((line_no, f"price {row.get('price')!r} is not a finite number"))
+            continue
+        pid = None
+        if row.get("id", "").isdigit() and int(row["id"]) in by_id:
+            pid = int(row["id"])
+        elif row.get("barcode") in by_barcode:
+            pid = by_barcode[row["barcode"]]
+        elif row.get("name"):
+            pid = by_name.get(row["name"].lower())
+        if pid is None:
+            unmatched.append((line_no, "no matching product"))
+            continue
+        prices[pid] = max(price, 0.0)
+    return prices, unmatched
+
+
+# ---------- Preview / apply ----------
+def _prepare(db, rule):
+    if rule.price_list is not None:
+        db.load_list(list(rule.price_list.items()))
+    expr, expr_params = rule.expression(db)
+    where, where_params = rule.where(db)
+    return expr, expr_params, where, where_params
+
+
+def preview(conn, rule, limit=PREVIEW_ROWS):
+    """
+    Dry run. Returns (rows, changed) where rows are (id, name, category, old, new)
+    for the first `limit` affected products and changed is the total that would change.
+    """
+    db = backend_for(conn)
+    cursor = conn.cursor()
+    # the temp price list rows are dropped with the savepoint; the caller's own work is left alone
+    cursor.execute("SAVEPOINT reprice_preview")
+    try:
+        expr, expr_params, where, where_params = _prepare(db, rule)
+        changed_sql = f"{expr} <> {db.price}"
+        cursor.execute(f"SELECT COUNT(*) FROM {db.source} WHERE {where} AND {changed_sql}",
+                       where_params + expr_params)
+        changed = cursor.fetchone()[0]
+        cursor.execute(f"""
+            SELECT {db.id}, {db.name}, {db.category}, {db.price}, {expr}
+            FROM {db.source}
+            WHERE {where} AND {changed_sql}
+            ORDER BY {db.category}, {db.name}
+            LIMIT {int(limit)}
+        """, expr_params + where_params + expr_params)
+        rows = [tuple(r) for r in cursor.fetchall()]
+    finally:
+        cursor.execute("ROLLBACK TO SAVEPOINT reprice_preview")
+        cursor.execute("RELEASE SAVEPOINT reprice_preview")
+    return rows, changed
+
+
+def apply(conn, rule, reason="", changed_by=None):
+    """
+    Apply the rule in one transaction and record every change in the price history.
+    Returns a stats dict (changed, seconds).
+    """
+    started = time.perf_counter()
+    db = backend_for(conn)
+    db.ensure_history()
+    try:
+        expr, expr_params, where, where_params = _prepare(db, rule)
+        changed_sql = f"{expr} <> {db.price}"
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            INSERT INTO {db.history_table} (product_id, old_price, new_price, changed_at, reason, changed_by)
+            SELECT {db.id}, {db.price}, {expr}, {db.ph}, {db.ph}, {db.ph}
+            FROM {db.source}
+            WHERE {where} AND {changed_sql}
+        """, expr_params + [db.stamp(), reason or rule.describe(), changed_by] + where_params + expr_params)
+        changed = cursor.rowcount
+        cursor.execute(f"""
+            UPDATE {db.update_target} SET {db.price} = {expr}
+            WHERE {where} AND {changed_sql}
+        """, expr_params + where_params + expr_params)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {'changed': changed, 'seconds': time.perf_counter() - started}
+
+
+def price_history(conn, product_id, limit=50):
+    """Latest price changes of one product: (changed_at, old_price, new_price, reason, changed_by)."""
+    db = backend_for(conn)
+    db.ensure_history()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT changed_at, old_price, new_price, reason, changed_by FROM {db.history_table}
+        WHERE product_id = {db.ph} ORDER BY changed_at DESC LIMIT {int(limit)}
+    """, (product_id,))
+    return cursor.fetchall()
+
+
+# ---------- Window ----------
+class RepriceWindow(tk.Toplevel):
+    """Build a rule, preview the affected products, then apply it."""
+
+    def __init__(self, parent, conn, on_applied=None, changed_by=None, product_ids=None, owns_conn=False):
+        super().__init__(parent)
+        self.title("Bulk Reprice")
+        self.geometry("860x560")
+        self.conn = conn
+        self.owns_conn = owns_conn      # close conn with the window (pooled MySQL connections)
+        self.on_applied = on_applied
+        self.changed_by = changed_by
+        self.product_ids = product_ids
+        self.price_list = None
+        self.previewed = None
+
+        form = ttk.Frame(self)
+        form.pack(fill="x", padx=8, pady=6)
+        ttk.Label(form, text="Change").grid(row=0, column=0, sticky="e")
+        self.mode_var = tk.StringVar(value="percent")
+        ttk.Combobox(form, textvariable=self.mode_var, values=MODES, width=10,
+                     state="readonly").grid(row=0, column=1, padx=4)
+        ttk.Label(form, text="Value").grid(row=0, column=2, sticky="e")
+        self.value_var = tk.StringVar(value="0")
+        ttk.Entry(form, textvariable=self.value_var, width=10).grid(row=0, column=3, padx=4)
+        ttk.Label(form, text="Category").grid(row=0, column=4, sticky="e")
+        self.cat_var = tk.StringVar(value="All")
+        ttk.Combobox(form, textvariable=self.cat_var, width=18, state="readonly",
+                     values=["All"] + backend_for(conn).categories()).grid(row=0, column=5, padx=4)
+        ttk.Label(form, text="Name contains").grid(row=0, column=6, sticky="e")
+        self.name_var = tk.StringVar()
+        ttk.Entry(form, textvariable=self.name_var, width=16).grid(row=0, column=7, padx=4)
+
+        ttk.Label(form, text="Min price").grid(row=1, column=0, sticky="e")
+        self.min_var = tk.StringVar()
+        ttk.Entry(form, textvariable=self.min_var, width=10).grid(row=1, column=1, padx=4, pady=4)
+        ttk.Label(form, text="Max price").grid(row=1, column=2, sticky="e")
+        self.max_var = tk.StringVar()
+        ttk.Entry(form, textvariable=self.max_var, width=10).grid(row=1, column=3, padx=4, pady=4)
+        ttk.Button(form, text="Load Price List...", command=self.load_price_list).grid(row=1, column=4, columnspan=2)
+        self.list_label = ttk.Label(form, text="Only selected products" if product_ids else "")
+        self.list_label.grid(row=1, column=6, columnspan=2, sticky="w")
+
+        cols = ("id", "name", "category", "old", "new")
+        self.tree = ttk.Treeview(self, columns=cols, show="headings", height=16)
+        for col, w in (("id", 60), ("name", 300), ("category", 160), ("old", 100), ("new", 100)):
+            self.tree.heading(col, text=col.title())
+            self.tree.column(col, width=w, anchor="center")
+        self.tree.pack(fill="both", expand=True, padx=8)
+
+        bottom = ttk.Frame(self)
+        bottom.pack(fill="x", padx=8, pady=6)
+        ttk.Button(bottom, text="Preview", command=self.preview).pack(side="left")
+        self.apply_btn = ttk.Button(bottom, text="Apply", command=self.apply, state="disabled")
+        self.apply_btn.pack(side="left", padx=4)
+        self.status = ttk.Label(bottom, text="Preview to see which prices change.")
+        self.status.pack(side="left", padx=10)
+        ttk.Button(bottom, text="Close", command=self.destroy).pack(side="right")
+        self.protocol("WM_DELETE_WINDOW", self.destroy)
+
+    def destroy(self):
+        if self.owns_conn:
+            self.conn.close()
+        super().destroy()
+
+    def _optional_float(self, var):
+        text = var.get().strip()
+        return float(text) if text else None
+
+    def current_rule(self):
+        category = self.cat_var.get()
+        return PriceRule(self.mode_var.get(), float(self.value_var.get().strip() or 0),
+                         category=None if category == "All" else category,
+                         name_contains=self.name_var.get().strip() or None,
+                         min_price=self._optional_float(self.min_var),
+                         max_price=self._optional_float(self.max_var),
+                         product_ids=self.product_ids, price_list=self.price_list)
+
+    def load_price_list(self):
+        fn = filedialog.askopenfilename(parent=self, filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not fn:
+            return
+        try:
+            self.price_list, unmatched = read_price_list(fn, backend_for(self.conn))
+        except Exception as e:
+            messagebox.showerror("Price List", f"Could not read price list: {e}", parent=self)
+            return
+        self.list_label.config(text=f"Price list: {len(self.price_list)} products, {len(unmatched)} unmatched")
+        if unmatched:
+            details = "\n".join(f"line {n}: {reason}" for n, reason in unmatched[:10])
+            messagebox.showwarning("Price List", f"{len(unmatched)} rows were not matched:\n{details}", parent=self)
+        self.preview()
+
+    def preview(self):
+        try:
+            rule = self.current_rule()
+            rows, changed = preview(self.conn, rule)
+        except ValueError:
+            messagebox.showerror("Reprice", "Value and prices must be finite numbers.", parent=self)
+            return
+        except Exception as e:
+            messagebox.showerror("Reprice", f"Preview failed: {e}", parent=self)
+            return
+        self.tree.delete(*self.tree.get_children())
+        for pid, name, category, old, new in rows:
+            self.tree.insert("", "end", values=(pid, name, category or "", f"{float(old or 0):.2f}", f"{float(new):.2f}"))
+        shown = f" (first {len(rows)} shown)" if changed > len(rows) else ""
+        self.status.config(text=f"{rule.describe()}: {changed} prices change{shown}")
+        self.previewed = rule if changed else None
+        self.apply_btn.config(state="normal" if changed else "disabled")
+
+    def apply(self):
+        rule = self.previewed
+        if rule is None:
+            return
+        if not messagebox.askyesno("Apply Prices", f"Apply {rule.describe()}?", parent=self):
+            return
+        try:
+            stats = apply(self.conn, rule, changed_by=self.changed_by)
+        except Exception as e:
+            messagebox.showerror("Reprice", f"Repricing failed: {e}", parent=self)
+            return
+        messagebox.showinfo("Prices Updated", f"{stats['changed']} prices updated in {stats['seconds']:.2f}s", parent=self)
+        self.previewed = None
+        self.apply_btn.config(state="disabled")
+        self.tree.delete(*self.tree.get_children())
+        self.status.config(text="Applied. Preview to see which prices change.")
+        if self.on_applied:
+            self.on_applied()
+
+
+# ---------- Run ----------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Bulk reprice products in shop.db (dry run unless --apply)")
+    ap.add_argument("--db", default=DB_FILE)
+    change = ap.add_mutually_exclusive_group(required=True)
+    change.add_argument("--percent", type=float)
+    change.add_argument("--absolute", type=float)
+    change.add_argument("--set", type=float, dest="fixed")
+    change.add_argument("--price-list")
+    ap.add_argument("--category")
+    ap.add_argument("--name")
+    ap.add_argument("--apply", action="store_true")
+    args = ap.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    if args.price_list:
+        prices, unmatched = read_price_list(args.price_list, backend_for(conn))
+        for line_no, reason in unmatched[:20]:
+            print(f"  line {line_no}: {reason}")
+        rule = PriceRule(price_list=prices, category=args.category, name_contains=args.name)
+    else:
+        mode, value = next((m, v) for m, v in (("percent", args.percent), ("absolute", args.absolute),
+                                                ("set", args.fixed)) if v is not None)
+        try:
+            rule = PriceRule(mode, value, category=args.category, name_contains=args.name)
+        except ValueError as e:
+            ap.error(str(e))
+    rows, changed = preview(conn, rule, limit=20)
+    for pid, name, category, old, new in rows:
+        print(f"  {pid:>6} {name[:40]:<40} {category or '':<16} {float(old or 0):>10.2f} -> {float(new):>10.2f}")
+    print(f"{rule.describe()}: {changed} prices change")
+    if args.apply:
+        stats = apply(conn, rule)
+        print(f"Applied: {stats['changed']} prices updated in {stats['seconds']:.2f}s")
+    conn.close()
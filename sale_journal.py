@@ -0,0 +1,385 @@
+"""
+Durable sale journals on local disk.
+
+Journal is an append-only file of JSON records, one per line, each prefixed
+with its CRC32 so a line torn by a crash or power cut is recognised and
+dropped instead of being replayed half. append() returns once the record is
+on disk (fsync); appends arriving while a sync is in progress are written
+and synced together by the next one (group commit), so several threads
+journaling at once share fsyncs instead of queueing for one each.
+
+OfflineSales uses a Journal to keep selling while Nexus' MySQL database is
+unreachable: sales are recorded locally and replayed in bulk when it comes
+back. Replay is idempotent - every sale carries a uuid that is written to
+the Offline_Sales table in the same transaction as its stock, loyalty and
+Transaction_History updates (when those tables exist), and sales already
+there are skipped - so a crash between the database commit and trimming
+the journal only means the next replay skips them.
+
+WriteAheadCheckout puts a Journal in front of a ShopCheckout or
+BillingCheckout: the sale and its invoice number are journaled (fsynced)
+before the database transaction starts, and a done/abort record is appended
+after it without waiting for the disk. The invoice number gets a random
+suffix, since another till can issue the same INV<timestamp> in the same
+second. On start-up recover() settles any sale journaled but never marked:
+if its invoice number is in the sales table it committed, otherwise it is
+replayed - all of them in one BEGIN IMMEDIATE transaction - and a sale that can no longer be applied (product deleted) is
+set aside in <journal>.rejected. So a sale the cashier took payment for is
+never lost to a crash, and recovery costs one transaction however many
+sales it finds.
+
+Each WriteAheadCheckout holds an exclusive lock on its journal for as long
+as it runs, so tills started from the same directory never share one: a
+second till takes sale_wal.1.journal, a third sale_wal.2.journal, and so
+on. A till that crashed releases its lock, so the next till to start takes
+over its journal and recovers it.
+
+Nothing here imports tkinter.
+"""
+
+import os
+import json
+import uuid
+import zlib
+import threading
+from collections import Counter
+from datetime import datetime
+
+import services
+import pos_protocol
+from user_store import FileLock
+
+# ------------ Config ------------
+OFFLINE_JOURNAL = "offline_sales.journal"
+SALE_WAL = "sale_wal.journal"
+CHECKPOINT_EVERY = 200      # settled sales before the write-ahead journal is compacted
+FLUSH_WINDOW_S = 0.002      # how long the flusher waits for more records before syncing
+REPLAY_BATCH = 500          # offline sales per replay transaction
+# ---------------------------------
+
+OFFLINE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS Offline_Sales (
+    sale_uid CHAR(32) PRIMARY KEY,
+    customer_id INT,
+    total DECIMAL(10, 2),
+    sold_at DATETIME,
+    replayed_at DATETIME
+)
+"""
+
+
+def encode_line(record):
+    body = json.dumps(record, separators=(",", ":")).encode("utf-8")
+    return b"%08x " % zlib.crc32(body) + body + b"\n"
+
+
+def decode_line(line):
+    """The record on a journal line, or None if the line is torn or corrupt."""
+    crc, _, body = line.rstrip(b"\n").partition(b" ")
+    try:
+        if int(crc, 16) != zlib.crc32(body):
+            return None
+        return json.loads(body.decode("utf-8"))
+    except ValueError:
+        return None
+
+
+class Journal:
+    def __init__(self, path, flush_window=FLUSH_WINDOW_S):
+        self.path = path
+        self.flush_window = flush_window
+        self.cond = threading.Condition()
+        self.pending = []           # encoded records not yet written
+        self.appended = 0           # records handed to append()
+        self.synced = 0             # records known to be on disk
+        self.error = None
+        self.flusher = None
+        self._repair()
+        self.file = open(path, "ab")
+
+    def _repair(self):
+        """Cut off a torn last line (no trailing newline) so new records start on a line of their own."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def append(self, record, wait=True):
+        """Add record; with wait, return only once it has been fsynced."""
+        line = encode_line(record)
+        with self.cond:
+            if self.error is not None:
+                raise self.error
+            self.pending.append(line)
+            self.appended += 1
+            mine = self.appended
+            if self.flusher is None:
+                self.flusher = threading.Thread(target=self._flush_loop, name="journal-flush", daemon=True)
+                self.flusher.start()
+            self.cond.notify_all()
+            while wait and self.synced < mine and self.error is None:
+                self.cond.wait()
+            if wait and self.error is not None:
+                raise self.error
+        return mine
+
+    def _flush_loop(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+            if self.flush_window:
+                threading.Event().wait(self.flush_window)   # let concurrent appends join this sync
+            with self.cond:
+                batch, self.pending = self.pending, []
+                upto = self.appended
+            try:
+                self.file.write(b"".join(batch))
+                self.file.flush()
+                os.fsync(self.file.fileno())
+            except OSError as e:
+                with self.cond:
+                    self.error = e
+                    self.cond.notify_all()
+                return
+            with self.cond:
+                self.synced = upto
+                self.cond.notify_all()
+
+    def records(self):
+        """Every intact record, oldest first (waits for records still being written)."""
+        self.sync()
+        with open(self.path, "rb") as f:
+            return [r for r in (decode_line(line) for line in f) if r is not None]
+
+    def sync(self):
+        with self.cond:
+            target = self.appended
+            while self.synced < target and self.error is None:
+                self.cond.wait()
+
+    def rewrite(self, keep):
+        """Atomically replace the journal with the records for which keep(record) is true."""
+        with self.cond:
+            while self.synced < self.appended and self.error is None:
+                self.cond.wait()
+            with open(self.path, "rb") as f:
+                records = [r for r in (decode_line(line) for line in f) if r is not None]
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(b"".join(encode_line(r) for r in records if keep(r)))
+                f.flush()
+                os.fsync(f.fileno())
+            self.file.close()
+            os.replace(tmp, self.path)
+            self.file = open(self.path, "ab")
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+
+# ---------- Nexus offline sales ----------
+class OfflineSales:
+    """Sales made while MySQL is unreachable; replay(conn) uploads them."""
+
+    def __init__(self, path=OFFLINE_JOURNAL):
+        self.journal = Journal(path)
+        self.lock = threading.Lock()        # one replay at a time
+
+    def record(self, customer_id, lines):
+        """
+        Journal a sale of lines (services.CartLine) and return its Totals. Offline
+        there is no customer type or points balance to price with, so the sale is
+        at list price; the customer earns its loyalty points when it is replayed.
+        """
+        if not lines:
+            raise services.EmptyCart()
+        totals = services.Totals.compute(lines)
+        self.journal.append({
+            'uid': uuid.uuid4().hex,
+            'at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'customer_id': customer_id,
+            'lines': [[l.product_id, l.name, l.price, l.qty] for l in lines],
+            'total': totals.grand_total,
+        })
+        return totals
+
+    def pending(self):
+        return self.journal.records()
+
+    def replay(self, conn):
+        """Upload journaled sales in REPLAY_BATCH transactions; returns how many were applied."""
+        with self.lock:
+            sales = self.pending()
+            if not sales:
+                return 0
+            cursor = conn.cursor()
+            cursor.execute(OFFLINE_SCHEMA)
+            history = services.ensure_transaction_tables(cursor)
+            applied, done = 0, set()
+            try:
+                for i in range(0, len(sales), REPLAY_BATCH):
+                    batch = sales[i:i + REPLAY_BATCH]
+                    try:
+                        applied += self._apply(cursor, batch, history)
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                    done.update(s['uid'] for s in batch)
+            finally:
+                # whatever committed leaves the journal, even if a later batch failed
+                if done:
+                    self.journal.rewrite(lambda r: r['uid'] not in done)
+            return applied
+
+    @staticmethod
+    def _apply(cursor, batch, history=True):
+        uids = [s['uid'] for s in batch]
+        cursor.execute(f"SELECT sale_uid FROM Offline_Sales WHERE sale_uid IN ({','.join(['%s'] * len(uids))})", uids)
+        seen = {row[0] for row in cursor.fetchall()}
+        todo = [s for s in batch if s['uid'] not in seen]
+        if not todo:
+            return 0
+        sold, points = Counter(), Counter()
+        for s in todo:
+            for _, name, _, qty in s['lines']:
+                sold[name] += qty
+            if s['customer_id'] is not None:
+                points[s['customer_id']] += int(s['total'])     # 1 point per dollar, as online
+        cursor.executemany("UPDATE Product_Details SET product_number = product_number - %s WHERE product_name=%s",
+                           [(qty, name) for name, qty in sold.items()])
+        cursor.executemany("UPDATE Customer_Details SET loyalty_points = COALESCE(loyalty_points, 0) + %s "
+                           "WHERE customer_id=%s", [(p, cid) for cid, p in points.items()])
+        cursor.executemany("INSERT INTO Offline_Sales (sale_uid, customer_id, total, sold_at, replayed_at) "
+                           "VALUES (%s, %s, %s, %s, NOW())",
+                           [(s['uid'], s['customer_id'], s['total'], s['at']) for s in todo])
+        for s in todo if history else ():
+            if s['customer_id'] is not None:
+                lines = [services.CartLine(*line) for line in s['lines']]
+                totals = services.Totals(s['total'], 0.0, 0.0, s['total'])
+                services.record_nexus_transaction(cursor, s['customer_id'], lines, totals, when=s['at'])
+        return len(todo)
+
+
+# ---------- Write-ahead checkout ----------
+def wal_path(db_file):
+    """SALE_WAL in the database's directory."""
+    return os.path.join(os.path.dirname(os.path.abspath(db_file)), SALE_WAL)
+
+
+def claim(path):
+    """
+    (path, lock) for the first of path, path.1, path.2 ... (before the extension)
+    that no running process holds; the lock is held until released or the process exits.
+    """
+    root, ext = os.path.splitext(path)
+    slot = 0
+    while True:
+        candidate = path if slot == 0 else f"{root}.{slot}{ext}"
+        lock = FileLock(candidate + ".lock")
+        if lock.acquire(blocking=False):
+            return candidate, lock
+        slot += 1
+
+
+class WriteAheadCheckout:
+    """Same interface as the checkout it wraps (totals, checkout), plus recover() and close()."""
+
+    def __init__(self, checkout, path=SALE_WAL):
+        self.inner = checkout
+        path, self.lock = claim(path)   # this till's journal alone; recover() never sees another's
+        self.journal = Journal(path)
+        self.rejected_path = path + ".rejected"
+        self.unsettled = set()      # invoice numbers journaled but not yet settled
+        self.settled = 0
+
+    @property
+    def EMPTY_MESSAGE(self):
+        return self.inner.EMPTY_MESSAGE
+
+    def totals(self, sale):
+        return self.inner.totals(sale)
+
+    def checkout(self, sale):
+        if not sale.lines:
+            raise services.EmptyCart(*self.inner.EMPTY_MESSAGE)
+        # unique across tills, so recover() can tell this sale's row from another till's
+        invoice_no = f"{self.inner.invoice_no()}-{uuid.uuid4().hex[:8]}"
+        self.journal.append({'t': 'intent', 'invoice': invoice_no, 'sale': pos_protocol.encode_sale(sale)})
+        self.unsettled.add(invoice_no)
+        try:
+            result = self.inner.checkout(sale, invoice_no)
+        except services.ServiceError:
+            self._settle('abort', invoice_no)   # rolled back and shown to the cashier - nothing to recover
+            raise
+        self._settle('done', invoice_no)
+        return result
+
+    def _settle(self, kind, invoice_no):
+        # not waited for: if this record is lost, recover() finds the invoice in the database instead
+        self.journal.append({'t': kind, 'invoice': invoice_no}, wait=False)
+        self.unsettled.discard(invoice_no)
+        self.settled += 1
+        if self.settled >= CHECKPOINT_EVERY:
+            self.settled = 0
+            self.journal.rewrite(lambda r: r['t'] == 'intent' and r['invoice'] in self.unsettled)
+
+    def recover(self):
+        """
+        Settle sales left open by a crash. Returns (replayed, already_committed, rejected)
+        invoice-number lists; the journal is empty afterwards.
+        """
+        records = self.journal.records()
+        closed = {r['invoice'] for r in records if r['t'] != 'intent'}
+        intents = [r for r in records if r['t'] == 'intent' and r['invoice'] not in closed]
+        replayed, committed, rejected = [], [], []
+        if intents:
+            conn = self.inner.connect()
+            if conn is None:
+                raise services.DatabaseUnavailable("Database is not available.")
+            try:
+                cur = conn.cursor()
+                # explicit, or the first SAVEPOINT would open the transaction and its RELEASE commit it
+                cur.execute("BEGIN IMMEDIATE")
+                invoices = [r['invoice'] for r in intents]
+                cur.execute(f"SELECT invoice_no FROM sales WHERE invoice_no IN ({','.join('?' * len(invoices))})",
+                            invoices)
+                have = {row[0] for row in cur.fetchall()}
+                for r in intents:
+                    if r['invoice'] in have:
+                        committed.append(r['invoice'])
+                        continue
+                    cur.execute("SAVEPOINT recover_sale")
+                    try:
+                        self.inner.apply(cur, pos_protocol.decode_sale(r['sale']), r['invoice'])
+                        cur.execute("RELEASE recover_sale")
+                        replayed.append(r['invoice'])
+                    except Exception as e:
+                        cur.execute("ROLLBACK TO recover_sale")
+                        cur.execute("RELEASE recover_sale")
+                        rejected.append(dict(r, error=str(e)))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise services.CheckoutFailed(f"Failed to recover sales: {e}") from e
+            finally:
+                conn.close()
+        if rejected:
+            set_aside = Journal(self.rejected_path)
+            for r in rejected:
+                set_aside.append(r, wait=False)
+            set_aside.close()
+        if records:
+            self.journal.rewrite(lambda r: False)
+        self.unsettled.clear()
+        return replayed, committed, [r['invoice'] for r in rejected]
+
+    def close(self):
+        self.journal.close()
+        self.lock.release()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Time-bucketed sales analytics.
+
+Loads the sale timestamps and amounts into two NumPy arrays once and
+computes hourly, daily and hour-by-weekday aggregates with np.bincount
+instead of one SQL query (or Python loop) per bucket. Results are cached and
+only recomputed when the data version - (row count, max id) of the table -
+changes.
+
+Works on shop.db `sales` (timestamp, grand_total) by default and on the
+Test1.py `orders` table (timestamp, total) via the table/column arguments.
+
+Usage:
+    python sales_analytics.py [shop.db]
+"""
+
+import sys
+import sqlite3
+
+# NumPy does the bucketing
+HAS_NUMPY = True
+try:
+    import numpy as np
+except Exception:
+    HAS_NUMPY = False
+
+# ------------ Config ------------
+DB_FILE = "shop.db"
+FETCH_ROWS = 50000          # rows fetched from sqlite per round trip
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+# ---------------------------------
+
+
+# ---------- Loading ----------
+def data_version(conn, table="sales"):
+    """(row count, max id) - changes whenever a sale is added or removed."""
+    return tuple(conn.execute(f"SELECT COUNT(*), COALESCE(MAX(id), 0) FROM {table}").fetchone())
+
+
+def load_arrays(conn, table="sales", ts_col="timestamp", amount_col="grand_total"):
+    """Return (timestamps datetime64[s], amounts float64) for every row with a timestamp."""
+    cur = conn.execute(f"SELECT {ts_col}, {amount_col} FROM {table} WHERE {ts_col} IS NOT NULL")
+    ts_parts, amt_parts = [], []
+    while True:
+        rows = cur.fetchmany(FETCH_ROWS)
+        if not rows:
+            break
+        ts_parts.append(np.array([str(r[0])[:19].replace(" ", "T") for r in rows], dtype="datetime64[s]"))
+        amt_parts.append(np.array([r[1] or 0.0 for r in rows], dtype="f8"))
+    if not ts_parts:
+        return np.empty(0, dtype="datetime64[s]"), np.empty(0, dtype="f8")
+    return np.concatenate(ts_parts), np.concatenate(amt_parts)
+
+
+# ---------- Bucketing ----------
+def hour_of_day(ts):
+    return (ts.astype("datetime64[h]") - ts.astype("datetime64[D]")).astype(np.int64)
+
+
+def weekday(ts):
+    """Monday=0 ... Sunday=6 (1970-01-01 was a Thursday)."""
+    return (ts.astype("datetime64[D]").astype(np.int64) + 3) % 7
+
+
+def hourly(ts, amounts):
+    """Revenue and sale count per hour of day -> (revenue[24], count[24])."""
+    h = hour_of_day(ts)
+    return (np.bincount(h, weights=amounts, minlength=24),
+            np.bincount(h, minlength=24))
+
+
+def daily(ts, amounts):
+    """Revenue and sale count per calendar day -> (days, revenue, count)."""
+    days, inverse = np.unique(ts.astype("datetime64[D]"), return_inverse=True)
+    return (days,
+            np.bincount(inverse, weights=amounts, minlength=len(days)),
+            np.bincount(inverse, minlength=len(days)))
+
+
+def weekday_hour(ts, amounts):
+    """7x24 grids (rows Mon..Sun, columns hour) of revenue and sale count."""
+    cell = weekday(ts) * 24 + hour_of_day(ts)
+    revenue = np.bincount(cell, weights=amounts, minlength=168).reshape(7, 24)
+    count = np.bincount(cell, minlength=168).reshape(7, 24)
+    return revenue, count
+
+
+# ---------- Cached engine ----------
+class SalesAnalytics:
+    """
+    Loads a sales table once and serves bucketed aggregates from cache.
+    Every call checks the data version first, which is a single indexed query.
+    """
+
+    def __init__(self, db_file=DB_FILE, table="sales", ts_col="timestamp", amount_col="grand_total", conn=None):
+        if not HAS_NUMPY:
+            raise RuntimeError("Sales analytics require the 'numpy' package.\nInstall with: pip install numpy")
+        self.db_file = db_file
+        self.table = table
+        self.ts_col = ts_col
+        self.amount_col = amount_col
+        self.conn = conn
+        self.version = None
+        self.ts = None
+        self.amounts = None
+        self._cache = {}
+
+    def _connect(self):
+        return self.conn or sqlite3.connect(self.db_file)
+
+    def refresh(self):
+        """Reload the arrays if the table changed since the last load."""
+        conn = self._connect()
+        try:
+            version = data_version(conn, self.table)
+            if version != self.version:
+                self.ts, self.amounts = load_arrays(conn, self.table, self.ts_col, self.amount_col)
+                self.version = version
+                self._cache = {}
+        finally:
+            if conn is not self.conn:
+                conn.close()
+
+    def _cached(self, key, fn):
+        self.refresh()
+        if key not in self._cache:
+            self._cache[key] = fn(self.ts, self.amounts)
+        return self._cache[key]
+
+    def hourly(self):
+        return self._cached("hourly", hourly)
+
+    def daily(self):
+        return self._cached("daily", daily)
+
+    def heatmap(self):
+        return self._cached("weekday_hour", weekday_hour)
+
+    def busiest_slots(self, n=5):
+        """Top n (weekday name, hour, sale count, revenue) slots by number of sales."""
+        revenue, count = self.heatmap()
+        order = np.argsort(count, axis=None)[::-1][:n]
+        slots = []
+        for cell in order:
+            d, h = divmod(int(cell), 24)
+            if count[d, h] == 0:
+                break
+            slots.append((WEEKDAYS[d], h, int(count[d, h]), float(revenue[d, h])))
+        return slots
+
+
+# ---------- Run ----------
+if __name__ == "__main__":
+    engine = SalesAnalytics(sys.argv[1] if len(sys.argv) > 1 else DB_FILE)
+    revenue, count = engine.hourly()
+    print("Hour  Sales   Revenue")
+    for h in range(24):
+        if count[h]:
+            print(f"{h:02d}:00 {count[h]:>6} {revenue[h]:>10.2f}")
+    print("\nBusiest slots:")
+    for day, h, n, rev in engine.busiest_slots():
+        print(f"  {day} {h:02d}:00  {n} sales  ${rev:.2f}")
@@ -0,0 +1,112 @@
+"""
+Sales history - keyset-paginated queries over `sales` in shop.db. The Tk
+browser on top of them is sales_history_window.SalesHistoryWindow; this
+module does not import tkinter, so the benchmarks can use it headless.
+
+Pages are ordered newest first by (timestamp, id) and the next page starts
+strictly after the last key of the previous one, so loading page 1000 costs
+the same as page 1 (no OFFSET scan). The unfiltered list and each single
+filter (customer, staff, payment method) have a (filter, timestamp, id)
+index, and date bounds are a range on that same index. When filters are
+combined, SQLite walks the index of one of them and checks the others row
+by row, so a rare combination can scan further than one page.
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+DB_FILE = "shop.db"
+PAGE_SIZE = 50
+
+SALES_INDEXES = [
+    ("idx_sales_ts_id", "sales(timestamp, id)"),
+    ("idx_sales_customer_ts", "sales(customer_id, timestamp, id)"),
+    ("idx_sales_staff_ts", "sales(staff, timestamp, id)"),
+    ("idx_sales_payment_ts", "sales(payment_method, timestamp, id)"),
+]
+
+
+# ---------- Query API ----------
+def ensure_indexes(conn):
+    """Create the indexes the history queries rely on (idempotent)."""
+    for name, target in SALES_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_items_sale ON sales_items(sale_id)")
+    conn.commit()
+
+
+def _day_after(date_str):
+    return (datetime.strptime(date_str, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def fetch_page(conn, after=None, limit=PAGE_SIZE, customer_id=None, staff=None,
+               payment_method=None, date_from=None, date_to=None):
+    """
+    Return (rows, next_key) for one page of sales, newest first.
+
+    after:    the (timestamp, id) key returned by the previous call, or None for the first page
+    date_from / date_to: inclusive YYYY-MM-DD bounds
+    rows:     sqlite3.Row objects (id, invoice_no, timestamp, customer_id, customer,
+              staff, payment_method, payment_details, grand_total)
+    next_key: key to pass as `after` for the following page, or None on the last page
+    """
+    where, params = [], []
+    if customer_id is not None:
+        where.append("s.customer_id = ?")
+        params.append(customer_id)
+    if staff:
+        where.append("s.staff = ?")
+        params.append(staff)
+    if payment_method:
+        where.append("s.payment_method = ?")
+        params.append(payment_method)
+    if date_from:
+        where.append("s.timestamp >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("s.timestamp < ?")
+        params.append(_day_after(date_to))
+    if after is not None:
+        where.append("(s.timestamp, s.id) < (?, ?)")
+        params.extend(after)
+
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(sales)")]
+    details = "s.payment_details" if "payment_details" in cols else "s.card_type"
+    sql = f"""
+        SELECT s.id, s.invoice_no, s.timestamp, s.customer_id, c.name AS customer, s.staff,
+               s.payment_method, {details} AS payment_details, s.grand_total
+        FROM sales s
+        LEFT JOIN customers c ON c.id = s.customer_id
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY s.timestamp DESC, s.id DESC
+        LIMIT ?
+    """
+    # fetch one extra row to know whether another page exists
+    rows = conn.execute(sql, params + [limit + 1]).fetchall()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, (last["timestamp"], last["id"])
+    return rows, None
+
+
+def iter_sales(conn, page_size=500, **filters):
+    """Yield every matching sale, newest first, one keyset page at a time."""
+    after = None
+    while True:
+        rows, after = fetch_page(conn, after, page_size, **filters)
+        yield from rows
+        if after is None:
+            return
+
+
+def sale_items(conn, sale_id):
+    return conn.execute(
+        "SELECT name, qty, price, subtotal FROM sales_items WHERE sale_id=? ORDER BY id", (sale_id,)
+    ).fetchall()
+
+
+def connect(db_file=DB_FILE):
+    conn = sqlite3.connect(db_file)
+    conn.row_factory = sqlite3.Row
+    return conn
@@ -0,0 +1,128 @@
+"""Tk browser over the sales_history query API (newest first, keyset pages, filters)."""
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+import sales_history
+
+
+class SalesHistoryWindow(tk.Toplevel):
+    def __init__(self, parent, db_file=sales_history.DB_FILE):
+        super().__init__(parent)
+        self.title("Sales History")
+        self.geometry("980x600")
+
+        self.conn = sales_history.connect(db_file)
+        sales_history.ensure_indexes(self.conn)
+        self.page_keys = [None]   # key used to load each page we have visited
+        self.next_key = None
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Filters
+        filters = ttk.Frame(self)
+        filters.pack(fill="x", padx=8, pady=6)
+        ttk.Label(filters, text="Customer ID").grid(row=0, column=0, sticky="e")
+        self.cust_var = tk.StringVar()
+        ttk.Entry(filters, textvariable=self.cust_var, width=8).grid(row=0, column=1, padx=4)
+        ttk.Label(filters, text="Staff").grid(row=0, column=2, sticky="e")
+        self.staff_var = tk.StringVar()
+        ttk.Entry(filters, textvariable=self.staff_var, width=12).grid(row=0, column=3, padx=4)
+        ttk.Label(filters, text="Payment").grid(row=0, column=4, sticky="e")
+        self.pay_var = tk.StringVar()
+        ttk.Combobox(filters, textvariable=self.pay_var, width=14,
+                     values=["", "Cash", "Card", "PayWave", "Online", "Bank Transfer"]).grid(row=0, column=5, padx=4)
+        ttk.Label(filters, text="From (YYYY-MM-DD)").grid(row=0, column=6, sticky="e")
+        self.from_var = tk.StringVar()
+        ttk.Entry(filters, textvariable=self.from_var, width=11).grid(row=0, column=7, padx=4)
+        ttk.Label(filters, text="To").grid(row=0, column=8, sticky="e")
+        self.to_var = tk.StringVar()
+        ttk.Entry(filters, textvariable=self.to_var, width=11).grid(row=0, column=9, padx=4)
+        ttk.Button(filters, text="Apply", command=self.apply_filters).grid(row=0, column=10, padx=6)
+
+        # Sales list
+        cols = ("id", "invoice", "timestamp", "customer", "staff", "payment", "total")
+        self.tree = ttk.Treeview(self, columns=cols, show="headings", height=16)
+        for col, w in (("id", 60), ("invoice", 150), ("timestamp", 150), ("customer", 170),
+                       ("staff", 100), ("payment", 140), ("total", 90)):
+            self.tree.heading(col, text=col.title())
+            self.tree.column(col, width=w, anchor="center")
+        self.tree.pack(fill="both", expand=True, padx=8)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+
+        nav = ttk.Frame(self)
+        nav.pack(fill="x", padx=8, pady=4)
+        self.newer_btn = ttk.Button(nav, text="< Newer", command=self.newer)
+        self.newer_btn.pack(side="left")
+        self.older_btn = ttk.Button(nav, text="Older >", command=self.older)
+        self.older_btn.pack(side="left", padx=4)
+        self.page_label = ttk.Label(nav, text="")
+        self.page_label.pack(side="left", padx=10)
+        ttk.Button(nav, text="Close", command=self.on_close).pack(side="right")
+
+        # Line items of the selected sale
+        self.items_tree = ttk.Treeview(self, columns=("name", "qty", "price", "subtotal"), show="headings", height=6)
+        for col, w in (("name", 360), ("qty", 60), ("price", 90), ("subtotal", 90)):
+            self.items_tree.heading(col, text=col.title())
+            self.items_tree.column(col, width=w, anchor="center")
+        self.items_tree.pack(fill="x", padx=8, pady=(0, 8))
+
+        self.load_page()
+
+    def current_filters(self):
+        cust = self.cust_var.get().strip()
+        return {
+            'customer_id': int(cust) if cust else None,
+            'staff': self.staff_var.get().strip() or None,
+            'payment_method': self.pay_var.get().strip() or None,
+            'date_from': self.from_var.get().strip() or None,
+            'date_to': self.to_var.get().strip() or None,
+        }
+
+    def load_page(self):
+        try:
+            filters = self.current_filters()
+            rows, self.next_key = sales_history.fetch_page(self.conn, self.page_keys[-1],
+                                                           sales_history.PAGE_SIZE, **filters)
+        except ValueError:
+            messagebox.showerror("Filter", "Customer ID must be a number and dates YYYY-MM-DD.", parent=self)
+            return
+        self.tree.delete(*self.tree.get_children())
+        self.items_tree.delete(*self.items_tree.get_children())
+        for r in rows:
+            pay = r['payment_method'] or ""
+            if r['payment_details']:
+                pay += f" ({r['payment_details']})"
+            cust = f"{r['customer']} (ID:{r['customer_id']})" if r['customer_id'] else "Guest"
+            self.tree.insert("", "end", iid=str(r['id']), values=(
+                r['id'], r['invoice_no'], r['timestamp'], cust, r['staff'] or "", pay,
+                f"{r['grand_total'] or 0:.2f}"))
+        self.page_label.config(text=f"Page {len(self.page_keys)}")
+        self.newer_btn.config(state="normal" if len(self.page_keys) > 1 else "disabled")
+        self.older_btn.config(state="normal" if self.next_key else "disabled")
+
+    def apply_filters(self):
+        self.page_keys = [None]
+        self.load_page()
+
+    def older(self):
+        if self.next_key:
+            self.page_keys.append(self.next_key)
+            self.load_page()
+
+    def newer(self):
+        if len(self.page_keys) > 1:
+            self.page_keys.pop()
+            self.load_page()
+
+    def on_select(self, event=None):
+        sel = self.tree.selection()
+        if not sel:
+            return
+        self.items_tree.delete(*self.items_tree.get_children())
+        for r in sales_history.sale_items(self.conn, int(sel[0])):
+            self.items_tree.insert("", "end", values=(r['name'], r['qty'], f"{r['price'] or 0:.2f}",
+                                                      f"{r['subtotal'] or 0:.2f}"))
+
+    def on_close(self):
+        self.conn.close()
+        self.destroy()
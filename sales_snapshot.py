@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Columnar sales snapshot for offline analysis.
+
+Writes the `sales` and `sales_items` tables of shop.db as one typed,
+contiguous .npy array per column plus a manifest.json:
+
+    sales_snapshot/
+        manifest.json
+        sales.id.npy  sales.timestamp.npy  sales.grand_total.npy ...
+        items.sale_id.npy  items.product_id.npy  items.qty.npy ...
+
+Analysis code memory-maps the arrays (zero copies) with load_snapshot().
+Running the export again only appends sales newer than the last snapshot.
+
+Usage:
+    python sales_snapshot.py [shop.db] [snapshot_dir]
+"""
+
+import os
+import sys
+import json
+import sqlite3
+from datetime import datetime
+
+# NumPy is needed for the snapshot format itself
+HAS_NUMPY = True
+try:
+    import numpy as np
+except Exception:
+    HAS_NUMPY = False
+
+# ------------ Config ------------
+DB_FILE = "shop.db"
+SNAPSHOT_DIR = "sales_snapshot"
+MANIFEST_FILE = "manifest.json"
+CHUNK_ROWS = 50000          # rows fetched from sqlite per round trip
+HEADER_LEN = 128            # fixed .npy header size so files can grow in place
+FORMAT_VERSION = 1
+# ---------------------------------
+
+# (column, dtype, kind) - kind: "num" plain numeric, "ts" datetime, "dict" dictionary-encoded text
+SALES_COLUMNS = [
+    ("id", "<i8", "num"),
+    ("customer_id", "<i8", "num"),
+    ("total", "<f8", "num"),
+    ("tax", "<f8", "num"),
+    ("discount", "<f8", "num"),
+    ("grand_total", "<f8", "num"),
+    ("timestamp", "<M8[s]", "ts"),
+    ("payment_method", "<i4", "dict"),
+    ("staff", "<i4", "dict"),
+]
+
+ITEM_COLUMNS = [
+    ("id", "<i8", "num"),
+    ("sale_id", "<i8", "num"),
+    ("product_id", "<i8", "num"),
+    ("qty", "<i8", "num"),
+    ("price", "<f8", "num"),
+    ("subtotal", "<f8", "num"),
+]
+
+NULL_ID = -1  # stored in place of NULL customer_id / product_id
+
+
+# ---------- .npy files that grow in place ----------
+def _write_header(f, dtype, rows):
+    """Write a version 1.0 .npy header padded to HEADER_LEN bytes."""
+    header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (np.dtype(dtype).str, rows)
+    body_len = HEADER_LEN - 10  # magic(6) + version(2) + length(2)
+    header = header.ljust(body_len - 1) + "\n"
+    f.seek(0)
+    f.write(b"\x93NUMPY\x01\x00")
+    f.write(body_len.to_bytes(2, "little"))
+    f.write(header.encode("latin1"))
+
+
+def append_column(path, values, rows_before):
+    """Append `values` to the column file at `path`, which holds `rows_before` valid rows."""
+    arr = np.ascontiguousarray(values)
+    if rows_before == 0 or not os.path.exists(path):
+        with open(path, "wb") as f:
+            _write_header(f, arr.dtype, len(arr))
+            f.write(arr.tobytes())
+        return
+    with open(path, "r+b") as f:
+        # drop anything past the manifest row count (left by an interrupted append)
+        f.truncate(HEADER_LEN + rows_before * arr.dtype.itemsize)
+        f.seek(0, os.SEEK_END)
+        f.write(arr.tobytes())
+        _write_header(f, arr.dtype, rows_before + len(arr))
+
+
+# ---------- Reading from sqlite ----------
+def _table_columns(conn, table):
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _sales_select(conn):
+    """SELECT list for `sales`, tolerating the Billing_and_Product schema (subtotal instead of total)."""
+    cols = _table_columns(conn, "sales")
+    total = "total" if "total" in cols else "subtotal"
+    return f"id, customer_id, {total}, tax, discount, grand_total, timestamp, payment_method, staff"
+
+
+def _to_datetime64(values):
+    return np.array([v.replace(" ", "T") if v else "NaT" for v in values], dtype="datetime64[s]")
+
+
+def _encode(values, vocab):
+    """Dictionary-encode text values against `vocab` (a list, extended in place)."""
+    index = {v: i for i, v in enumerate(vocab)}
+    codes = np.empty(len(values), dtype="<i4")
+    for i, v in enumerate(values):
+        v = v or ""
+        code = index.get(v)
+        if code is None:
+            code = index[v] = len(vocab)
+            vocab.append(v)
+        codes[i] = code
+    return codes
+
+
+def _rows_to_columns(rows, spec, vocabs):
+    """Turn a list of row tuples into {column: ndarray} following `spec`."""
+    out = {}
+    for pos, (name, dtype, kind) in enumerate(spec):
+        raw = [r[pos] for r in rows]
+        if kind == "ts":
+            out[name] = _to_datetime64(raw)
+        elif kind == "dict":
+            out[name] = _encode(raw, vocabs.setdefault(name, []))
+        elif dtype.startswith("<i"):
+            out[name] = np.array([NULL_ID if v is None else v for v in raw], dtype=dtype)
+        else:
+            out[name] = np.array([0.0 if v is None else v for v in raw], dtype=dtype)
+    return out
+
+
+# ---------- Manifest ----------
+def _empty_manifest():
+    return {
+        "format": FORMAT_VERSION,
+        "created": None,
+        "updated": None,
+        "last_sale_id": 0,
+        "tables": {
+            "sales": {"rows": 0, "columns": {n: d for n, d, _ in SALES_COLUMNS}},
+            "items": {"rows": 0, "columns": {n: d for n, d, _ in ITEM_COLUMNS}},
+        },
+        "dictionaries": {},
+    }
+
+
+def read_manifest(snapshot_dir=SNAPSHOT_DIR):
+    path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(snapshot_dir, manifest):
+    """Write the manifest atomically - it is the commit point of an export."""
+    path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ---------- Export ----------
+def export_snapshot(db_file=DB_FILE, snapshot_dir=SNAPSHOT_DIR, chunk_rows=CHUNK_ROWS):
+    """
+    Create or incrementally extend the columnar snapshot.
+    Only sales with id greater than the manifest's last_sale_id are appended.
+    Returns (new_sales, new_items).
+    """
+    if not HAS_NUMPY:
+        raise RuntimeError("Sales snapshots require the 'numpy' package.\nInstall with: pip install numpy")
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    manifest = read_manifest(snapshot_dir) or _empty_manifest()
+    vocabs = manifest["dictionaries"]
+    sales_meta = manifest["tables"]["sales"]
+    items_meta = manifest["tables"]["items"]
+    last_sale_id = manifest["last_sale_id"]
+    new_sales = new_items = 0
+
+    conn = sqlite3.connect(db_file)
+    try:
+        sales_sql = f"SELECT {_sales_select(conn)} FROM sales WHERE id > ? ORDER BY id LIMIT ?"
+        items_sql = ("SELECT id, sale_id, product_id, qty, price, subtotal FROM sales_items "
+                     "WHERE sale_id > ? AND sale_id <= ? ORDER BY sale_id, id")
+        while True:
+            rows = conn.execute(sales_sql, (last_sale_id, chunk_rows)).fetchall()
+            if not rows:
+                break
+            upper = rows[-1][0]
+            item_rows = conn.execute(items_sql, (last_sale_id, upper)).fetchall()
+
+            for table, meta, spec, data in (("sales", sales_meta, SALES_COLUMNS, rows),
+                                            ("items", items_meta, ITEM_COLUMNS, item_rows)):
+                if not data:
+                    continue
+                cols = _rows_to_columns(data, spec, vocabs)
+                for name, arr in cols.items():
+                    append_column(os.path.join(snapshot_dir, f"{table}.{name}.npy"), arr, meta["rows"])
+                meta["rows"] += len(data)
+
+            new_sales += len(rows)
+            new_items += len(item_rows)
+            last_sale_id = upper
+            # commit each chunk so an interrupted export resumes where it stopped
+            now = datetime.now().isoformat(timespec="seconds")
+            manifest["created"] = manifest["created"] or now
+            manifest["updated"] = now
+            manifest["last_sale_id"] = last_sale_id
+            _write_manifest(snapshot_dir, manifest)
+    finally:
+        conn.close()
+
+    return new_sales, new_items
+
+
+# ---------- Reading the snapshot ----------
+class Snapshot:
+    """Memory-mapped view of a snapshot: snap.sales["grand_total"], snap.items["qty"], ..."""
+
+    def __init__(self, snapshot_dir, manifest, sales, items):
+        self.snapshot_dir = snapshot_dir
+        self.manifest = manifest
+        self.sales = sales
+        self.items = items
+
+    def labels(self, column):
+        """Vocabulary for a dictionary-encoded column (e.g. payment_method)."""
+        return self.manifest["dictionaries"].get(column, [])
+
+    def decode(self, column, codes):
+        vocab = np.array(self.labels(column), dtype=object)
+        return vocab[codes]
+
+
+def load_snapshot(snapshot_dir=SNAPSHOT_DIR, mmap_mode="r"):
+    """Open every column with np.load(mmap_mode=...) - no data is copied."""
+    if not HAS_NUMPY:
+        raise RuntimeError("Sales snapshots require the 'numpy' package.")
+    manifest = read_manifest(snapshot_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot manifest in {snapshot_dir}")
+
+    def open_table(table):
+        meta = manifest["tables"][table]
+        cols = {}
+        for name in meta["columns"]:
+            path = os.path.join(snapshot_dir, f"{table}.{name}.npy")
+            if meta["rows"] == 0 or not os.path.exists(path):
+                cols[name] = np.empty(0, dtype=meta["columns"][name])
+                continue
+            # slicing a memmap is a view, so rows past the manifest count are simply ignored
+            cols[name] = np.load(path, mmap_mode=mmap_mode)[:meta["rows"]]
+        return cols
+
+    return Snapshot(snapshot_dir, manifest, open_table("sales"), open_table("items"))
+
+
+def revenue_by_product(snap):
+    """Example aggregation: (product_ids, qty, revenue) summed over all line items."""
+    pids = snap.items["product_id"]
+    uniq, inverse = np.unique(pids, return_inverse=True)
+    qty = np.bincount(inverse, weights=snap.items["qty"], minlength=len(uniq))
+    revenue = np.bincount(inverse, weights=snap.items["subtotal"], minlength=len(uniq))
+    return uniq, qty, revenue
+
+
+# ---------- Run ----------
+if __name__ == "__main__":
+    db = sys.argv[1] if len(sys.argv) > 1 else DB_FILE
+    out = sys.argv[2] if len(sys.argv) > 2 else SNAPSHOT_DIR
+    s, i = export_snapshot(db, out)
+    m = read_manifest(out)
+    print(f"Appended {s} sales / {i} line items to {out} "
+          f"(now {m['tables']['sales']['rows']} sales, {m['tables']['items']['rows']} items)")
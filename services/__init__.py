@@ -0,0 +1,37 @@
+"""
+GUI-free service layer shared by the Tk front ends.
+
+Checkout, product lookup, customer registration and the Nexus reports live
+here as plain classes taking typed inputs (models.Sale, models.CartLine) and
+returning dataclasses; failures are raised as ServiceError subclasses
+instead of being shown in a messagebox. Nothing in this package imports
+tkinter, so workers, the load harness and the benchmarks run the same code
+as the tills.
+
+Services are given a connect() callable rather than a database path, so each
+front end keeps its own connection handling (query_metrics instrumentation,
+the Nexus connection pool).
+
+    from services import ShopCheckout, Sale, CartLine, sqlite_connect
+    shop = ShopCheckout(lambda: sqlite_connect("shop.db"))
+    result = shop.checkout(Sale([CartLine(1, "Cable", 9.5, 2)], "Cash", staff="till-1"))
+"""
+
+import sqlite3
+
+from .models import (CartLine, Totals, Sale, SaleResult, OrderResult, NexusQuote, NexusSaleResult,
+                     Product, Customer, ProductSummary, LowStockItem, CustomerSummary)
+from .errors import (ServiceError, DatabaseUnavailable, EmptyCart, NotFound, DuplicateCustomer,
+                     CheckoutFailed)
+from .checkout import generate_invoice_no, ensure_transaction_tables, record_nexus_transaction, ShopCheckout, BillingCheckout, OrderCheckout, NexusCheckout
+from .inventory import ShopInventory, NexusInventory
+from .customers import ShopCustomers
+from .reports import NexusReports
+
+
+def sqlite_connect(db_file, **kwargs):
+    """Connection with the settings Final Billing's db_connect uses (Row factory, foreign keys)."""
+    conn = sqlite3.connect(db_file, **kwargs)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+    return conn
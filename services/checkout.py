@@ -0,0 +1,296 @@
+"""
+Checkout for each front end's schema.
+
+- ShopCheckout    shop.db as used by Final Billing (sales header, line items,
+                  stock, customer loyalty) - POSApp.checkout
+- BillingCheckout shop.db as created by Billing_and_Product (subtotal and
+                  card_type columns, no customer) - CartFrame.checkout
+- OrderCheckout   shop_app.db of Test1 (orders + user loyalty) - ShoppingPage.checkout
+- NexusCheckout   MySQL nexus_tech (customer-type and points discounts,
+                  stock by product name, Transaction_History/Items for the
+                  customer history and ABC/XYZ classification) - StaffWindow.complete_checkout
+
+Each checkout is one transaction: on any database error it is rolled back
+and CheckoutFailed is raised with the original error as __cause__.
+"""
+
+from datetime import datetime
+
+from .models import Totals, SaleResult, OrderResult, NexusQuote, NexusSaleResult
+from .errors import DatabaseUnavailable, EmptyCart, NotFound, CheckoutFailed
+
+
+def generate_invoice_no():
+    t = datetime.now().strftime("%Y%m%d%H%M%S")
+    return f"INV{t}"
+
+
+# Customer.py's tables; the Nexus front end's own setup script predates them
+TRANSACTION_SCHEMA = ("""
+CREATE TABLE IF NOT EXISTS Transaction_History (
+    transaction_id INT PRIMARY KEY AUTO_INCREMENT,
+    customer_id INT NOT NULL,
+    transaction_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    total_amount DECIMAL(10,2) NOT NULL,
+    items_purchased TEXT,
+    discount_applied DECIMAL(10,2) DEFAULT 0,
+    payment_method VARCHAR(50),
+    FOREIGN KEY (customer_id) REFERENCES Customer_Details(customer_id) ON DELETE CASCADE,
+    INDEX idx_customer_date (customer_id, transaction_date)
+)
+""", """
+CREATE TABLE IF NOT EXISTS Transaction_Items (
+    item_id INT PRIMARY KEY AUTO_INCREMENT,
+    transaction_id INT NOT NULL,
+    customer_id INT NOT NULL,
+    product_id INT,
+    product_name VARCHAR(200) NOT NULL,
+    category_id INT,
+    quantity INT NOT NULL DEFAULT 1,
+    unit_price DECIMAL(10,2),
+    line_total DECIMAL(10,2),
+    FOREIGN KEY (transaction_id) REFERENCES Transaction_History(transaction_id) ON DELETE CASCADE,
+    INDEX idx_items_transaction (transaction_id),
+    INDEX idx_items_customer_category (customer_id, category_id),
+    INDEX idx_items_product (product_id)
+)
+""")
+
+
+def ensure_transaction_tables(cursor):
+    """
+    Create Transaction_History/Transaction_Items if missing (DDL - an implicit commit
+    in MySQL, so never inside a sale). True if they exist afterwards; False if they
+    could not be created (e.g. no CREATE privilege), in which case sales skip the history.
+    """
+    try:
+        for ddl in TRANSACTION_SCHEMA:
+            cursor.execute(ddl)
+    except Exception:
+        return False
+    return True
+
+
+def record_nexus_transaction(cursor, customer_id, lines, totals, payment_method="Cash", when=None):
+    """
+    Transaction_History header plus its Transaction_Items, as
+    CustomerManagementSystem.record_transaction writes them. Caller commits.
+    """
+    names = sorted({l.name for l in lines})
+    cursor.execute(f"SELECT product_name, product_id, category_id FROM Product_Details "
+                   f"WHERE product_name IN ({','.join(['%s'] * len(names))})", names)
+    products = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+    items_text = ", ".join(l.name if l.qty == 1 else f"{l.qty} x {l.name}" for l in lines)
+    cursor.execute("""
+        INSERT INTO Transaction_History
+        (customer_id, transaction_date, total_amount, items_purchased, discount_applied, payment_method)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, (customer_id, when or datetime.now(), totals.grand_total, items_text, totals.discount, payment_method))
+    transaction_id = cursor.lastrowid
+    cursor.executemany("""
+        INSERT INTO Transaction_Items
+        (transaction_id, customer_id, product_id, product_name, category_id, quantity, unit_price, line_total)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """, [(transaction_id, customer_id, products.get(l.name, (l.product_id, None))[0], l.name,
+           products.get(l.name, (None, None))[1], l.qty, l.price, l.subtotal) for l in lines])
+    return transaction_id
+
+
+def _open(connect):
+    conn = connect()
+    if conn is None:
+        raise DatabaseUnavailable("Database is not available.")
+    return conn
+
+
+class ShopCheckout:
+    """Final Billing checkout. connect() returns a new connection per sale."""
+
+    EMPTY_MESSAGE = ()
+
+    def __init__(self, connect, tax_rate=0.15, loyalty_per_dollar=0.1, invoice_no=generate_invoice_no):
+        self.connect = connect
+        self.tax_rate = tax_rate
+        self.loyalty_per_dollar = loyalty_per_dollar
+        self.invoice_no = invoice_no
+
+    def totals(self, sale):
+        return Totals.compute(sale.lines, self.tax_rate, sale.discount_percent, sale.discount_amount)
+
+    def apply(self, cur, sale, invoice_no=None):
+        """
+        Write sale with cursor cur inside the caller's transaction (no commit). Returns a SaleResult.
+        invoice_no is allocated here unless the caller already has one (a journaled sale).
+        """
+        if not sale.lines:
+            raise EmptyCart(*self.EMPTY_MESSAGE)
+        totals = self.totals(sale)
+        invoice_no = invoice_no or self.invoice_no()
+        cur.execute("""
+            INSERT INTO sales (invoice_no, customer_id, total, tax, discount, grand_total, payment_method, payment_details, staff)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (invoice_no, sale.customer_id, totals.subtotal, totals.tax, totals.discount, totals.grand_total,
+              sale.payment_method, sale.payment_details, sale.staff))
+        sale_id = cur.lastrowid
+        cur.executemany("""
+            INSERT INTO sales_items (sale_id, product_id, name, qty, price, subtotal)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(sale_id, l.product_id, l.name, l.qty, l.price, l.subtotal) for l in sale.lines])
+        cur.executemany("UPDATE products SET stock = stock - ? WHERE id = ?",
+                        [(l.qty, l.product_id) for l in sale.lines])
+        earned = 0
+        if sale.customer_id:
+            earned = int(totals.grand_total * self.loyalty_per_dollar)
+            cur.execute("UPDATE customers SET loyalty_points = COALESCE(loyalty_points,0) + ? WHERE id = ?",
+                        (earned, sale.customer_id))
+        return SaleResult(sale_id, invoice_no, totals, earned)
+
+    def checkout(self, sale, invoice_no=None):
+        """Commit sale (a Sale) in its own transaction; returns a SaleResult."""
+        if not sale.lines:
+            raise EmptyCart(*self.EMPTY_MESSAGE)
+        conn = _open(self.connect)
+        try:
+            result = self.apply(conn.cursor(), sale, invoice_no)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise CheckoutFailed(f"Failed to complete sale: {e}") from e
+        finally:
+            conn.close()
+        return result
+
+
+class BillingCheckout(ShopCheckout):
+    """Billing_and_Product checkout: its sales table has subtotal/card_type and no customer link."""
+
+    EMPTY_MESSAGE = ("Nothing in cart.",)
+
+    def apply(self, cur, sale, invoice_no=None):
+        if not sale.lines:
+            raise EmptyCart(*self.EMPTY_MESSAGE)
+        totals = self.totals(sale)
+        invoice_no = invoice_no or self.invoice_no()
+        cur.execute("""
+            INSERT INTO sales (invoice_no, subtotal, tax, discount, grand_total, payment_method, card_type, staff)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (invoice_no, totals.subtotal, totals.tax, totals.discount, totals.grand_total,
+              sale.payment_method, sale.payment_details, sale.staff))
+        sale_id = cur.lastrowid
+        cur.executemany("""
+            INSERT INTO sales_items (sale_id, product_id, name, qty, price, subtotal)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(sale_id, l.product_id, l.name, l.qty, l.price, l.subtotal) for l in sale.lines])
+        cur.executemany("UPDATE products SET stock = stock - ? WHERE id=?",
+                        [(l.qty, l.product_id) for l in sale.lines])
+        return SaleResult(sale_id, invoice_no, totals)
+
+
+class OrderCheckout:
+    """Test1 card checkout on its single shared connection (not closed here)."""
+
+    POINTS_PER = 10         # 1 loyalty point per $10
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def quote(self, cart):
+        """Total of cart, a list of (product_id, qty), at current prices."""
+        if not cart:
+            return 0.0
+        ids = sorted({pid for pid, _ in cart})
+        prices = dict(self.conn.execute(
+            f"SELECT id, price FROM products WHERE id IN ({','.join('?' * len(ids))})", ids).fetchall())
+        missing = [pid for pid in ids if pid not in prices]
+        if missing:
+            raise NotFound(f"Product {missing[0]} no longer exists.")
+        return sum(prices[pid] * qty for pid, qty in cart)
+
+    def checkout(self, user_id, cart):
+        if not cart:
+            raise EmptyCart()
+        total = self.quote(cart)
+        points = int(total // self.POINTS_PER)
+        try:
+            cur = self.conn.cursor()
+            cur.execute("INSERT INTO orders (user_id,total) VALUES (?,?)", (user_id, total))
+            order_id = cur.lastrowid
+            cur.execute("UPDATE users SET loyalty_points = loyalty_points + ? WHERE id=?", (points, user_id))
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            raise CheckoutFailed(f"Failed to record order: {e}") from e
+        return OrderResult(order_id, total, points)
+
+
+class NexusCheckout:
+    """StaffWindow checkout against MySQL; connect() is NexusTechSystem.get_connection."""
+
+    TYPE_DISCOUNT = {'Premium': 0.15, 'Student': 0.10}
+    POINTS_BLOCK = 100      # every 100 points ...
+    POINTS_VALUE = 10       # ... is worth $10 off
+
+    def __init__(self, connect):
+        self.connect = connect
+        self.history_ready = None   # Transaction_History/Items usable; None until ensure_schema() has run
+
+    def ensure_schema(self):
+        """Create the history tables once per process; raises DatabaseUnavailable if it could not try."""
+        if self.history_ready is None:
+            conn = _open(self.connect)
+            try:
+                self.history_ready = ensure_transaction_tables(conn.cursor())
+            finally:
+                conn.close()
+        return self.history_ready
+
+    def _quote(self, cursor, customer_id, lines):
+        cursor.execute("SELECT customer_type, loyalty_points FROM Customer_Details WHERE customer_id=%s",
+                       (customer_id,))
+        row = cursor.fetchone()
+        if row is None:
+            raise NotFound(f"Customer {customer_id} not found.")
+        cust_type, points = row[0], row[1] or 0
+        subtotal = sum(l.subtotal for l in lines)
+        points_used = (points // self.POINTS_BLOCK) * self.POINTS_BLOCK
+        discount = subtotal * self.TYPE_DISCOUNT.get(cust_type, 0.0)
+        discount += (points_used // self.POINTS_BLOCK) * self.POINTS_VALUE
+        totals = Totals(subtotal, 0.0, discount, subtotal - discount)
+        return NexusQuote(totals, cust_type, points, points_used)
+
+    def quote(self, customer_id, lines):
+        """Totals with the customer's discounts; without a customer just the subtotal."""
+        if customer_id is None:
+            subtotal = sum(l.subtotal for l in lines)
+            return NexusQuote(Totals(subtotal, 0.0, 0.0, subtotal))
+        conn = _open(self.connect)
+        try:
+            return self._quote(conn.cursor(), customer_id, lines)
+        finally:
+            conn.close()
+
+    def checkout(self, customer_id, lines, payment_method="Cash"):
+        if not lines:
+            raise EmptyCart()
+        history = self.ensure_schema()  # no-op unless it could not run at start-up
+        conn = _open(self.connect)
+        try:
+            cursor = conn.cursor()
+            quote = self._quote(cursor, customer_id, lines)
+            cursor.executemany("UPDATE Product_Details SET product_number = product_number - %s WHERE product_name=%s",
+                               [(l.qty, l.name) for l in lines])
+            if history:
+                record_nexus_transaction(cursor, customer_id, lines, quote.totals, payment_method)
+            # earn 1 point per dollar spent, minus the points redeemed
+            new_points = quote.points_balance - quote.points_used + int(quote.totals.grand_total)
+            cursor.execute("UPDATE Customer_Details SET loyalty_points=%s WHERE customer_id=%s",
+                           (new_points, customer_id))
+            conn.commit()
+        except NotFound:
+            raise
+        except Exception as e:
+            conn.rollback()
+            raise CheckoutFailed(f"Failed to complete checkout: {e}") from e
+        finally:
+            conn.close()
+        return NexusSaleResult(quote.totals, new_points)
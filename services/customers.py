@@ -0,0 +1,53 @@
+"""Customer search and registration for shop.db."""
+
+from customer_import import SqliteCustomers, normalize_phone, normalize_email
+
+from .models import Customer
+from .errors import DuplicateCustomer, ServiceError
+
+_CUSTOMER_COLS = "id, name, phone, email, COALESCE(loyalty_points, 0)"
+
+
+class ShopCustomers:
+    """connect() returns a new connection per call."""
+
+    def __init__(self, connect):
+        self.connect = connect
+        self.keys_ready = False     # customers.phone_key/email_key, see SqliteCustomers.ensure_indexes
+
+    def search(self, term=None):
+        """Newest first; term matches name or phone."""
+        conn = self.connect()
+        try:
+            if term:
+                rows = conn.execute(f"SELECT {_CUSTOMER_COLS} FROM customers WHERE name LIKE ? OR phone LIKE ? "
+                                    f"ORDER BY id DESC", (f"%{term}%", f"%{term}%")).fetchall()
+            else:
+                rows = conn.execute(f"SELECT {_CUSTOMER_COLS} FROM customers ORDER BY id DESC").fetchall()
+        finally:
+            conn.close()
+        return [Customer(*r) for r in rows]
+
+    def add(self, name, phone=None, email=None, allow_duplicate=False):
+        """
+        Register a customer (phone/email normalized as in bulk import).
+        Raises DuplicateCustomer if the phone or email is already on file, unless allow_duplicate.
+        """
+        name = (name or "").strip()
+        if not name:
+            raise ServiceError("Customer name is required.")
+        phone, email = normalize_phone(phone), normalize_email(email)
+        conn = self.connect()
+        try:
+            cur = conn.cursor()
+            if not self.keys_ready:
+                SqliteCustomers.ensure_indexes(conn)
+                self.keys_ready = True
+            if not allow_duplicate:
+                if SqliteCustomers.exists(conn, phone, email):
+                    raise DuplicateCustomer()
+            cur.execute("INSERT INTO customers (name, phone, email) VALUES (?, ?, ?)", (name, phone, email))
+            conn.commit()
+            return Customer(cur.lastrowid, name, phone, email, 0)
+        finally:
+            conn.close()
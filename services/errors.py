@@ -0,0 +1,27 @@
+"""Exceptions raised by the services; front ends turn them into messageboxes."""
+
+
+class ServiceError(Exception):
+    """Base class - str(e) is a message fit to show the cashier."""
+
+
+class DatabaseUnavailable(ServiceError):
+    pass
+
+
+class EmptyCart(ServiceError):
+    def __init__(self, message="Cart is empty."):
+        super().__init__(message)
+
+
+class NotFound(ServiceError):
+    pass
+
+
+class DuplicateCustomer(ServiceError):
+    def __init__(self, message="A customer with this phone or email already exists."):
+        super().__init__(message)
+
+
+class CheckoutFailed(ServiceError):
+    """The checkout transaction was rolled back; __cause__ holds the database error."""
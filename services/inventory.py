@@ -0,0 +1,78 @@
+"""Product lookups: scan entry, search and stock checks."""
+
+from .models import Product
+from .errors import DatabaseUnavailable
+
+_PRODUCT_COLS = "id, name, price, stock, category, COALESCE(barcode,'')"
+
+
+def _product(row):
+    return Product(row[0], row[1], row[2], row[3], row[4], row[5] or None)
+
+
+class ShopInventory:
+    """Products in shop.db (Final Billing). connect() returns a new connection per call."""
+
+    def __init__(self, connect):
+        self.connect = connect
+
+    def _rows(self, sql, params=()):
+        conn = self.connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def lookup(self, code):
+        """What a scanner sends: a barcode (case-insensitive), else a numeric product id. None if unknown."""
+        code = (code or "").strip()
+        if not code:
+            return None
+        rows = self._rows(f"SELECT {_PRODUCT_COLS} FROM products WHERE barcode=? COLLATE NOCASE", (code,))
+        if not rows and code.isdigit():
+            rows = self._rows(f"SELECT {_PRODUCT_COLS} FROM products WHERE id=?", (int(code),))
+        return _product(rows[0]) if rows else None
+
+    def get(self, product_id):
+        rows = self._rows(f"SELECT {_PRODUCT_COLS} FROM products WHERE id=?", (product_id,))
+        return _product(rows[0]) if rows else None
+
+    def search(self, term=None, category=None):
+        """All products, or those matching term in name/category/barcode, or one category; by id."""
+        if category:
+            rows = self._rows(f"SELECT {_PRODUCT_COLS} FROM products WHERE category=? ORDER BY id", (category,))
+        elif term:
+            like = f"%{term}%"
+            rows = self._rows(f"SELECT {_PRODUCT_COLS} FROM products WHERE name LIKE ? OR category LIKE ? "
+                              f"OR barcode LIKE ? ORDER BY id", (like, like, like))
+        else:
+            rows = self._rows(f"SELECT {_PRODUCT_COLS} FROM products ORDER BY id")
+        return [_product(r) for r in rows]
+
+    def available(self, product_id, qty=1):
+        """True if qty can be sold (untracked stock - NULL - always can)."""
+        p = self.get(product_id)
+        return p is not None and (p.stock is None or p.stock >= qty)
+
+
+class NexusInventory:
+    """Product_Details in MySQL; connect() is NexusTechSystem.get_connection."""
+
+    def __init__(self, connect):
+        self.connect = connect
+
+    def get(self, product_id):
+        conn = self.connect()
+        if conn is None:
+            raise DatabaseUnavailable("Database is not available.")
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT p.product_id, p.product_name, p.product_price, p.product_number, c.category_name
+                FROM Product_Details p LEFT JOIN Product_Category c ON p.category_id = c.category_id
+                WHERE p.product_id=%s
+            """, (product_id,))
+            row = cursor.fetchone()
+        finally:
+            conn.close()
+        return Product(row[0], row[1], float(row[2]), row[3], row[4]) if row else None
@@ -0,0 +1,130 @@
+"""Typed inputs and outputs of the service layer."""
+
+from dataclasses import dataclass, asdict
+from typing import List, Optional
+
+
+@dataclass
+class CartLine:
+    """One cart row. product_id may be None where a front end only knows the name (Nexus)."""
+    product_id: Optional[int]
+    name: str
+    price: float
+    qty: int = 1
+
+    @property
+    def subtotal(self) -> float:
+        return self.price * self.qty
+
+    @classmethod
+    def from_item(cls, item: dict) -> "CartLine":
+        """From the cart dicts the Tk apps keep ({'product_id' or 'id', 'name', 'price', 'qty'})."""
+        pid = item['product_id'] if 'product_id' in item else item['id']
+        return cls(pid, item['name'], float(item['price']), int(item['qty']))
+
+
+@dataclass(frozen=True)
+class Totals:
+    subtotal: float
+    tax: float
+    discount: float
+    grand_total: float
+
+    @classmethod
+    def compute(cls, lines: List[CartLine], tax_rate: float = 0.0, discount_percent: float = 0.0,
+                discount_amount: float = 0.0) -> "Totals":
+        subtotal = sum(line.subtotal for line in lines)
+        tax = subtotal * tax_rate
+        discount = subtotal * (discount_percent / 100.0) + discount_amount
+        return cls(subtotal, tax, discount, max(0.0, subtotal + tax - discount))
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class Sale:
+    lines: List[CartLine]
+    payment_method: str = "Cash"
+    staff: Optional[str] = None
+    customer_id: Optional[int] = None
+    discount_percent: float = 0.0
+    discount_amount: float = 0.0
+    payment_details: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class SaleResult:
+    sale_id: int
+    invoice_no: str
+    totals: Totals
+    loyalty_earned: int = 0
+
+
+@dataclass(frozen=True)
+class OrderResult:
+    order_id: int
+    total: float
+    points_earned: int
+
+
+@dataclass(frozen=True)
+class NexusQuote:
+    totals: Totals
+    customer_type: Optional[str] = None
+    points_balance: int = 0
+    points_used: int = 0
+
+
+@dataclass(frozen=True)
+class NexusSaleResult:
+    totals: Totals
+    new_points: int
+
+
+@dataclass(frozen=True)
+class Product:
+    id: int
+    name: str
+    price: float
+    stock: Optional[int]
+    category: Optional[str] = None
+    barcode: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Customer:
+    id: int
+    name: str
+    phone: Optional[str] = None
+    email: Optional[str] = None
+    loyalty_points: int = 0
+
+
+# ---------- Report rows (dataclasses.astuple() gives the Treeview values) ----------
+@dataclass(frozen=True)
+class ProductSummary:
+    name: str
+    category: str
+    price: float
+    stock: int
+    revenue: float
+    product_class: str = ""
+
+
+@dataclass(frozen=True)
+class LowStockItem:
+    name: str
+    category: str
+    stock: int
+    status: str
+
+
+@dataclass(frozen=True)
+class CustomerSummary:
+    name: str
+    customer_type: str
+    loyalty_points: int
+    contact: str
+    email: str
+
@@ -0,0 +1,93 @@
+"""Nexus admin reports (sales summary by ABC/XYZ class, low stock, customers)."""
+
+import inventory_classes
+
+from .models import ProductSummary, LowStockItem, CustomerSummary
+from .errors import DatabaseUnavailable
+
+
+class NexusReports:
+    """connect() is NexusTechSystem.get_connection."""
+
+    LOW_STOCK_BELOW = 20
+
+    def __init__(self, connect):
+        self.connect = connect
+        self.schema_ready = False
+
+    def ensure_schema(self):
+        """
+        Create Product_Classes (which sales_summary joins) once per process. It is DDL
+        with an implicit commit in MySQL, so it is kept out of the report refresh.
+        """
+        if self.schema_ready:
+            return
+        conn = self.connect()
+        if conn is None:
+            raise DatabaseUnavailable("Database is not available.")
+        try:
+            conn.cursor().execute(inventory_classes.MYSQL_SCHEMA)
+        finally:
+            conn.close()
+        self.schema_ready = True
+
+    def _fetch(self, *statements):
+        """Run statements in order on one connection; rows of the last one."""
+        conn = self.connect()
+        if conn is None:
+            raise DatabaseUnavailable("Database is not available.")
+        try:
+            cursor = conn.cursor()
+            for sql, params in statements:
+                cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def class_filter(wanted):
+        """WHERE clause for 'All', an ABC letter, an XYZ letter or a pair like 'AX'."""
+        if not wanted or wanted == 'All':
+            return '', ()
+        if len(wanted) == 2:
+            return 'WHERE pc.abc = %s AND pc.xyz = %s', (wanted[0], wanted[1])
+        if wanted in 'ABC':
+            return 'WHERE pc.abc = %s', (wanted,)
+        return 'WHERE pc.xyz = %s', (wanted,)
+
+    def sales_summary(self, wanted='All'):
+        where, params = self.class_filter(wanted)
+        self.ensure_schema()  # no-op unless it could not run when the dashboard was built
+        rows = self._fetch((f"""
+            SELECT p.product_name, c.category_name, p.product_price, p.product_number,
+                   COALESCE(pc.revenue, 0), CONCAT(COALESCE(pc.abc, ''), COALESCE(pc.xyz, ''))
+            FROM Product_Details p
+            JOIN Product_Category c ON p.category_id = c.category_id
+            LEFT JOIN Product_Classes pc ON pc.product_id = p.product_id
+            {where}
+            ORDER BY p.product_name
+        """, params))
+        return [ProductSummary(*r) for r in rows]
+
+    def low_stock(self):
+        rows = self._fetch(("""
+            SELECT p.product_name, c.category_name, p.product_number,
+            CASE
+                WHEN p.product_number = 0 THEN 'OUT OF STOCK'
+                WHEN p.product_number < 10 THEN 'LOW STOCK'
+                ELSE 'REORDER SOON'
+            END as status
+            FROM Product_Details p
+            JOIN Product_Category c ON p.category_id = c.category_id
+            WHERE p.product_number < %s
+            ORDER BY p.product_number
+        """, (self.LOW_STOCK_BELOW,)))
+        return [LowStockItem(*r) for r in rows]
+
+    def customers(self):
+        rows = self._fetch(("""
+            SELECT customer_name, customer_type, loyalty_points, customer_contact, customer_email
+            FROM Customer_Details
+            ORDER BY loyalty_points DESC
+        """, ()))
+        return [CustomerSummary(*r) for r in rows]
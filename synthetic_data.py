@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic shop.db for benchmarks and load tests.
+
+Builds the same tables as Final Billing.py (products, customers, sales,
+sales_items) and fills them with realistic-looking data:
+
+- product popularity follows a Zipf distribution (a few best sellers, a
+  long tail), prices are log-normal around a per-category level
+- baskets have 1-8 lines, mostly single units, drawn by popularity
+- sales follow a daily profile (lunch and after-work peaks, busier
+  weekends) over the requested number of days, ids in timestamp order
+- about a third of sales belong to a loyalty customer, and repeat
+  customers are Zipf-distributed too
+
+The same seed, sizes and end date always produce the same database. Rows
+are written with executemany in chunks, so millions of sales are practical.
+
+Usage:
+    python synthetic_data.py bench.db --products 5000 --customers 20000 --sales 1000000 [--seed 42]
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import itertools
+from datetime import datetime, timedelta, date
+
+# ------------ Config ------------
+SEED = 42
+PRODUCTS = 2000
+CUSTOMERS = 5000
+SALES = 100000
+DAYS = 365
+ZIPF_S = 1.1                # popularity skew (1.0 = classic Zipf)
+TAX_RATE = 0.15             # same as Final Billing.py
+CUSTOMER_SHARE = 0.35       # sales linked to a loyalty customer
+CHUNK_SALES = 10000         # sales per executemany / commit
+# ---------------------------------
+
+CATEGORIES = {
+    # category: (typical price, [product words])
+    "Phones": (450.0, ["Phone", "Smartphone", "Mini", "Pro", "Max"]),
+    "Laptops": (1100.0, ["Laptop", "Notebook", "Ultrabook", "Chromebook"]),
+    "Tablets": (520.0, ["Tablet", "Tab", "Pad"]),
+    "Accessories": (25.0, ["Case", "Cable", "Charger", "Adapter", "Stand", "Screen Protector"]),
+    "Audio": (90.0, ["Earbuds", "Headphones", "Speaker", "Soundbar"]),
+    "Storage": (70.0, ["SSD", "USB Drive", "SD Card", "HDD"]),
+    "Networking": (85.0, ["Router", "Switch", "Mesh Node", "Wi-Fi Extender"]),
+    "Gaming": (60.0, ["Controller", "Headset", "Keyboard", "Mouse", "Game"]),
+    "Wearables": (220.0, ["Watch", "Band", "Ring"]),
+    "Components": (180.0, ["GPU", "CPU", "RAM Kit", "Motherboard", "PSU"]),
+}
+BRANDS = ["Nexa", "Voltix", "Orion", "Kairo", "Lumen", "Zentro", "Apex", "Quanta", "Sora", "Helix"]
+FIRST_NAMES = ["Amal", "Nimal", "Kasun", "Dilani", "Sachini", "Ruwan", "Tharindu", "Ishara", "Nadeesha",
+               "Chamath", "Anna", "Olga", "Ivan", "Mei", "Li", "Wei", "John", "Sarah", "Priya", "Arjun"]
+LAST_NAMES = ["Perera", "Fernando", "Silva", "Jayasinghe", "Bandara", "Wickramasinghe", "Dissanayake",
+              "Ivanova", "Petrov", "Wang", "Zhang", "Smith", "Brown", "Kumar", "Patel", "Herath"]
+PAYMENTS = [("Cash", None, 45), ("Card", "Visa", 20), ("Card", "Mastercard", 15), ("PayWave", None, 12),
+            ("Online", None, 5), ("Bank Transfer", None, 3)]
+HOUR_WEIGHTS = [0, 0, 0, 0, 0, 0, 0, 0, 1, 3, 5, 7, 10, 9, 7, 6, 7, 9, 10, 8, 5, 2, 0, 0]
+WEEKDAY_WEIGHTS = [8, 8, 8, 9, 11, 14, 12]     # Mon..Sun
+BASKET_WEIGHTS = [40, 25, 14, 9, 6, 3, 2, 1]   # 1..8 lines
+QTY_WEIGHTS = [80, 14, 4, 2]                  # 1..4 units
+
+
+def create_schema(conn):
+    """Same tables and indexes as Final Billing.py's init_db."""
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT,
+            name TEXT,
+            price REAL DEFAULT 0.0,
+            stock INTEGER DEFAULT 0,
+            barcode TEXT
+        );
+        CREATE TABLE IF NOT EXISTS customers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            phone TEXT,
+            email TEXT,
+            loyalty_points INTEGER DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS sales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            invoice_no TEXT UNIQUE,
+            customer_id INTEGER,
+            total REAL,
+            tax REAL,
+            discount REAL,
+            grand_total REAL,
+            payment_method TEXT,
+            payment_details TEXT,
+            staff TEXT,
+            timestamp TEXT DEFAULT (datetime('now','localtime')),
+            FOREIGN KEY(customer_id) REFERENCES customers(id) ON DELETE SET NULL
+        );
+        CREATE TABLE IF NOT EXISTS sales_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sale_id INTEGER,
+            product_id INTEGER,
+            name TEXT,
+            qty INTEGER,
+            price REAL,
+            subtotal REAL,
+            FOREIGN KEY(sale_id) REFERENCES sales(id) ON DELETE CASCADE,
+            FOREIGN KEY(product_id) REFERENCES products(id) ON DELETE SET NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_sales_items_sale ON sales_items(sale_id);
+        CREATE INDEX IF NOT EXISTS idx_sales_ts_id ON sales(timestamp, id);
+        CREATE INDEX IF NOT EXISTS idx_sales_customer_ts ON sales(customer_id, timestamp, id);
+        CREATE INDEX IF NOT EXISTS idx_sales_staff_ts ON sales(staff, timestamp, id);
+        CREATE INDEX IF NOT EXISTS idx_sales_payment_ts ON sales(payment_method, timestamp, id);
+    """)
+    conn.commit()
+
+
+def zipf_cum_weights(n, s=ZIPF_S):
+    """Cumulative Zipf weights for ranks 1..n, for random.choices(cum_weights=...)."""
+    return list(itertools.accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def barcode_for(product_no):
+    """Deterministic 13-digit EAN with a valid check digit."""
+    body = f"{479000000000 + product_no:012d}"
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+# ---------- Generators ----------
+def gen_products(rng, n):
+    cats = list(CATEGORIES)
+    for i in range(1, n + 1):
+        cat = cats[rng.randrange(len(cats))]
+        level, words = CATEGORIES[cat]
+        name = f"{rng.choice(BRANDS)} {rng.choice(words)} {rng.randrange(100, 999)}-{i}"
+        price = round(max(0.99, rng.lognormvariate(0, 0.45) * level), 2)
+        yield (i, cat, name, price, rng.randrange(0, 200), barcode_for(i))
+
+
+def gen_customers(rng, n):
+    for i in range(1, n + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        phone = f"07{rng.randrange(0, 10 ** 8):08d}"
+        email = f"{first.lower()}.{last.lower()}{i}@example.com" if rng.random() < 0.7 else None
+        yield (i, f"{first} {last}", phone, email, 0)
+
+
+def gen_sales(rng, products, customers, n, days, end):
+    """
+    Yield (sale row, [item rows]) in timestamp order.
+    products: [(id, name, price)] ordered by popularity rank (best seller first).
+    """
+    product_cw = zipf_cum_weights(len(products))
+    customer_cw = zipf_cum_weights(customers, 0.8) if customers else None
+    start = datetime.combine(end, datetime.min.time()) - timedelta(days=days)
+
+    # spread the sales over the days by weekday weight, then over hours by the daily profile
+    day_weights = [WEEKDAY_WEIGHTS[(start + timedelta(days=d)).weekday()] for d in range(days)]
+    per_day = [0] * days
+    for d in rng.choices(range(days), weights=day_weights, k=n):
+        per_day[d] += 1
+
+    sale_id = 0
+    item_id = 0
+    pay_weights = [w for _, _, w in PAYMENTS]
+    for day, count in enumerate(per_day):
+        base = start + timedelta(days=day)
+        seconds = sorted(h * 3600 + rng.randrange(3600) for h in rng.choices(range(24), weights=HOUR_WEIGHTS, k=count))
+        for sec in seconds:
+            sale_id += 1
+            ts = (base + timedelta(seconds=sec)).strftime("%Y-%m-%d %H:%M:%S")
+            lines = rng.choices(range(1, len(BASKET_WEIGHTS) + 1), weights=BASKET_WEIGHTS)[0]
+            picked = {}
+            for idx in rng.choices(range(len(products)), cum_weights=product_cw, k=lines):
+                picked[idx] = picked.get(idx, 0) + rng.choices((1, 2, 3, 4), weights=QTY_WEIGHTS)[0]
+            items = []
+            total = 0.0
+            for idx, qty in picked.items():
+                pid, name, price = products[idx]
+                item_id += 1
+                sub = round(price * qty, 2)
+                total += sub
+                items.append((item_id, sale_id, pid, name, qty, price, sub))
+            total = round(total, 2)
+            tax = round(total * TAX_RATE, 2)
+            cust = None
+            if customers and rng.random() < CUSTOMER_SHARE:
+                cust = rng.choices(range(1, customers + 1), cum_weights=customer_cw)[0]
+            method, details, _ = rng.choices(PAYMENTS, weights=pay_weights)[0]
+            staff = f"staff{rng.randrange(1, 6)}"
+            sale = (sale_id, f"SYN{sale_id:09d}", cust, total, tax, 0.0, round(total + tax, 2),
+                    method, details, staff, ts)
+            yield sale, items
+
+
+# ---------- Build ----------
+def generate(db_file, products=PRODUCTS, customers=CUSTOMERS, sales=SALES, days=DAYS,
+             seed=SEED, end=None, progress=None):
+    """
+    Create db_file (replacing it) with synthetic data. Returns a stats dict.
+    end: last day of sales (date or 'YYYY-MM-DD', default today).
+    """
+    started = time.perf_counter()
+    if isinstance(end, str):
+        end = datetime.strptime(end, "%Y-%m-%d").date()
+    end = end or date.today()
+    rng = random.Random(seed)
+
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+    conn = sqlite3.connect(db_file)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA journal_mode=MEMORY")
+    create_schema(conn)
+
+    product_rows = list(gen_products(rng, products))
+    conn.executemany("INSERT INTO products (id, category, name, price, stock, barcode) VALUES (?, ?, ?, ?, ?, ?)",
+                     product_rows)
+    conn.executemany("INSERT INTO customers (id, name, phone, email, loyalty_points) VALUES (?, ?, ?, ?, ?)",
+                     gen_customers(rng, customers))
+    conn.commit()
+
+    # popularity rank is independent of id so best sellers are spread over the catalog
+    ranked = [(r[0], r[2], r[3]) for r in product_rows]
+    rng.shuffle(ranked)
+
+    sale_buf, item_buf = [], []
+    written = items_written = 0
+
+    def flush():
+        conn.executemany("INSERT INTO sales (id, invoice_no, customer_id, total, tax, discount, grand_total, "
+                         "payment_method, payment_details, staff, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         sale_buf)
+        conn.executemany("INSERT INTO sales_items (id, sale_id, product_id, name, qty, price, subtotal) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?)", item_buf)
+        conn.commit()
+        sale_buf.clear()
+        item_buf.clear()
+        if progress:
+            progress(written, sales)
+
+    for sale, items in gen_sales(rng, ranked, customers, sales, days, end):
+        sale_buf.append(sale)
+        item_buf.extend(items)
+        written += 1
+        items_written += len(items)
+        if len(sale_buf) >= CHUNK_SALES:
+            flush()
+    if sale_buf:
+        flush()
+
+    # loyalty balance consistent with Final Billing (0.1 point per $1)
+    conn.execute("""
+        UPDATE customers SET loyalty_points = (
+            SELECT CAST(COALESCE(SUM(grand_total), 0) * 0.1 AS INTEGER) FROM sales WHERE sales.customer_id = customers.id)
+    """)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return {
+        'products': products,
+        'customers': customers,
+        'sales': written,
+        'items': items_written,
+        'seed': seed,
+        'end': end.isoformat(),
+        'seconds': time.perf_counter() - started,
+    }
+
+
+# ---------- Run ----------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Generate a deterministic synthetic shop.db")
+    ap.add_argument("db")
+    ap.add_argument("--products", type=int, default=PRODUCTS)
+    ap.add_argument("--customers", type=int, default=CUSTOMERS)
+    ap.add_argument("--sales", type=int, default=SALES)
+    ap.add_argument("--days", type=int, default=DAYS)
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--end", help="last day of sales, YYYY-MM-DD (default today)")
+    args = ap.parse_args()
+
+    def show(done, total):
+        sys.stdout.write(f"\r  {done:,} / {total:,} sales")
+        sys.stdout.flush()
+
+    stats = generate(args.db, args.products, args.customers, args.sales, args.days, args.seed, args.end, show)
+    print(f"\n{stats['products']:,} products, {stats['customers']:,} customers, {stats['sales']:,} sales, "
+          f"{stats['items']:,} line items in {stats['seconds']:.1f}s")
@@ -0,0 +1,237 @@
+"""
+Event-loop responsiveness monitor for the Tk apps.
+
+Three parts, all off unless NEXUS_UI_MONITOR=1:
+
+- a probe re-schedules itself with after(INTERVAL_MS) and records how late
+  it fires (timer drift), so p50/p95/p99 lag of the mainloop is known
+- every Tk callback (buttons, bindings, after() jobs) runs through
+  tkinter.CallWrapper, which is wrapped once to note which handler is
+  running and for how long it kept the loop blocked; a nested event loop
+  (modal dialogs, update()) counts as the loop being alive
+- a watchdog thread samples the main thread's stack while a handler has
+  been blocking for more than STALL_MS; when the handler returns, the stall
+  (handler, duration, most frequent stacks) is appended to ui_stalls.log
+
+Ctrl+Alt+M opens a window with the live statistics (ui_monitor_window); a
+JSON summary is written to ui_monitor.json on exit. tkinter is imported
+only by install() and the window, so metrics_exporter can read the
+statistics in a process without Tk.
+
+Environment:
+    NEXUS_UI_MONITOR=1          enable
+    NEXUS_UI_STALL_MS=200       stall threshold in milliseconds
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+import traceback
+import functools
+from collections import deque, Counter
+from datetime import datetime
+
+# ------------ Config ------------
+ENABLED = os.environ.get("NEXUS_UI_MONITOR", "0") == "1"
+INTERVAL_MS = 100           # drift probe period
+STALL_MS = float(os.environ.get("NEXUS_UI_STALL_MS", "200"))
+SAMPLE_MS = 25              # watchdog stack-sampling period
+DRIFT_SAMPLES = 20000       # drift samples kept for percentiles
+MAX_STACK_SAMPLES = 200     # per stall
+STACK_DEPTH = 25
+STALL_LOG = "ui_stalls.log"
+SUMMARY_FILE = "ui_monitor.json"
+# ---------------------------------
+
+_ACTIVE = None
+_original_call = None     # CallWrapper.__call__ as it was when install() ran
+
+
+def unwrap(func):
+    """The function behind an after() job or functools.partial."""
+    code = getattr(func, "__code__", None)
+    if code is not None and code.co_name == "callit" and func.__closure__:
+        cells = dict(zip(code.co_freevars, func.__closure__))
+        if "func" in cells:
+            func = cells["func"].cell_contents
+    while isinstance(func, functools.partial):
+        func = func.func
+    return func
+
+
+def callback_name(func):
+    """Readable name for a Tk callback; lambdas get their file and line."""
+    func = unwrap(func)
+    code = getattr(func, "__code__", None)
+    name = getattr(func, "__qualname__", None) or type(func).__qualname__
+    if name.endswith("<lambda>") and code is not None:
+        return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return name
+
+
+def percentiles(samples, points=(0.5, 0.95, 0.99)):
+    ordered = sorted(samples)
+    if not ordered:
+        return {f"p{int(p * 100)}_ms": 0.0 for p in points}
+    return {f"p{int(p * 100)}_ms": ordered[min(len(ordered) - 1, int(len(ordered) * p))] for p in points}
+
+
+class _Token:
+    """A running callback: when it started and when the loop last showed signs of life."""
+
+    __slots__ = ("name", "started", "alive", "max_gap", "samples")
+
+    def __init__(self, name, now):
+        self.name = name
+        self.started = now
+        self.alive = now
+        self.max_gap = 0.0
+        self.samples = []
+
+
+def _monitored_call(self, *args):
+    mon = _ACTIVE
+    if mon is None:
+        return _original_call(self, *args)
+    now = time.perf_counter()
+    stack = mon.stack
+    if stack:
+        outer = stack[-1]               # nested event loop: the outer handler yielded
+        outer.max_gap = max(outer.max_gap, now - outer.alive)
+    token = _Token(self.func, now)
+    stack.append(token)
+    try:
+        return _original_call(self, *args)
+    finally:
+        stack.pop()
+        end = time.perf_counter()
+        if stack:
+            stack[-1].alive = end
+        mon.finish(token, end)
+
+
+class UIMonitor:
+    def __init__(self, root, app_name, interval_ms=INTERVAL_MS, stall_ms=STALL_MS, sample_ms=SAMPLE_MS):
+        self.root = root
+        self.app_name = app_name
+        self.interval_ms = interval_ms
+        self.stall_ms = stall_ms
+        self.sample_ms = sample_ms
+        self.main_ident = threading.get_ident()
+        self.stack = []
+        self.drift = deque(maxlen=DRIFT_SAMPLES)
+        self.max_drift = 0.0
+        self.callbacks = {}     # name -> [calls, total_ms, max_ms, stalls]
+        self.stalls = deque(maxlen=100)
+        self.started = time.time()
+        self.running = True
+
+        self._expected = time.perf_counter() + interval_ms / 1000
+        root.after(interval_ms, self._tick)
+        threading.Thread(target=self._watchdog, name="ui-watchdog", daemon=True).start()
+        root.bind_all("<Control-Alt-m>", lambda e: self.open_window())
+        atexit.register(self.write_summary)
+
+    def open_window(self):
+        import ui_monitor_window
+        return ui_monitor_window.UIMonitorWindow(self.root, self)
+
+    # ---------- Probe ----------
+    def _tick(self):
+        now = time.perf_counter()
+        late = max(0.0, (now - self._expected) * 1000)
+        self.drift.append(late)
+        self.max_drift = max(self.max_drift, late)
+        self._expected = now + self.interval_ms / 1000
+        if self.running:
+            self.root.after(self.interval_ms, self._tick)
+
+    # ---------- Watchdog ----------
+    def _watchdog(self):
+        while self.running:
+            time.sleep(self.sample_ms / 1000)
+            try:
+                token = self.stack[-1]
+            except IndexError:
+                continue
+            if (time.perf_counter() - token.alive) * 1000 < self.stall_ms or len(token.samples) >= MAX_STACK_SAMPLES:
+                continue
+            frame = sys._current_frames().get(self.main_ident)
+            if frame is not None:
+                token.samples.append("".join(traceback.format_stack(frame, limit=STACK_DEPTH)))
+
+    # ---------- Callbacks ----------
+    def finish(self, token, end):
+        func = unwrap(token.name)
+        if func == self._tick:
+            return
+        blocked_ms = max(token.max_gap, end - token.alive) * 1000
+        name = callback_name(func)
+        st = self.callbacks.get(name)
+        if st is None:
+            st = self.callbacks[name] = [0, 0.0, 0.0, 0]
+        st[0] += 1
+        st[1] += blocked_ms
+        st[2] = max(st[2], blocked_ms)
+        if blocked_ms >= self.stall_ms:
+            st[3] += 1
+            self._record_stall(name, blocked_ms, token.samples)
+
+    def _record_stall(self, name, blocked_ms, samples):
+        top = Counter(samples).most_common(3)
+        stall = {
+            'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'callback': name,
+            'blocked_ms': round(blocked_ms, 1),
+            'samples': len(samples),
+            'stacks': [{'count': n, 'stack': s} for s, n in top],
+        }
+        self.stalls.append(stall)
+        try:
+            with open(STALL_LOG, "a", encoding="utf-8") as f:
+                f.write(f"=== {stall['time']} [{self.app_name}] {name} blocked the UI for {blocked_ms:.0f} ms "
+                        f"({len(samples)} stack samples)\n")
+                for s, n in top:
+                    f.write(f"--- {n}/{len(samples)} samples:\n{s}")
+                f.write("\n")
+        except OSError:
+            pass
+
+    # ---------- Reporting ----------
+    def summary(self):
+        drift = dict(percentiles(list(self.drift)), max_ms=self.max_drift, samples=len(self.drift))
+        callbacks = sorted(({'callback': n, 'calls': c, 'total_ms': t, 'max_ms': m, 'stalls': s}
+                            for n, (c, t, m, s) in self.callbacks.items()),
+                           key=lambda r: r['max_ms'], reverse=True)
+        return {
+            'app': self.app_name,
+            'since': datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            'stall_ms': self.stall_ms,
+            'drift': drift,
+            'callbacks': callbacks,
+            'stalls': list(self.stalls),
+        }
+
+    def write_summary(self, path=SUMMARY_FILE):
+        self.running = False
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.summary(), f, indent=2)
+        except OSError:
+            pass
+
+
+def install(root, app_name=None):
+    """Start monitoring root's mainloop if NEXUS_UI_MONITOR=1. Returns the monitor or None."""
+    global _ACTIVE, _original_call
+    if not ENABLED:
+        return None
+    if _ACTIVE is None:
+        import tkinter as tk
+        _original_call = tk.CallWrapper.__call__
+        tk.CallWrapper.__call__ = _monitored_call
+        _ACTIVE = UIMonitor(root, app_name or type(root).__name__)
+    return _ACTIVE
@@ -0,0 +1,47 @@
+"""Tk view of ui_monitor's live statistics (Ctrl+Alt+M while NEXUS_UI_MONITOR=1)."""
+
+import tkinter as tk
+from tkinter import ttk
+
+
+class UIMonitorWindow(tk.Toplevel):
+    def __init__(self, parent, monitor):
+        super().__init__(parent)
+        self.title("UI Responsiveness")
+        self.geometry("900x520")
+        self.monitor = monitor
+
+        self.drift_label = ttk.Label(self, text="", font=("Helvetica", 11, "bold"))
+        self.drift_label.pack(anchor="w", padx=8, pady=6)
+
+        cols = ("calls", "total", "max", "stalls", "callback")
+        self.tree = ttk.Treeview(self, columns=cols, show="headings", height=12)
+        for col, w, anchor in (("calls", 70, "e"), ("total", 90, "e"), ("max", 90, "e"),
+                               ("stalls", 60, "e"), ("callback", 560, "w")):
+            self.tree.heading(col, text=col.title() + (" ms" if col in ("total", "max") else ""))
+            self.tree.column(col, width=w, anchor=anchor, stretch=(col == "callback"))
+        self.tree.pack(fill="both", expand=True, padx=8)
+
+        ttk.Label(self, text="Recent stalls (stacks in ui_stalls.log):").pack(anchor="w", padx=8, pady=(6, 0))
+        self.stall_list = tk.Listbox(self, height=6)
+        self.stall_list.pack(fill="x", padx=8)
+
+        bottom = ttk.Frame(self)
+        bottom.pack(fill="x", padx=8, pady=6)
+        ttk.Button(bottom, text="Refresh", command=self.refresh).pack(side="left")
+        ttk.Button(bottom, text="Close", command=self.destroy).pack(side="right")
+        self.refresh()
+
+    def refresh(self):
+        s = self.monitor.summary()
+        d = s['drift']
+        self.drift_label.config(text=f"Timer drift  p50 {d['p50_ms']:.1f} ms   p95 {d['p95_ms']:.1f} ms   "
+                                     f"p99 {d['p99_ms']:.1f} ms   max {d['max_ms']:.1f} ms   "
+                                     f"({d['samples']} samples, stall >= {s['stall_ms']:g} ms)")
+        self.tree.delete(*self.tree.get_children())
+        for r in s['callbacks'][:200]:
+            self.tree.insert("", "end", values=(r['calls'], f"{r['total_ms']:.1f}", f"{r['max_ms']:.1f}",
+                                                r['stalls'], r['callback']))
+        self.stall_list.delete(0, "end")
+        for st in reversed(s['stalls']):
+            self.stall_list.insert("end", f"{st['time']}  {st['callback']}  {st['blocked_ms']:.0f} ms")
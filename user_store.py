@@ -0,0 +1,255 @@
+"""
+Crash-safe user store for the login page.
+
+users.json stays the snapshot (same {"admin": {...}, "staff": {...}} layout
+as before). Account changes are appended to users.json.journal as one JSON
+line each, flushed and fsync'ed, so creating an account or changing a
+password writes a few dozen bytes instead of the whole file. Every
+COMPACT_EVERY changes the journal is folded back into the snapshot, which is
+written to a temp file and renamed over users.json, so a crash at any point
+leaves either the old or the new snapshot on disk, never half of one.
+
+Readers and writers hold an exclusive lock on users.json.lock, and before
+every lookup or change a store catches up with journal lines written by
+other processes, so a login checks the current password and two login
+windows cannot overwrite each other's accounts.
+"""
+
+import os
+import json
+
+# Cross-process file locking (fcntl on Linux/macOS, msvcrt on Windows)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# ------------ Config ------------
+USERS_FILE = "users.json"
+COMPACT_EVERY = 200         # journal entries before the snapshot is rewritten
+DEFAULT_USERS = {
+    "admin": {"admin": "1234"},
+    "staff": {"staff": "5678"},
+}
+# ---------------------------------
+
+
+class FileLock:
+    """Exclusive lock on a side file, usable as a context manager."""
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def acquire(self, blocking=True):
+        """Take the lock; with blocking=False return False instead of waiting for another holder."""
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(self.fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                os.lseek(self.fd, 0, os.SEEK_SET)
+                msvcrt.locking(self.fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(self.fd)
+            self.fd = None
+            if blocking:
+                raise
+            return False
+        return True
+
+    def release(self):
+        if fcntl:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        os.close(self.fd)
+        self.fd = None
+
+
+def _fsync_dir(path):
+    """Make a rename durable (no-op where directories cannot be opened, e.g. Windows)."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class UserStore:
+    """
+    Accounts indexed by role: store.users("admin") -> {username: stored password}.
+    The stored value is opaque here (see password_hashing). Lookups first
+    catch up with other processes (a stat plus any new journal bytes);
+    changes append one journal line.
+    """
+
+    def __init__(self, path=USERS_FILE, compact_every=COMPACT_EVERY, defaults=DEFAULT_USERS):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.lock = FileLock(path + ".lock")
+        self.compact_every = compact_every
+        self.defaults = defaults
+        self.roles = {}
+        self._snapshot_id = None    # (inode, mtime) of the snapshot we loaded
+        self._journal_pos = 0       # bytes of the journal already applied
+        self._journal_entries = 0
+        with self.lock:
+            self._reload()
+            if not self.roles:
+                self.roles = {role: dict(users) for role, users in defaults.items()}
+                self._write_snapshot()
+
+    # ---------- Reading ----------
+    def users(self, role):
+        """Copy of role's accounts as they are on disk now."""
+        with self.lock:
+            self._catch_up()
+            return dict(self._users(role))
+
+    def exists(self, role, username):
+        return self.get(role, username) is not None
+
+    def get(self, role, username):
+        with self.lock:
+            self._catch_up()
+            return self._users(role).get(username)
+
+    # ---------- Changes ----------
+    def create_user(self, role, username, password):
+        """Add an account. Returns False if the username is already taken."""
+        with self.lock:
+            self._catch_up()
+            if username in self._users(role):
+                return False
+            self._append({"op": "set", "role": role, "user": username, "password": password})
+        return True
+
+    def set_password(self, role, username, password, expected=None):
+        """
+        Replace the stored password. Returns False for an unknown user, or if
+        expected is given and the stored password no longer equals it (changed
+        by another process since it was read - e.g. a rehash on login).
+        """
+        with self.lock:
+            self._catch_up()
+            current = self._users(role).get(username)
+            if current is None or (expected is not None and current != expected):
+                return False
+            self._append({"op": "set", "role": role, "user": username, "password": password})
+        return True
+
+    def delete_user(self, role, username):
+        with self.lock:
+            self._catch_up()
+            if username not in self._users(role):
+                return False
+            self._append({"op": "del", "role": role, "user": username})
+        return True
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot."""
+        with self.lock:
+            self._catch_up()
+            self._write_snapshot()
+
+    # ---------- Internals (callers hold the lock) ----------
+    def _users(self, role):
+        return self.roles.setdefault(role, {})
+
+    def _apply(self, entry):
+        users = self._users(entry["role"])
+        if entry["op"] == "set":
+            users[entry["user"]] = entry["password"]
+        elif entry["op"] == "del":
+            users.pop(entry["user"], None)
+
+    def _snapshot_stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_ino, st.st_mtime_ns)
+        except OSError:
+            return None
+
+    def _reload(self):
+        """Load the snapshot and replay the whole journal."""
+        self.roles = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    self.roles = {role: dict(users) for role, users in data.items() if isinstance(users, dict)}
+            except Exception:
+                self.roles = {}
+        self._snapshot_id = self._snapshot_stat()
+        self._journal_pos = 0
+        self._journal_entries = 0
+        self._read_journal()
+
+    def _read_journal(self):
+        """Apply journal lines after the current position; a torn last line is ignored."""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._journal_pos)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break   # interrupted append - overwritten by the next write
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError):
+                    pass
+                self._journal_pos += len(line)
+                self._journal_entries += 1
+
+    def _catch_up(self):
+        """Pick up changes other processes made since we last looked."""
+        if self._snapshot_stat() != self._snapshot_id:
+            self._reload()      # someone compacted: start over from their snapshot
+        else:
+            self._read_journal()
+
+    def _append(self, entry):
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+        with open(self.journal_path, "ab") as f:
+            # drop a torn tail left by a crash so the new line starts cleanly
+            f.truncate(self._journal_pos)
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._apply(entry)
+        self._journal_pos += len(line)
+        self._journal_entries += 1
+        if self._journal_entries >= self.compact_every:
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.roles, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        _fsync_dir(self.path)
+        # the snapshot now contains every journal entry
+        with open(self.journal_path, "wb") as f:
+            f.flush()
+            os.fsync(f.fileno())
+        self._snapshot_id = self._snapshot_stat()
+        self._journal_pos = 0
+        self._journal_entries = 0